@@ -0,0 +1,46 @@
+"""
+Benchmark of parsing and matching ATerms, as done by the dispatcher
+for every node of an expression graph.
+"""
+
+from time import time
+from blaze.aterm import parse
+from blaze.aterm.matching import matches
+
+N = 20000
+
+patterns = [
+    'Add(<term>,<term>)',
+    'Mul(Array(<term>),Array(<term>))',
+    'Sum(<appl(Array,<term>)>)',
+    'Abs(<int>)',
+]
+subjects = [
+    'Add(1,2)',
+    'Mul(Array(x{dshape("3, int32")}),Array(y{dshape("3, int32")}))',
+    'Sum(Array(x))',
+    'Abs(3.0)',
+]
+
+t0 = time()
+for i in xrange(N):
+    for s in subjects:
+        parse(s)
+print "time taken for parsing: %.3f" % (time() - t0)
+
+ps = [parse(p) for p in patterns]
+ss = [parse(s) for s in subjects]
+
+t0 = time()
+for i in xrange(N):
+    for p in ps:
+        for s in ss:
+            matches(p, s)
+print "time taken for matching: %.3f" % (time() - t0)
+
+t0 = time()
+for i in xrange(N):
+    for s in ss:
+        s == s
+        hash(s)
+print "time taken for comparing and hashing: %.3f" % (time() - t0)
@@ -0,0 +1,32 @@
+"""
+Benchmark of compiling a BLIR kernel, through the compiler and loaded
+from the compilation cache.
+"""
+
+from time import time
+from blaze.blir import compile
+
+N = 20
+
+source = """
+def main(x: array[float], y: array[float], n : int) -> float {
+    var float accum = 0.0;
+    var int i;
+    for i in range(n) {
+        accum = accum + x[i]*y[i];
+    }
+    return accum;
+}
+"""
+
+t0 = time()
+for i in xrange(N):
+    compile(source, cache=False)
+print "time taken for compiling: %.3f" % (time() - t0)
+
+compile(source)
+
+t0 = time()
+for i in xrange(N):
+    compile(source)
+print "time taken for loading from the cache: %.3f" % (time() - t0)
@@ -0,0 +1,40 @@
+"""
+Benchmark of calling a compiled BLIR kernel on small arrays, through
+the trampoline and through the ctypes wrappers.
+"""
+
+from time import time
+import numpy as np
+from blaze.blir import compile, Context, execute
+from blaze.blir.exc import wrap_arguments
+
+N = 100000
+
+source = """
+def main(x: array[float], y: array[float], n : int) -> float {
+    var float accum = 0.0;
+    var int i;
+    for i in range(n) {
+        accum = accum + x[i]*y[i];
+    }
+    return accum;
+}
+"""
+
+ast, env = compile(source)
+ctx = Context(env)
+lfn = ctx.lookup_fn('main')
+
+x = np.arange(16, dtype='double')
+y = np.arange(16, dtype='double')
+args = (x, y, 16)
+
+t0 = time()
+for i in xrange(N):
+    execute(ctx, args)
+print "time taken for calls through the trampoline: %.3f" % (time() - t0)
+
+t0 = time()
+for i in xrange(N):
+    lfn(*wrap_arguments(lfn, args))
+print "time taken for calls through ctypes: %.3f" % (time() - t0)
@@ -0,0 +1,30 @@
+"""
+Benchmark of creating execution contexts for a compiled BLIR kernel.
+"""
+
+from time import time
+from blaze.blir import compile, Context
+
+N = 10000
+
+source = """
+def main(x: array[float], y: array[float], n : int) -> float {
+    var float accum = 0.0;
+    var int i;
+    for i in range(n) {
+        accum = accum + x[i]*y[i];
+    }
+    return accum;
+}
+"""
+
+ast, env = compile(source)
+
+t0 = time()
+Context(env)
+print "time taken for the first context: %.6f" % (time() - t0)
+
+t0 = time()
+for i in xrange(N):
+    Context(env)
+print "time taken for %d contexts: %.3f" % (N, time() - t0)
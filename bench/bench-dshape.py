@@ -0,0 +1,40 @@
+"""
+Benchmark of parsing datashapes, as done when constructing arrays from
+dshape strings.
+"""
+
+from time import time
+import blaze
+from blaze.datashape import parser
+
+N = 2000
+
+shapes = [
+    '10, int32',
+    '3, 4, float64',
+    'N, {x: int32; y: float64}',
+    '5, VarDim, string(2)',
+]
+
+t0 = time()
+for i in xrange(N):
+    for s in shapes:
+        parser._parse(s)
+print "time taken for parsing with PLY: %.3f" % (time() - t0)
+
+t0 = time()
+for i in xrange(N):
+    for s in shapes:
+        parser.fast_parse(s)
+print "time taken for parsing on the fast path: %.3f" % (time() - t0)
+
+t0 = time()
+for i in xrange(N):
+    for s in shapes:
+        blaze.dshape(s)
+print "time taken for parsing with the cache: %.3f" % (time() - t0)
+
+t0 = time()
+for i in xrange(N):
+    blaze.zeros('10, int32')
+print "time taken for creating small arrays: %.3f" % (time() - t0)
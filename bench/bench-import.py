@@ -0,0 +1,22 @@
+"""
+Benchmark of the startup time of Blaze, ``import blaze`` in a fresh
+interpreter and the import followed by the creation of an array.
+"""
+
+import sys
+from time import time
+from subprocess import check_call
+
+N = 20
+
+def run(code):
+    t0 = time()
+    for i in xrange(N):
+        check_call([sys.executable, '-c', code])
+    return (time() - t0) / N
+
+base = run('pass')
+print "time taken for starting python: %.3f" % base
+print "time taken for import blaze: %.3f" % (run('import blaze') - base)
+print "time taken for import blaze and zeros: %.3f" % (
+    run('import blaze; blaze.zeros("10, int32")') - base)
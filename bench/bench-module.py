@@ -0,0 +1,30 @@
+"""
+Benchmark of loading the prelude of the module system, parsed and typed
+from source or loaded from the cache, and of overload resolution.
+"""
+
+from time import time
+from blaze.module import parser
+from blaze.module.proxy import PRELUDE, core
+
+N = 50
+
+source = open(PRELUDE).read()
+key = parser.cache_key(source)
+
+t0 = time()
+for i in xrange(N):
+    parser.build(source)
+print "time taken for parsing and typing: %.3f" % (time() - t0)
+
+t0 = time()
+for i in xrange(N):
+    parser.load_cached(key)
+print "time taken for loading from the cache: %.3f" % (time() - t0)
+
+ty = ('Array', [('t', 'int')])
+
+t0 = time()
+for i in xrange(N * 1000):
+    core.resolve_adhoc('add', ty)
+print "time taken for overload resolution: %.3f" % (time() - t0)
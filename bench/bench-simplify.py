@@ -0,0 +1,35 @@
+"""
+Benchmark of the algebraic simplification of expression graphs, by
+executing the plan of an expression as written and as simplified.
+"""
+
+from time import time
+import numpy as np
+
+from blaze import NDArray
+from blaze.expr.graph import IntNode
+from blaze.compile import PlanBuilder, Plan, make_context, _compile
+from blaze.rts.execution import execplan
+
+N = 10**7
+
+a = NDArray(np.random.rand(N))
+b = NDArray(np.random.rand(N))
+c = NDArray(np.random.rand(N))
+
+# Identities, a permuted common subexpression and scattered constants
+expr = ((a*IntNode(1) + IntNode(2)) * (b + c) + IntNode(3)) * \
+       ((c + b) + IntNode(0)) + abs(abs(a))
+
+builder = PlanBuilder()
+builder.visit(expr)
+unsimplified = (make_context(builder.leaves, builder.chunklens),
+                Plan(builder.instructions))
+simplified = _compile(expr, fuse=False)
+
+for title, (ctx, plan) in [('as written', unsimplified),
+                           ('simplified', simplified)]:
+    t0 = time()
+    execplan(ctx, plan)
+    print "time taken %s (%d instructions): %.3f" % (
+        title, len(plan), time() - t0)
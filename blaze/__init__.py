@@ -1,40 +1,141 @@
+"""
+Blaze.
+
+The toplevel namespace is loaded lazily: ``import blaze`` only imports
+this module, and the submodules defining the names below (and the
+library of dispatch functions, ``blaze.lib``) are imported when one of
+their names is first accessed::
+
+    import blaze            # fast
+    blaze.zeros('10, int32') # imports blaze.toplevel, numpy, carray...
+"""
+
+import sys as _sys
+import imp as _imp
+from types import ModuleType as _ModuleType
+
 __version__ = '0.1-dev'
 
-# Install the Blaze library of dispatch functions, must be called
-# early
-from lib import *
+# The names of the toplevel namespace, by the module and name they are
+# imported from
+_exports = {
+    # The Blaze library of dispatch functions, installed on import
+    'lift'        : ('blaze.lib', 'lift'),
+    'mean'        : ('blaze.lib', 'mean'),
+    'std'         : ('blaze.lib', 'std'),
+    'select'      : ('blaze.lib', 'select'),
+    'dot'         : ('blaze.lib', 'dot'),
+    'dtw'         : ('blaze.lib', 'dtw'),
+    'add'         : ('blaze.lib', 'add'),
+    'multiply'    : ('blaze.lib', 'multiply'),
+    'power'       : ('blaze.lib', 'power'),
+
+    'dshape'      : ('blaze.datashape', 'dshape'),
+    'Array'       : ('blaze.table', 'Array'),
+    'Table'       : ('blaze.table', 'Table'),
+    'NDArray'     : ('blaze.table', 'NDArray'),
+    'NDTable'     : ('blaze.table', 'NDTable'),
+
+    # From numpy compatability, ideally ``import blaze as np``
+    # should be somewhat backwards compatable
+    'array'       : ('blaze.table', 'Array'),
+    'ndarray'     : ('blaze.table', 'NDArray'),
+    'dtype'       : ('blaze.datashape', 'dshape'),
+
+    'open'        : ('blaze.toplevel', 'open'),
+    'zeros'       : ('blaze.toplevel', 'zeros'),
+    'ones'        : ('blaze.toplevel', 'ones'),
+    'fromiter'    : ('blaze.toplevel', 'fromiter'),
+    'describe'    : ('blaze.toplevel', 'describe'),
+    'evaluate'    : ('blaze.toplevel', 'evaluate'),
+    'all'         : ('blaze.toplevel', 'blaze_all'),
+    'any'         : ('blaze.toplevel', 'blaze_any'),
+    'abs'         : ('blaze.toplevel', 'blaze_abs'),
+    'sum'         : ('blaze.toplevel', 'blaze_sum'),
+
+    # Record class declarations
+    'RecordDecl'  : ('blaze.datashape.record', 'RecordDecl'),
+    'derived'     : ('blaze.datashape.record', 'derived'),
+
+    # The compatability wrappers
+    'to_numpy'    : ('blaze.datashape.coretypes', 'to_numpy'),
+    'from_numpy'  : ('blaze.datashape.coretypes', 'from_numpy'),
 
-from datashape import dshape
-from table import Array, Table, NDArray, NDTable
+    # For Ilan
+    'test'        : ('blaze.testing', 'runner'),
+}
 
+# Modules whose public names are all part of the toplevel namespace,
+# the shorthand namespace dump
+_star_exports = ['blaze.datashape.shorthand']
+
+# These are cheap to import, and shadow submodules of the same name so
+# must be bound before anything imports the submodules
 from eclass import eclass
 manifest = eclass.manifest
 delayed = eclass.delayed
 
-# From numpy compatability, ideally ``import blaze as np``
-# should be somewhat backwards compatable
-array   = Array
-ndarray = NDArray
-dtype   = dshape
-
 from params import params
-from toplevel import open, zeros, ones, fromiter
-from toplevel import (blaze_all as all,
-                      blaze_any as any,
-                      blaze_abs as abs,
-                      blaze_sum as sum)
 
-# Shorthand namespace dump
-from datashape.shorthand import *
+# Errors
+from error import *
 
-# Record class declarations
-from datashape.record import RecordDecl, derived
+def _public(module):
+    return getattr(module, '__all__', None) or \
+           [name for name in vars(module) if not name.startswith('_')]
 
-# The compatability wrappers
-from datashape.coretypes import to_numpy, from_numpy
+class _LazyModule(_ModuleType):
+    """ The blaze package, importing its names on first access. """
 
-# Errors
-from error import *
+    def __getattr__(self, name):
+        if name == '__all__':
+            value = self._all()
+        elif name.startswith('__'):
+            raise AttributeError(name)
+        elif name in _exports:
+            modname, attr = _exports[name]
+            __import__(modname)
+            value = getattr(_sys.modules[modname], attr)
+        elif self._is_submodule(name):
+            # Importing sets the attribute
+            __import__('%s.%s' % (self.__name__, name))
+            return self.__dict__[name]
+        else:
+            for modname in _star_exports:
+                __import__(modname)
+                module = _sys.modules[modname]
+                if name in _public(module):
+                    value = getattr(module, name)
+                    break
+            else:
+                raise AttributeError(
+                    "'module' object has no attribute %r" % name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_exports))
+
+    def _is_submodule(self, name):
+        try:
+            fp = _imp.find_module(name, self.__path__)[0]
+        except ImportError:
+            return False
+        if fp is not None:
+            fp.close()
+        return True
+
+    def _all(self):
+        names = set(_exports)
+        for modname in _star_exports:
+            __import__(modname)
+            names.update(_public(_sys.modules[modname]))
+        names.update(name for name in self.__dict__
+                     if not name.startswith('_'))
+        return sorted(names)
 
-# For Ilan
-from blaze.testing import runner as test
+# Swap the package for its lazy version. The original module is kept
+# alive, Python 2 clears the globals of a module when it is collected.
+_module = _sys.modules[__name__]
+_lazy = _sys.modules[__name__] = _LazyModule(__name__)
+_lazy.__dict__.update(_module.__dict__)
@@ -1,3 +1,6 @@
+from threading import Lock
+from collections import OrderedDict
+
 from parse import parse
 from terms import *
 
@@ -20,50 +23,133 @@ def tail(xs):
         return x
 
 #------------------------------------------------------------------------
-# Toplevel
+# Indexing
 #------------------------------------------------------------------------
 
-def aterm_zip(a, b):
-    if isinstance(a, (aint, areal, astr)) and isinstance(b, (aint, areal, astr)):
-        yield a.val == b.val, None
+# Index key of the patterns whose head is a placeholder, e.g. <term>
+WILDCARD = None
+
+def head(term):
+    """ The key of the head of a term in the indices of patterns: the
+    name and arity of an application, the name of a bare term.
+    Placeholders match any head. """
+    if isinstance(term, aappl):
+        return (term.spine.term, len(term.args))
+    elif isinstance(term, aterm):
+        return (term.term, None)
+    elif isinstance(term, aplaceholder):
+        return WILDCARD
+    return (type(term).__name__, None)
 
-    elif isinstance(a, aappl) and isinstance(b, aappl):
-        if len(a.args) == len(b.args):
-            yield a.spine == b.spine, None
-            for ai, bi in zip(a.args, b.args):
-                for aj in aterm_zip(ai,bi):
-                    yield aj
-        else:
-            yield False, None
-
-    elif isinstance(a, atupl) and isinstance(b, atupl):
-        if len(a.args) == len(b.args):
-            for ai, bi in zip(a.args, b.args):
-                for aj in aterm_zip(ai,bi):
-                    yield aj
-        else:
-            yield False, None
-
-    elif isinstance(a, aterm) and isinstance(b, aterm):
-        yield a.term == b.term, None
-        yield a.annotation == b.annotation, None
+#------------------------------------------------------------------------
+# Compiled Patterns
+#------------------------------------------------------------------------
 
-    elif isinstance(a, aplaceholder):
+def compile_pattern(pattern):
+    """
+    Compile a pattern term into a matcher, a function of a subject term
+    returning the list of the subterms bound to the placeholders of the
+    pattern, left to right, or None if the subject does not match::
+
+        >>> m = compile_pattern(parse('f(<int>,<appl(x,<term>)>)'))
+        >>> m(parse('f(1,g(x,3))'))
+        [1, g, 3]
+
+    The pattern is unrolled into the straight-line source of a Python
+    function checking every node of the pattern in turn, so matching
+    neither recurses nor dispatches on the pattern.
+    """
+    env = {'_values': _values, 'aappl': aappl, 'aterm': aterm,
+           'atupl': atupl, 'alist': alist}
+    lines = []
+    _emit(pattern, 's', lines, env)
+
+    # The captures are only allocated once the head matched
+    lines.insert(1, 'c = []')
+    source = 'def matcher(s):\n%s    return c\n' % ''.join(
+        '    %s\n' % line for line in lines)
+    exec compile(source, '<pattern %s>' % (pattern,), 'exec') in env
+    return env['matcher']
+
+def _emit(p, var, lines, env):
+    """ Append the statements checking that the subject bound to `var`
+    matches the pattern `p`, with the constants they refer to in
+    `env`. """
+    k = 'k%d' % len(env)
+    fmt = {'v': var, 'k': k, 'n': len(getattr(p, 'args', None) or ()),
+           'fail': 'return None'}
+
+    if isinstance(p, (aint, areal, astr)):
+        env[k] = p.val
+        lines.append('if %(v)s.__class__ not in _values '
+                     'or %(v)s.val != %(k)s: %(fail)s' % fmt)
+
+    elif isinstance(p, aappl):
+        # Spines compare by name
+        env[k] = p.spine.term
+        lines.append('if %(v)s.__class__ is not aappl or len(%(v)s.args) != %(n)d '
+                     'or %(v)s.spine.term != %(k)s: %(fail)s' % fmt)
+        _emit_args(p.args, var, lines, env)
+
+    elif isinstance(p, (atupl, alist)):
+        fmt['cls'] = 'atupl' if isinstance(p, atupl) else 'alist'
+        lines.append('if %(v)s.__class__ is not %(cls)s '
+                     'or len(%(v)s.args) != %(n)d: %(fail)s' % fmt)
+        _emit_args(p.args, var, lines, env)
+
+    elif isinstance(p, aterm):
+        # Interned terms are usually the same object
+        env[k] = p
+        lines.append('if %(v)s is not %(k)s and (%(v)s.__class__ is not aterm '
+                     'or %(v)s.term != %(k)s.term '
+                     'or %(v)s.annotation != %(k)s.annotation): %(fail)s' % fmt)
+
+    elif isinstance(p, aplaceholder):
         # <appl(...)>
-        if a.args:
-            if isinstance(b, aappl):
-                yield True, b.spine
-                for ai, bi in zip(a.args, b.args):
-                    for a in aterm_zip(ai,bi):
-                        yield a
-            else:
-                yield False, None
+        if p.args:
+            lines.append('if %(v)s.__class__ is not aappl '
+                         'or len(%(v)s.args) != %(n)d: %(fail)s' % fmt)
+            lines.append('c.append(%(v)s.spine)' % fmt)
+            _emit_args(p.args, var, lines, env)
         # <term>
         else:
-            yield isinstance(b, placeholders[a.type]), b
+            env[k] = placeholders[p.type]
+            lines.append('if not isinstance(%(v)s, %(k)s): %(fail)s' % fmt)
+            lines.append('c.append(%(v)s)' % fmt)
+
     else:
-        yield False, None
+        lines.append(fmt['fail'])
+
+def _emit_args(args, var, lines, env):
+    for i, arg in enumerate(args):
+        sub = '%s_%d' % (var, i)
+        lines.append('%s = %s.args[%d]' % (sub, var, i))
+        _emit(arg, sub, lines, env)
+
+_values = (aint, areal, astr)
+
+# Compiled patterns by identity; terms are interned, so the same
+# pattern is compiled once. The most recently used ones are kept.
+_compiled = OrderedDict()
+_compiled_lock = Lock()
+_COMPILED_SIZE = 1024
+
+def compiled(pattern):
+    """ The cached matcher of a pattern term. """
+    with _compiled_lock:
+        try:
+            entry = _compiled.pop(id(pattern))
+        except KeyError:
+            if len(_compiled) >= _COMPILED_SIZE:
+                _compiled.popitem(last=False)
+            # Keep the pattern alive so its id is not reused
+            entry = (pattern, compile_pattern(pattern))
+        _compiled[id(pattern)] = entry
+        return entry[1]
 
+#------------------------------------------------------------------------
+# Toplevel
+#------------------------------------------------------------------------
 
 # left-to-right substitution
 def aterm_splice(a, elts):
@@ -92,26 +178,13 @@ def aterm_splice(a, elts):
         raise NotImplementedError
 
 def match(pattern, subject, *captures):
-    captures = []
-
-    p = parse(pattern)
-    s = parse(subject)
-
-    for matches, capture in aterm_zip(p,s):
-        if not matches:
-            return False, []
-        elif matches and capture:
-            captures += [capture]
+    captures = compiled(parse(pattern))(parse(subject))
+    if captures is None:
+        return False, []
     return True, captures
 
 def matches(pattern, subject):
-    p = pattern
-    s = subject
-
-    for matches, capture in aterm_zip(p,s):
-        if not matches:
-            return False
-    return True
+    return compiled(pattern)(subject) is not None
 
 def build(pattern, values):
     p = parse(pattern)
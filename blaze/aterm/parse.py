@@ -20,6 +20,8 @@ import os
 import sys
 
 from functools import partial
+from threading import Lock
+from collections import OrderedDict
 
 from terms import *
 
@@ -253,9 +255,27 @@ def load_parser(debug=False):
         # curry the lexer into the parser
         return partial(parser.parse, lexer=lexer)
 
+# Terms are immutable, so the results of parsing are shared between
+# callers. The most recently used ones are kept.
+PARSE_CACHE_SIZE = 1024
+
+_parser = None
+_parsed = OrderedDict()
+_parse_lock = Lock()
+
 def parse(pattern):
-    parser = load_parser()
-    return parser(pattern)
+    global _parser
+    with _parse_lock:
+        try:
+            term = _parsed.pop(pattern)
+        except KeyError:
+            if _parser is None:
+                _parser = load_parser()
+            term = _parser(pattern)
+            if len(_parsed) >= PARSE_CACHE_SIZE:
+                _parsed.popitem(last=False)
+        _parsed[pattern] = term
+        return term
 
 
 if __name__ == '__main__':
@@ -0,0 +1,145 @@
+"""
+Term rewriting.
+
+A rule is a pattern and an action, a function of the subterms bound to
+the placeholders of the pattern returning the term to replace the match
+with, or None to leave it::
+
+    fold = Rule('Add(Const(<int>),Const(<int>))',
+                lambda n, m: parse('Const(%d)' % (n.val + m.val)))
+
+    Rewriter([fold]).rewrite(parse('Mul(Add(Const(1),Const(2)),x)'))
+    # Mul(Const(3), x)
+
+Terms are rewritten innermost first: the arguments of a term are
+normalized before the rules are tried on it, and a replacement is
+itself normalized, until no rule applies anywhere.  Since terms are
+hash-consed, shared subterms are normalized once, so a graph is
+rewritten in time linear in its number of distinct subterms (plus the
+rewrites themselves).  The rules are indexed by the head of their
+pattern, only the ones with the same constructor and arity as the term
+are tried.
+"""
+
+from terms import aterm, aappl, atupl, alist
+from parse import parse
+from matching import compile_pattern, head, WILDCARD
+
+class RewriteError(Exception):
+    pass
+
+class Rule(object):
+    """
+    A rewrite rule.
+
+    Parameters
+    ----------
+    pattern : string or term
+        The left hand side of the rule, with placeholders.
+    action : callable
+        Called with the subterms bound to the placeholders, left to
+        right.  Returns the right hand side or None if the rule does
+        not apply.
+    name : string
+        Used when printing the rule.
+    """
+
+    def __init__(self, pattern, action, name=None):
+        if isinstance(pattern, basestring):
+            pattern = parse(pattern)
+        self.pattern = pattern
+        self.action = action
+        self.name = name or getattr(action, '__name__', 'rule')
+        self.matcher = compile_pattern(pattern)
+
+    def __call__(self, term):
+        """ Rewrite `term` at its root, returns None if the rule does not
+        apply. """
+        captures = self.matcher(term)
+        if captures is None:
+            return None
+        return self.action(*captures)
+
+    def __repr__(self):
+        return '%s: %s' % (self.name, self.pattern)
+
+class Rewriter(object):
+    """ Normalizes terms with respect to a set of rules. """
+
+    def __init__(self, rules=()):
+        self.rules = []
+        self.index = {}
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule):
+        self.rules.append(rule)
+        self.index.setdefault(head(rule.pattern), []).append(rule)
+
+    def step(self, term):
+        """ Apply the first rule matching `term` at its root, returns None
+        if there is none. """
+        for rules in (self.index.get(head(term)), self.index.get(WILDCARD)):
+            if rules:
+                for rule in rules:
+                    result = rule(term)
+                    if result is not None:
+                        return result
+        return None
+
+    def rewrite(self, term):
+        """ The normal form of `term`. """
+        # Normal forms by the id of the term, with the term to keep it
+        # (and its id) alive
+        normal = {}
+        # Terms waiting for the normal form of their replacement
+        pending = {}
+
+        # Innermost first, without recursion since graphs can be deep
+        stack = [term]
+        while stack:
+            t = stack[-1]
+            if id(t) in normal:
+                stack.pop()
+                continue
+
+            if id(t) in pending:
+                result = pending[id(t)][1]
+                if id(result) not in normal:
+                    raise RewriteError("Rewriting %s does not terminate" % t)
+                normal[id(t)] = (t, normal[id(result)][1])
+                stack.pop()
+                continue
+
+            args = getattr(t, 'args', None) or ()
+            todo = [a for a in args if id(a) not in normal]
+            if todo:
+                # Leftmost argument first
+                stack.extend(reversed(todo))
+                continue
+
+            new = rebuild(t, [normal[id(a)][1] for a in args])
+            result = self.step(new)
+            if result is None or result is new:
+                normal[id(t)] = (t, new)
+                normal[id(new)] = (new, new)
+                stack.pop()
+            else:
+                pending[id(t)] = (t, result)
+                stack.append(result)
+
+        return normal[id(term)][1]
+
+    def __repr__(self):
+        return '\n'.join(map(repr, self.rules))
+
+def rebuild(term, args):
+    """ The term with the same constructor as `term` and arguments
+    `args`. """
+    if isinstance(term, aappl):
+        return aappl(term.spine, args)
+    elif isinstance(term, atupl):
+        return atupl(args)
+    elif isinstance(term, alist):
+        return alist(args)
+    return term
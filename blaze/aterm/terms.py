@@ -1,12 +1,76 @@
+"""
+Terms are immutable and hash-consed: building a term structurally equal
+to a live one returns the existing object, so terms can be compared by
+identity and used as dictionary keys in constant time, with their hash
+computed once on construction.
+"""
+
+from weakref import WeakValueDictionary
+
+# Live terms by structural key
+_interned = WeakValueDictionary()
+
+def _key(x):
+    """ The interning key of a term field. Subterms are keyed by their
+    identity, which is stable while the term holding them is alive;
+    values by their type as well, so that ``1``, ``1.0`` and ``True``
+    stay distinct. """
+    if isinstance(x, Term):
+        return id(x)
+    elif isinstance(x, (tuple, list)):
+        return (tuple,) + tuple(_key(y) for y in x)
+    return (type(x), x)
+
+def _freeze(x):
+    if isinstance(x, list):
+        return tuple(x)
+    return x
+
 #------------------------------------------------------------------------
 # Terms
 #------------------------------------------------------------------------
 
-class ATerm(object):
+class Term(object):
+    """ Base class of the interned terms. """
+
+    __slots__ = ('_hash', '__weakref__')
+    _fields = ()
+
+    def __new__(cls, *args):
+        args = tuple(_freeze(a) for a in args)
+        key = (cls,) + tuple(_key(a) for a in args)
+        try:
+            return _interned[key]
+        except KeyError:
+            pass
+        self = object.__new__(cls)
+        for name, value in zip(cls._fields, args):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_hash', hash((cls.__name__,) + args))
+        return _interned.setdefault(key, self)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Terms are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Terms are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, f) for f in self._fields))
+
+    def __repr__(self):
+        return str(self)
+
+class ATerm(Term):
+
+    __slots__ = ('term', 'annotation')
+    _fields = __slots__
 
-    def __init__(self, term, annotation=None):
-        self.term = term
-        self.annotation = annotation
+    def __new__(cls, term, annotation=None):
+        return Term.__new__(cls, term, annotation)
 
     def __str__(self):
         if self.annotation is not None:
@@ -14,114 +78,125 @@ class ATerm(object):
         else:
             return str(self.term)
 
+    # Annotations are ignored in comparisons
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, ATerm):
             return self.term == other.term
-        else:
-            raise ValueError()
+        return NotImplemented
 
     def __ne__(self, other):
+        if self is other:
+            return False
         if isinstance(other, ATerm):
             return self.term != other.term
-        else:
-            raise ValueError()
+        return NotImplemented
 
-    def __repr__(self):
-        return str(self)
+    def __hash__(self):
+        return hash(self.term)
+
+class AAppl(Term):
 
-class AAppl(object):
+    __slots__ = ('spine', 'args')
+    _fields = __slots__
 
-    def __init__(self, spine, args):
+    def __new__(cls, spine, args):
         assert isinstance(spine, ATerm)
-        self.spine = spine
-        self.args = args
+        return Term.__new__(cls, spine, args)
 
     def __str__(self):
         return str(self.spine) + arepr(self.args, '(', ')')
 
-    def __repr__(self):
-        return str(self)
+class AString(Term):
+
+    __slots__ = ('val',)
+    _fields = __slots__
 
-class AString(object):
-    def __init__(self, val):
+    def __new__(cls, val):
         assert isinstance(val, str)
-        self.val = val
+        return Term.__new__(cls, val)
 
     def __str__(self):
         return '"%s"' % (self.val)
 
-    def __repr__(self):
-        return str(self)
+class AInt(Term):
+
+    __slots__ = ('val',)
+    _fields = __slots__
 
-class AInt(object):
-    def __init__(self, val):
-        self.val = val
+    def __new__(cls, val):
+        return Term.__new__(cls, val)
 
     def __str__(self):
         return str(self.val)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, AInt):
             return self.val == other.val
-        else:
-            raise ValueError()
+        return NotImplemented
 
     def __ne__(self, other):
+        if self is other:
+            return False
         if isinstance(other, AInt):
             return self.val != other.val
-        else:
-            raise ValueError()
+        return NotImplemented
 
-    def __repr__(self):
-        return str(self)
+    def __hash__(self):
+        return hash(self.val)
+
+class AReal(Term):
 
-class AReal(object):
-    def __init__(self, val):
-        self.val = val
+    __slots__ = ('val',)
+    _fields = __slots__
+
+    def __new__(cls, val):
+        return Term.__new__(cls, val)
 
     def __str__(self):
         return str(self.val)
 
-    def __repr__(self):
-        return str(self)
+class AList(Term):
+
+    __slots__ = ('args',)
+    _fields = __slots__
 
-class AList(object):
-    def __init__(self, args):
-        assert isinstance(args, list)
-        self.args = args or []
+    def __new__(cls, args):
+        assert isinstance(args, (list, tuple))
+        return Term.__new__(cls, args)
 
     def __str__(self):
         return arepr(self.args, '[', ']')
 
-    def __repr__(self):
-        return str(self)
+class ATuple(Term):
+
+    __slots__ = ('args',)
+    _fields = __slots__
 
-class ATuple(object):
-    def __init__(self, args):
-        assert isinstance(args, list)
-        self.args = args or []
+    def __new__(cls, args):
+        assert isinstance(args, (list, tuple))
+        return Term.__new__(cls, args)
 
     def __str__(self):
         return arepr(self.args, '(', ')')
 
-    def __repr__(self):
-        return str(self)
+class APlaceholder(Term):
 
-class APlaceholder(object):
+    __slots__ = ('type', 'args')
+    _fields = __slots__
 
-    def __init__(self, type, args):
-        self.type = type
-        self.args = args
+    def __new__(cls, type, args):
+        return Term.__new__(cls, type, args)
 
     def __str__(self):
         if self.args is not None:
-            return '<%s(%r)>' % (self.type, self.args)
+            return '<%s%s>' % (self.type, arepr(self.args, '(', ')'))
         else:
             return arepr([self.type], '<', '>')
 
-    def __repr__(self):
-        return str(self)
-
 #------------------------------------------------------------------------
 # Pretty Printing
 #------------------------------------------------------------------------
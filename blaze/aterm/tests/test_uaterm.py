@@ -1,4 +1,5 @@
 from blaze.aterm import *
+from blaze.aterm.matching import compile_pattern
 
 def test_parser_sanity():
     a0 = parse('f')
@@ -82,3 +83,92 @@ def test_build():
     build('f(<int>)', [aint(1)])
     build('f(x, y, g(<int>,<int>))', [aint(1), aint(2)])
     build('<appl(x,y)>', [aterm('x')])
+
+def test_hash_consing():
+    a, b = parse('f(x, g(1, "s"), [2.0])'), parse('f(x, g(1, "s"), [2.0])')
+    assert a is b
+    assert aappl(aterm('f'), [aterm('x')]) is parse('f(x)')
+    assert aint(1) is aint(1)
+    assert aint(1) is not areal(1.0)
+    assert parse('f(1)') is not parse('f(2)')
+    assert parse('x{foo}') is not parse('x{bar}')
+    assert len(set([parse('f(x)'), parse('f(x)'), parse('f(y)')])) == 2
+
+    # Terms built from the results of other parses are shared too
+    assert build('f(<int>)', [aint(1)])[0] is parse('f(1)')
+
+def test_immutable():
+    a = parse('f(x)')
+    try:
+        a.spine = aterm('g')
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("Expected AttributeError")
+    assert isinstance(a.args, tuple)
+
+def test_placeholder_roundtrip():
+    a = parse('<appl(x,<term>)>')
+    assert repr(a) == '<appl(x, <term>)>'
+    assert parse(repr(a)) is a
+
+def test_compile_pattern():
+    m = compile_pattern(parse('f(<int>,<appl(x,<term>)>)'))
+    assert m(parse('f(1,g(x,3))')) == [aint(1), aterm('g'), aint(3)]
+    assert m(parse('f(1.0,g(x,3))')) is None
+    assert m(parse('f(1,g(y,3))')) is None
+    assert m(parse('f(1)')) is None
+
+    assert compile_pattern(parse('x{foo}'))(parse('x{foo}')) == []
+    assert compile_pattern(parse('x{foo}'))(parse('x{bar}')) is None
+    assert compile_pattern(parse('[<int>,b]'))(parse('[1,b]')) == [aint(1)]
+    assert compile_pattern(parse('(a,b,c)'))(parse('(a,b,c)')) == []
+    assert compile_pattern(parse('(a,b,c)'))(parse('(a,b)')) is None
+
+    assert match('f(<int>,g(x,y))', 'f(1,g(x,y))') == (True, [aint(1)])
+    assert match('f(<int>,g(x,y))', 'f(x,g(x,y))') == (False, [])
+
+def test_compiled_lru():
+    from blaze.aterm import matching
+
+    size, matching._COMPILED_SIZE = matching._COMPILED_SIZE, 2
+    matching._compiled.clear()
+    try:
+        p1, p2, p3 = parse('f(<int>)'), parse('g(<int>)'), parse('h(<int>)')
+        m1 = matching.compiled(p1)
+        matching.compiled(p2)
+        assert matching.compiled(p1) is m1
+        matching.compiled(p3)
+        # Only the least recently used matcher is evicted
+        assert [p for p, _ in matching._compiled.values()] == [p1, p3]
+        assert matching.compiled(p1) is m1
+    finally:
+        matching._COMPILED_SIZE = size
+        matching._compiled.clear()
+
+def test_rewrite():
+    from blaze.aterm.rewrite import Rule, Rewriter
+    fold = Rule('Add(Const(<int>),Const(<int>))',
+                lambda n, m: parse('Const(%d)' % (n.val + m.val)))
+    rw = Rewriter([fold])
+    assert rw.rewrite(parse('Mul(Add(Const(1),Const(2)),x)')) is \
+           parse('Mul(Const(3),x)')
+    assert rw.rewrite(parse('Add(Add(Const(1),Const(2)),Const(3))')) is \
+           parse('Const(6)')
+    assert rw.rewrite(parse('f(x)')) is parse('f(x)')
+
+    # Deep terms are rewritten without recursion
+    term = parse('Const(0)')
+    for i in range(5000):
+        term = aappl(aterm('Add'), [term, parse('Const(1)')])
+    assert rw.rewrite(term) is parse('Const(5000)')
+
+def test_rewrite_nontermination():
+    from blaze.aterm.rewrite import Rule, Rewriter, RewriteError
+    rw = Rewriter([Rule('a', lambda: parse('f(a)'))])
+    try:
+        rw.rewrite(parse('a'))
+    except RewriteError:
+        pass
+    else:
+        raise AssertionError("Expected RewriteError")
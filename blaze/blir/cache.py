@@ -0,0 +1,107 @@
+"""
+Persistent compilation cache.
+
+Compiled kernels are stored in a directory as optimized bitcode along
+with their syntax tree and symbol table, keyed by the hash of their
+source, the compiler options, the version of LLVM and the host target.
+A process compiling a kernel already compiled by another one (or by a
+previous run) only reads the bitcode back, skipping the compiler.
+
+The directory is ``~/.blaze/blir``, or ``$BLAZE_BLIR_CACHE`` (the empty
+string disables the cache).
+"""
+
+import io
+import os
+import hashlib
+import logging
+import tempfile
+import cPickle as pickle
+
+import llvm
+import llvm.core as lc
+
+from exc import target_machine
+
+# Bump whenever the compiler changes the code it generates
+CACHE_VERSION = 1
+CACHE_DIR = os.environ.get('BLAZE_BLIR_CACHE',
+    os.path.join(os.path.expanduser('~'), '.blaze', 'blir')) or None
+
+def host():
+    """ The target the kernels are compiled for. """
+    tm = target_machine()
+    return (tm.triple, tm.cpu, tm.feature_string)
+
+_host = None
+
+def cache_key(source, opts):
+    global _host
+    if _host is None:
+        _host = host()
+    key = (CACHE_VERSION, getattr(llvm, '__version__', None), _host,
+           sorted(opts.items()), source)
+    return hashlib.sha1(repr(key)).hexdigest()
+
+class CachedEmitter(object):
+    """ Stands in for the code generator of a kernel loaded from the
+    cache, with the module and the globals it defined. """
+
+    def __init__(self, module):
+        self.module = module
+        self.globals = {}
+        for gv in module.global_variables:
+            self.globals[gv.name] = gv
+        for fn in module.functions:
+            self.globals[fn.name] = fn
+
+def load(key):
+    """ The syntax tree and the environment of a compiled kernel, or None
+    if it is not in the cache. """
+    if CACHE_DIR is None:
+        return None
+    try:
+        with open(os.path.join(CACHE_DIR, key), 'rb') as fd:
+            version, bitcode, ast, symtab = pickle.load(fd)
+        if version != CACHE_VERSION:
+            return None
+        module = lc.Module.from_bitcode(io.BytesIO(bitcode))
+    except Exception:
+        # Missing, or unreadable entries which are recompiled and
+        # overwritten
+        return None
+
+    cgen = CachedEmitter(module)
+    env = {
+        'symtab'     : symtab,
+        'cgen'       : cgen,
+        'lmodule'    : module,
+        'lfunctions' : [fn for fn in module.functions
+                        if not fn.is_declaration],
+    }
+    return ast, env
+
+def store(key, ast, env):
+    if CACHE_DIR is None:
+        return
+    tmp = None
+    try:
+        bitcode = io.BytesIO()
+        env['lmodule'].to_bitcode(bitcode)
+        entry = pickle.dumps(
+            (CACHE_VERSION, bitcode.getvalue(), ast, env['symtab']),
+            pickle.HIGHEST_PROTOCOL)
+
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        # Written aside and renamed so that concurrent readers never
+        # see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(entry)
+        os.rename(tmp, os.path.join(CACHE_DIR, key))
+    except (IOError, OSError, TypeError, pickle.PicklingError):
+        # The cache is best effort, e.g. on a read-only home
+        logging.debug('Could not cache kernel %s', key, exc_info=True)
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
@@ -5,9 +5,15 @@ import ctypes
 import numpy as np
 from os.path import realpath, dirname, join
 from types import ModuleType
+from threading import Lock
 
 from bind import wrap_llvm_module
 
+try:
+    import trampoline
+except ImportError:
+    trampoline = None
+
 import llvm.ee as le
 from llvm.workaround.avx_support import detect_avx_support
 
@@ -106,17 +112,123 @@ def wrap_arguments(fn, args):
         largs = ()
     return largs
 
+#------------------------------------------------------------------------
+# Native Calls
+#------------------------------------------------------------------------
+
+# Plans of the trampoline by signature, (restype, argtypes)
+_plans = {}
+
+def _argkind(argty):
+    """ The kind of an argument for the trampoline, and the type code of
+    its elements if it is an array. """
+    if issubclass(argty, ctypes._Pointer) and \
+       issubclass(argty._type_, ctypes.Structure):
+        # auto-generated by bitey, { T*, int, int* }
+        fields = argty._type_._fields_
+        if len(fields) == 3 and issubclass(fields[0][1], ctypes._Pointer):
+            eltype = fields[0][1]._type_
+            if issubclass(eltype, ctypes._SimpleCData):
+                return 'a', eltype._type_
+    elif issubclass(argty, ctypes._SimpleCData):
+        if argty._type_ in 'bhilq':
+            return 'i', ''
+        elif argty._type_ in 'BHILQ':
+            return 'u', ''
+        elif argty._type_ in 'df':
+            return argty._type_, ''
+    return None, ''
+
+def native_plan(fn):
+    """ The trampoline plan of the signature of a kernel wrapper, or
+    None if it can only be called through ctypes. """
+    if trampoline is None or not trampoline.supported:
+        return None
+
+    key = (fn.restype, tuple(fn.argtypes))
+    try:
+        return _plans[key]
+    except KeyError:
+        pass
+
+    plan = None
+    kinds = [_argkind(argty) for argty in fn.argtypes]
+    restype = fn.restype
+    if restype is None:
+        restype, retsize = 'v', 0
+    elif issubclass(restype, ctypes._SimpleCData) and \
+         restype._type_ in 'bBhHiIlLqQdf':
+        retsize = ctypes.sizeof(restype)
+        if restype._type_ in 'df':
+            restype = restype._type_
+        else:
+            restype = 'u' if restype._type_ in 'BHILQ' else 'i'
+    else:
+        restype = None
+
+    if restype is not None and all(kind for kind, _ in kinds):
+        try:
+            plan = trampoline.Plan(''.join(kind for kind, _ in kinds),
+                                   [element for _, element in kinds],
+                                   restype, retsize)
+        except ValueError:
+            # more arguments than registers, or arrays of elements it
+            # can not check
+            pass
+
+    _plans[key] = plan
+    return plan
+
+def call(fn, args):
+    """ Call a kernel wrapper, through the trampoline if the arguments
+    allow it and through ctypes otherwise. """
+    try:
+        plan, addr = fn.trampoline
+    except AttributeError:
+        plan = native_plan(fn)
+        addr = ctypes.cast(fn, ctypes.c_void_p).value
+        fn.trampoline = plan, addr
+
+    if plan is not None:
+        try:
+            return plan(addr, args)
+        except TypeError:
+            # e.g. lists, copied into arrays by adapt
+            pass
+    return fn(*wrap_arguments(fn, args))
+
 #------------------------------------------------------------------------
 # Toplevel
 #------------------------------------------------------------------------
 
-class Context(object):
+def target_machine():
+    """ The target machine of the host, which code is JIT compiled for. """
+    if not detect_avx_support():
+        return le.TargetMachine.new(features='-avx', cm=le.CM_JITDEFAULT)
+    else:
+        return le.TargetMachine.new(features='', cm=le.CM_JITDEFAULT)
 
-    def __init__(self, env, libs=None):
-        self.destroyed = False
-        libs = libs or ['prelude']
+class JIT(object):
+    """
+    The JIT session of the process: a single execution engine, to which
+    the modules of the kernels are added as they are first needed.
+
+    The ctypes wrappers of a kernel are built once and shared by all
+    its contexts, kernels are identified by the key of their source
+    (see ``blir.cache``) or else by their LLVM module.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.engine = None
+        self.libs = set()
+        # (namespace, wrappers, module) by kernel
+        self.kernels = {}
 
+    def load_libs(self, libs):
         for lib in libs:
+            if lib in self.libs:
+                continue
             if 'darwin' in sys.platform:
                 prelude = join(dirname(realpath(__file__)), lib + '.dylib')
             elif 'linux' in sys.platform:
@@ -126,39 +238,71 @@ class Context(object):
 
             # XXX: yeah, don't do this
             ctypes._dlopen(prelude, ctypes.RTLD_GLOBAL)
+            self.libs.add(lib)
 
+    def kernel(self, env, libs):
         cgen = env['cgen']
+        key = env.get('key') or id(cgen.module)
+        try:
+            return self.kernels[key]
+        except KeyError:
+            pass
+
+        with self.lock:
+            if key in self.kernels:
+                return self.kernels[key]
+
+            self.load_libs(libs)
+            llmodule = cgen.module.clone()
+            if self.engine is None:
+                eb = le.EngineBuilder.new(llmodule)
+                self.engine = eb.create(target_machine())
+            else:
+                self.engine.add_module(llmodule)
 
-        self.__namespace = cgen.globals
-        self.__llmodule = cgen.module.clone()
+            mod = ModuleType('blir_wrapper')
+            wrap_llvm_module(cgen.module, self.engine, mod)
 
-        if not detect_avx_support():
-            tc = le.TargetMachine.new(features='-avx', cm=le.CM_JITDEFAULT)
-        else:
-            tc = le.TargetMachine.new(features='', cm=le.CM_JITDEFAULT)
+            # The source module is kept alive with its wrappers, its id
+            # may be the key
+            kernel = self.kernels[key] = (cgen.globals, mod, cgen.module)
+            return kernel
+
+    def lookup_fnptr(self, namespace, fname):
+        return self.engine.get_pointer_to_function(namespace[fname])
+
+jit = JIT()
 
-        eb = le.EngineBuilder.new(self.__llmodule)
-        self.__engine = eb.create(tc)
-        #self.__engine.run_function(cgen.globals['__module'], [])
+class Context(object):
+    """
+    The handle of a compiled kernel in the JIT session.  Creating a
+    context for a kernel already compiled is only a dictionary lookup.
+    """
+
+    def __init__(self, env, libs=None):
+        self.destroyed = False
+        libs = libs or ['prelude']
 
-        mod = ModuleType('blir_wrapper')
-        wrap_llvm_module(cgen.module, self.__engine, mod)
+        namespace, mod, _ = jit.kernel(env, libs)
 
+        self.__namespace = namespace
         self.__mod = mod
 
     def lookup_fn(self, fname):
         return getattr(self.__mod, fname)
 
     def lookup_fnptr(self, fname):
-        return self.__engine.get_pointer_to_function(self.__namespace[fname])
+        return jit.lookup_fnptr(self.__namespace, fname)
 
     @property
     def mod(self):
         return self.__mod
 
     def destroy(self):
+        # The engine is shared, the code of the kernel is kept for the
+        # next contexts
         if not self.destroyed:
-            del self.__engine
+            self.destroyed = True
         else:
             raise RuntimeError("Context already destroyed")
 
@@ -166,8 +310,8 @@ class Context(object):
 # Execution
 #------------------------------------------------------------------------
 
-# mostly just delegates to Bitey because I don't feel like rolling a
-# ctypes wrapper, this is just for debugging anyways so whatever.
+# Calls go through the trampoline when the arguments allow it, and are
+# otherwise delegated to the ctypes wrappers of Bitey.
 def execute(ctx, args=None, fname=None, timing=False):
 
     args = args or ()
@@ -176,7 +320,6 @@ def execute(ctx, args=None, fname=None, timing=False):
         lfn = ctx.lookup_fn(fname or 'main')
     except AttributeError:
         raise Exception, 'Compiled module has no toplevel function %s' % fname
-    largs = wrap_arguments(lfn, args)
 
     if timing:
         start = time.time()
@@ -185,7 +328,7 @@ def execute(ctx, args=None, fname=None, timing=False):
     if len(lfn.argtypes) == 0:
         res = lfn()
     elif len(lfn.argtypes) == len(args):
-        res = lfn(*largs)
+        res = call(lfn, args)
     else:
         print 'Invalid number of arguments to main function.'
 
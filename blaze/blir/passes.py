@@ -9,6 +9,7 @@ import typecheck
 import codegen
 import errors
 import exc
+import cache
 
 from threading import Lock
 
@@ -162,10 +163,29 @@ compiler = Pipeline('compile', [frontend,
 #------------------------------------------------------------------------
 
 def compile(source, **opts):
+    """ Compile BLIR source, returns the syntax tree and the
+    environment of the compiled module.  Pass cache=False to always run
+    the compiler instead of loading the kernel from the cache. """
+    use_cache = opts.pop('cache', True)
     opts.setdefault('O', 2)
-    env = {'args': opts}
+
+    # Also identifies the kernel in the JIT session
+    key = cache.cache_key(source, opts)
+
+    if use_cache:
+        cached = cache.load(key)
+        if cached is not None:
+            ast, env = cached
+            env['args'] = opts
+            env['key'] = key
+            return ast, env
+
+    env = {'args': opts, 'key': key}
     with compilelock:
         ast, env = compiler(source, env)
+
+    if use_cache:
+        cache.store(key, ast, env)
     return ast, env
 
 #------------------------------------------------------------------------
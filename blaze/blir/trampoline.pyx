@@ -0,0 +1,257 @@
+# Native calls to JIT compiled kernels, without ctypes.
+#
+# The calling conventions of x86-64 (System V) and AArch64 pass the
+# integer and pointer arguments in their registers, in order, and the
+# floating point ones in theirs, independently of each other.  So any
+# function taking up to 6 integer and 8 floating point arguments can be
+# called through the same prototype taking 6 int64 followed by 8
+# doubles, as long as each argument is put in the next slot of its
+# class.  A plan records, for a signature, the slot of each argument
+# and how to convert it, the calls read the ndarrays through the buffer
+# protocol into structures on the stack and release the GIL.
+
+from libc.stdint cimport int8_t, int16_t, int32_t, int64_t, intptr_t, \
+    uint8_t, uint16_t, uint32_t, uint64_t
+from cpython.buffer cimport PyObject_CheckBuffer, PyObject_GetBuffer, \
+    PyBuffer_Release, PyBUF_STRIDES, PyBUF_FORMAT, PyBUF_WRITABLE
+from cpython.int cimport PyInt_Check
+from cpython.long cimport PyLong_Check
+from cpython.float cimport PyFloat_Check
+
+import sys
+import struct
+import platform
+
+DEF MAXINT = 6
+DEF MAXFLOAT = 8
+DEF MAXARGS = 14
+DEF MAXDIMS = 32
+
+# Only the calling conventions described above are supported
+supported = sys.platform != 'win32' and \
+            platform.machine().lower() in ('x86_64', 'amd64', 'aarch64', 'arm64')
+
+# The byte order prefix of native buffer formats
+cdef char native_order = '<' if sys.byteorder == 'little' else '>'
+
+cdef char format_kind(const char *fmt):
+    """ The kind of the elements of a buffer, or of a ctypes type, from
+    its format: 'i' for signed integers, 'u' for unsigned integers, 'f'
+    for floats and '?' for booleans, or 0 if they are not native
+    scalars. """
+    if fmt == NULL:
+        # Unsigned bytes
+        return 'u'
+    if fmt[0] == '@' or fmt[0] == '=' or fmt[0] == native_order:
+        fmt += 1
+    if fmt[0] == 0 or fmt[1] != 0:
+        return 0
+    if fmt[0] in b'bhilq':
+        return 'i'
+    elif fmt[0] in b'BHILQ':
+        return 'u'
+    elif fmt[0] in b'fd':
+        return 'f'
+    elif fmt[0] == '?':
+        return '?'
+    return 0
+
+# The layout of the array arguments of the kernels
+ctypedef struct ndarray_t:
+    void *data
+    int nd
+    int *strides
+
+ctypedef union fslot:
+    double d
+    float f
+
+ctypedef void (*vfn)(int64_t, int64_t, int64_t, int64_t, int64_t, int64_t,
+                     double, double, double, double,
+                     double, double, double, double) nogil
+ctypedef int64_t (*ifn)(int64_t, int64_t, int64_t, int64_t, int64_t, int64_t,
+                        double, double, double, double,
+                        double, double, double, double) nogil
+ctypedef double (*dfn)(int64_t, int64_t, int64_t, int64_t, int64_t, int64_t,
+                       double, double, double, double,
+                       double, double, double, double) nogil
+ctypedef float (*ffn)(int64_t, int64_t, int64_t, int64_t, int64_t, int64_t,
+                      double, double, double, double,
+                      double, double, double, double) nogil
+
+cdef class Plan:
+    """
+    The marshalling of the arguments of native functions of a
+    signature.
+
+    Parameters
+    ----------
+    kinds : string
+        The kind of every argument: 'a' for arrays (passed as a pointer
+        to an ndarray_t), 'i' and 'u' for signed and unsigned integers,
+        'd' and 'f' for doubles and floats.
+    elements : list of string
+        The ctypes type code (``_type_``) of the elements of the array
+        arguments, '' for the others.  Arrays are only passed if their
+        elements are of the same kind and size, and if they are
+        writable.
+    restype : char
+        'v' for void, 'i', 'u', 'd' or 'f'.
+    retsize : int
+        The size in bytes of an integer return value.
+
+    Raises ValueError if the arguments do not fit in the registers.
+    """
+
+    cdef int nargs
+    cdef char kinds[MAXARGS]
+    cdef int itemsizes[MAXARGS]
+    cdef char elemkinds[MAXARGS]
+    cdef char restype
+    cdef int retsize
+
+    def __init__(self, bytes kinds, elements, restype, int retsize=8):
+        cdef int i
+        cdef bytes element
+        if len(kinds) > MAXARGS or \
+           len(kinds) - kinds.count('d') - kinds.count('f') > MAXINT or \
+           kinds.count('d') + kinds.count('f') > MAXFLOAT:
+            raise ValueError("Too many arguments for the trampoline")
+        self.nargs = len(kinds)
+        for i in range(self.nargs):
+            self.kinds[i] = kinds[i]
+            self.itemsizes[i] = 0
+            self.elemkinds[i] = 0
+            if kinds[i] == 'a':
+                element = elements[i]
+                self.elemkinds[i] = format_kind(element)
+                if not self.elemkinds[i]:
+                    raise ValueError("Unsupported array elements %r" % element)
+                self.itemsizes[i] = struct.calcsize(element)
+        self.restype = ord(restype)
+        self.retsize = retsize
+
+    def __call__(self, intptr_t addr, args):
+        """ Call the function at `addr`.  Raises TypeError if an argument
+        can not be passed without conversion by ctypes. """
+        cdef int64_t iregs[MAXINT]
+        cdef fslot fregs[MAXFLOAT]
+        cdef ndarray_t arrays[MAXINT]
+        cdef Py_buffer views[MAXINT]
+        cdef int strides[MAXINT][MAXDIMS]
+        cdef int i, j, ni = 0, nf = 0, na = 0
+        cdef char kind
+        cdef int64_t ires = 0
+        cdef double dres = 0
+        cdef float fres = 0
+        cdef Py_buffer *view
+
+        if len(args) != self.nargs:
+            raise TypeError("Expected %d arguments, got %d" % (
+                self.nargs, len(args)))
+
+        for i in range(MAXINT):
+            iregs[i] = 0
+        for i in range(MAXFLOAT):
+            fregs[i].d = 0
+
+        try:
+            for i in range(self.nargs):
+                arg = args[i]
+                kind = self.kinds[i]
+                if kind == 'a':
+                    if not PyObject_CheckBuffer(arg):
+                        raise TypeError("Expected a buffer")
+                    view = &views[na]
+                    # The kernels do not say which arrays they write to
+                    try:
+                        PyObject_GetBuffer(arg, view, PyBUF_STRIDES |
+                                           PyBUF_FORMAT | PyBUF_WRITABLE)
+                    except (BufferError, ValueError):
+                        # numpy raises ValueError for read-only arrays
+                        raise TypeError("Expected a writable buffer")
+                    na += 1
+                    if view.itemsize != self.itemsizes[i] or \
+                       format_kind(view.format) != self.elemkinds[i] or \
+                       view.ndim > MAXDIMS:
+                        raise TypeError("Buffer of the wrong type")
+                    for j in range(view.ndim):
+                        strides[na-1][j] = view.strides[j] // view.itemsize
+                    arrays[na-1].data = view.buf
+                    arrays[na-1].nd = view.ndim
+                    arrays[na-1].strides = strides[na-1]
+                    iregs[ni] = <int64_t><intptr_t>&arrays[na-1]
+                    ni += 1
+                elif kind == 'i' or kind == 'u':
+                    if not (PyInt_Check(arg) or PyLong_Check(arg)):
+                        raise TypeError("Expected an integer")
+                    try:
+                        if kind == 'i':
+                            iregs[ni] = arg
+                        else:
+                            iregs[ni] = <int64_t><uint64_t>arg
+                    except OverflowError:
+                        # ctypes truncates it
+                        raise TypeError("Integer out of range")
+                    ni += 1
+                elif kind == 'd':
+                    if not (PyFloat_Check(arg) or PyInt_Check(arg) or
+                            PyLong_Check(arg)):
+                        raise TypeError("Expected a float")
+                    fregs[nf].d = arg
+                    nf += 1
+                else:
+                    if not (PyFloat_Check(arg) or PyInt_Check(arg) or
+                            PyLong_Check(arg)):
+                        raise TypeError("Expected a float")
+                    fregs[nf].f = arg
+                    nf += 1
+
+            with nogil:
+                if self.restype == 'v':
+                    (<vfn>addr)(iregs[0], iregs[1], iregs[2],
+                                iregs[3], iregs[4], iregs[5],
+                                fregs[0].d, fregs[1].d, fregs[2].d, fregs[3].d,
+                                fregs[4].d, fregs[5].d, fregs[6].d, fregs[7].d)
+                elif self.restype == 'i' or self.restype == 'u':
+                    ires = (<ifn>addr)(iregs[0], iregs[1], iregs[2],
+                                iregs[3], iregs[4], iregs[5],
+                                fregs[0].d, fregs[1].d, fregs[2].d, fregs[3].d,
+                                fregs[4].d, fregs[5].d, fregs[6].d, fregs[7].d)
+                elif self.restype == 'd':
+                    dres = (<dfn>addr)(iregs[0], iregs[1], iregs[2],
+                                iregs[3], iregs[4], iregs[5],
+                                fregs[0].d, fregs[1].d, fregs[2].d, fregs[3].d,
+                                fregs[4].d, fregs[5].d, fregs[6].d, fregs[7].d)
+                else:
+                    fres = (<ffn>addr)(iregs[0], iregs[1], iregs[2],
+                                iregs[3], iregs[4], iregs[5],
+                                fregs[0].d, fregs[1].d, fregs[2].d, fregs[3].d,
+                                fregs[4].d, fregs[5].d, fregs[6].d, fregs[7].d)
+        finally:
+            for i in range(na):
+                PyBuffer_Release(&views[i])
+
+        if self.restype == 'v':
+            return None
+        elif self.restype == 'i':
+            # Only the low bytes of the register are defined
+            if self.retsize == 1:
+                return <int8_t>ires
+            elif self.retsize == 2:
+                return <int16_t>ires
+            elif self.retsize == 4:
+                return <int32_t>ires
+            return ires
+        elif self.restype == 'u':
+            if self.retsize == 1:
+                return <uint8_t>ires
+            elif self.retsize == 2:
+                return <uint16_t>ires
+            elif self.retsize == 4:
+                return <uint32_t>ires
+            return <uint64_t>ires
+        elif self.restype == 'd':
+            return dres
+        else:
+            return fres
@@ -10,13 +10,15 @@
 import sys
 import numpy as np
 import blaze.carray as ca
-from blaze.carray import utils, attrs, array2string
+from blaze.carray import utils, attrs, array2string, shmcache
 import os, os.path
 import struct
 import shutil
 import tempfile
+import hashlib
 import json
 import cython
+import threading
 
 
 _KB = 1024
@@ -89,6 +91,10 @@ cdef extern from "blosc.h":
 # using any numpy facilities in an extension module.
 import_array()
 
+# Blosc 1.1 keeps the state of a (de)compression in globals, so calls
+# into it from several threads must be serialized
+_blosc_lock = threading.Lock()
+
 #-------------------------------------------------------------
 
 # Some utilities
@@ -202,10 +208,13 @@ cdef class chunk:
 
   Compressed in-memory container for a data chunk.
 
+  Chunks coming from the shared chunk cache (see `shmcache`) hold
+  already decompressed data, mapped from shared memory.
+
   This class is meant to be used only by the `carray` class.
 
   """
-  cdef char typekind, isconstant
+  cdef char typekind, isconstant, isshared
   cdef public int atomsize, itemsize, blocksize
   cdef public int nbytes, cbytes, cdbytes
   cdef int true_count
@@ -222,10 +231,12 @@ cdef class chunk:
       return self.atom
 
   def __cinit__(self, object dobject, object atom, object cparams,
-                object _memory=True, object _compr=False):
+                object _memory=True, object _compr=False,
+                object _shared=False):
     cdef int itemsize, footprint
     cdef size_t nbytes, cbytes, blocksize
     cdef dtype dtype_
+    cdef ndarray udata
     cdef char *data
 
     self.atom = atom
@@ -243,6 +254,18 @@ cdef class chunk:
       self.dobject = dobject 
       # Set size info for the instance
       blosc_cbuffer_sizes(self.data, &nbytes, &cbytes, &blocksize)
+    elif _shared:
+      # Data comes decompressed inside a `shmcache.SharedChunk`
+      self.isshared = 1
+      udata = dobject.data
+      self.data = udata.data
+      # Keep a reference so that the mapping does not go away
+      self.dobject = dobject
+      nbytes = dobject.nbytes
+      cbytes = dobject.cbytes
+      blocksize = dobject.blocksize
+      if self.typekind == 'b':
+        self.true_count = true_count(self.data, nbytes)
     elif dtype_ == 'O':
       # The objects should arrive here already pickled
       data = PyString_AsString(dobject)
@@ -319,9 +342,10 @@ cdef class chunk:
     clevel = cparams.clevel
     shuffle = cparams.shuffle
     dest = <char *>malloc(nbytes+BLOSC_MAX_OVERHEAD)
-    with nogil:
-      cbytes = blosc_compress(clevel, shuffle, itemsize, nbytes,
-                              data, dest, nbytes+BLOSC_MAX_OVERHEAD)
+    with _blosc_lock:
+      with nogil:
+        cbytes = blosc_compress(clevel, shuffle, itemsize, nbytes,
+                                data, dest, nbytes+BLOSC_MAX_OVERHEAD)
     if cbytes <= 0:
       raise RuntimeError, "fatal error during Blosc compression: %d" % cbytes
     # Free the unused data
@@ -338,6 +362,8 @@ cdef class chunk:
 
     assert (not self.isconstant,
             "This function can only be used for persistency")
+    if self.isshared:
+      raise RuntimeError("shared chunks do not keep compressed data")
     string = PyString_FromStringAndSize(self.data, <Py_ssize_t>self.cdbytes)
     return string
 
@@ -346,13 +372,18 @@ cdef class chunk:
     cdef int ret
     cdef char *dest
 
+    if self.isshared:
+      return PyString_FromStringAndSize(self.data, <Py_ssize_t>self.nbytes)
     dest = <char *>malloc(self.nbytes)
     # Fill dest with uncompressed data
-    with nogil:
-      ret = blosc_decompress(self.data, dest, self.nbytes)
+    with _blosc_lock:
+      with nogil:
+        ret = blosc_decompress(self.data, dest, self.nbytes)
     if ret < 0:
+      free(dest)
       raise RuntimeError, "fatal error during Blosc decompression: %d" % ret
     string = PyString_FromStringAndSize(dest, <Py_ssize_t>self.nbytes)
+    free(dest)
     return string
 
   cdef void _getitem(self, int start, int stop, char *dest):
@@ -372,12 +403,18 @@ cdef class chunk:
       memcpy(dest, constants.data, bsize)
       return
 
+    if self.isshared:
+      # The data is already decompressed
+      memcpy(dest, self.data + start * self.atomsize, bsize)
+      return
+
     # Fill dest with uncompressed data
-    with nogil:
-      if bsize == self.nbytes:
-        ret = blosc_decompress(self.data, dest, bsize)
-      else:
-        ret = blosc_getitem(self.data, nstart, nitems, dest)
+    with _blosc_lock:
+      with nogil:
+        if bsize == self.nbytes:
+          ret = blosc_decompress(self.data, dest, bsize)
+        else:
+          ret = blosc_getitem(self.data, nstart, nitems, dest)
     if ret < 0:
       raise RuntimeError, "fatal error during Blosc decompression: %d" % ret
 
@@ -547,11 +584,16 @@ cdef decode_blosc_header(buffer_):
 
 
 cdef class chunks(object):
-  """Store the different carray chunks in a directory on-disk."""
+  """Store the different carray chunks in a directory on-disk.
+
+  The last chunk read is cached.  The cache is kept as a single
+  (nchunk, chunk) entry and it is updated under a lock, so that the
+  same object can be read from several threads at once.
+  """
   cdef object _rootdir, _mode
   cdef object dtype, cparams, lastchunkarr
-  cdef object chunk_cached
-  cdef npy_intp nchunks, nchunk_cached, len
+  cdef object cached, lock
+  cdef npy_intp nchunks, len
 
   property mode:
     "The mode used to create/open the `mode`."
@@ -574,20 +616,12 @@ cdef class chunks(object):
 
   def __cinit__(self, rootdir, metainfo=None, _new=False):
     cdef ndarray lastchunkarr
-    cdef void *decompressed, *compressed
-    cdef int leftover
-    cdef char *lastchunk
-    cdef size_t chunksize
-    cdef object scomp
-    cdef int ret
-    cdef int itemsize, atomsize
 
     self._rootdir = rootdir
     self.nchunks = 0
-    self.nchunk_cached = -1    # no chunk cached initially
+    self.cached = None    # no chunk cached initially
+    self.lock = threading.Lock()
     self.dtype, self.cparams, self.len, lastchunkarr, self._mode = metainfo
-    atomsize = self.dtype.itemsize
-    itemsize = self.dtype.base.itemsize
 
     # For 'O'bject types, the number of chunks is equal to the number of
     # elements
@@ -596,24 +630,57 @@ cdef class chunks(object):
 
     # Initialize last chunk (not valid for 'O'bject dtypes)
     if not _new and self.dtype.char != 'O':
-      self.nchunks = cython.cdiv(self.len, len(lastchunkarr))
-      chunksize = len(lastchunkarr) * atomsize
-      lastchunk = lastchunkarr.data
-      leftover = (self.len % len(lastchunkarr)) * atomsize
-      if leftover:
-        # Fill lastchunk with data on disk
-        scomp = self.read_chunk(self.nchunks)
-        compressed = PyString_AsString(scomp)
+      self.read_leftover(self.len, lastchunkarr)
+      self.set_len(self.len, len(lastchunkarr))
+
+  def read_leftover(self, npy_intp len_, ndarray lastchunkarr):
+    """Read the leftover of `len_` items of data into `lastchunkarr`.
+
+    The chunks themselves are not changed, see `set_len`.
+    """
+    cdef void *compressed
+    cdef int leftover
+    cdef char *lastchunk
+    cdef size_t chunksize
+    cdef object scomp
+    cdef int ret
+    cdef npy_intp nchunks
+
+    nchunks = cython.cdiv(len_, len(lastchunkarr))
+    chunksize = len(lastchunkarr) * self.dtype.itemsize
+    lastchunk = lastchunkarr.data
+    leftover = (len_ % len(lastchunkarr)) * self.dtype.itemsize
+    if leftover:
+      # Fill lastchunk with data on disk
+      scomp = self.read_chunk(nchunks)
+      compressed = PyString_AsString(scomp)
+      with _blosc_lock:
         with nogil:
           ret = blosc_decompress(compressed, lastchunk, chunksize)
-        if ret < 0:
-          raise RuntimeError(
-            "error decompressing the last chunk (error code: %d)" % ret)
+      if ret < 0:
+        raise RuntimeError(
+          "error decompressing the last chunk (error code: %d)" % ret)
+
+  def set_len(self, npy_intp len_, npy_intp chunklen):
+    """Set the length to `len_` items, in chunks of `chunklen`.
+
+    Chunks that were partial, or missing, under the previous length are
+    dropped from the cache.
+    """
+    with self.lock:
+      if self.cached is not None and self.cached[0] >= self.nchunks:
+        self.cached = None
+      self.nchunks = cython.cdiv(len_, chunklen)
+      self.len = len_
+
+  cdef chunkfile(self, nchunk):
+    """Return the name of the file for chunk #`nchunk`."""
+    dname = "__%d%s" % (nchunk, EXTENSION)
+    return os.path.join(self.datadir, dname)
 
   cdef read_chunk(self, nchunk):
     """Read a chunk and return it in compressed form."""
-    dname = "__%d%s" % (nchunk, EXTENSION)
-    schunkfile = os.path.join(self.datadir, dname)
+    schunkfile = self.chunkfile(nchunk)
     if not os.path.exists(schunkfile):
       raise ValueError("chunkfile %s not found" % schunkfile)
     with open(schunkfile, 'rb') as schunk:
@@ -628,20 +695,42 @@ cdef class chunks(object):
       scomp = schunk.read(ctbytes)
     return scomp
 
+  cdef read_shared(self, object cache, nchunk):
+    """Get a chunk via the shared chunk `cache`."""
+    scomp = self.read_chunk(nchunk)
+    # The compressed data itself is the version: the stat of the chunk
+    # file may not change across rewrites of the same size
+    version = hashlib.sha1(scomp).hexdigest()
+    entry = cache.get(self._rootdir, nchunk, version)
+    if entry is not None:
+      return chunk(entry, self.dtype, self.cparams,
+                   _memory=False, _shared=True)
+    # Not there yet.  Decompress and publish it.
+    chunk_ = chunk(scomp, self.dtype, self.cparams,
+                   _memory=False, _compr=True)
+    cache.put(self._rootdir, nchunk, version, chunk_.getudata(),
+              chunk_.cdbytes, chunk_.blocksize)
+    return chunk_
+
   def __getitem__(self, nchunk):
-    cdef void *decompressed, *compressed
+    cdef object cached, cache
 
-    if nchunk == self.nchunk_cached:
+    # Take a reference to the entry, so that it cannot change under us
+    cached = self.cached
+    if cached is not None and cached[0] == nchunk:
       # Hit!
-      return self.chunk_cached
+      return cached[1]
+    cache = shmcache.get_cache()
+    if cache is not None:
+      chunk_ = self.read_shared(cache, nchunk)
     else:
       scomp = self.read_chunk(nchunk)
       # Data chunk should be compressed already
       chunk_ = chunk(scomp, self.dtype, self.cparams,
                      _memory=False, _compr=True)
-      # Fill cache
-      self.nchunk_cached = nchunk
-      self.chunk_cached = chunk_
+    # Fill cache
+    with self.lock:
+      self.cached = (nchunk, chunk_)
     return chunk_
 
   def __setitem__(self, nchunk, chunk_):
@@ -665,13 +754,12 @@ cdef class chunks(object):
     dname = "__%d%s" % (nchunk, EXTENSION)
     schunkfile = os.path.join(self.datadir, dname)
     bloscpack_header = create_bloscpack_header(1)
-    with open(schunkfile, 'wb') as schunk:
-      schunk.write(bloscpack_header)
-      data = chunk_.getdata()
-      schunk.write(data)
+    # Readers in other processes must never see a partial chunk
+    utils.atomic_write(schunkfile, bloscpack_header + chunk_.getdata())
     # Mark the cache as dirty if needed
-    if nchunk == self.nchunk_cached:
-      self.nchunk_cached = -1
+    with self.lock:
+      if self.cached is not None and self.cached[0] == nchunk:
+        self.cached = None
 
   def flush(self, chunk_):
     """Flush the leftover chunk."""
@@ -743,30 +831,31 @@ cdef class carray:
           resized to 0.
         * 'a' for append (possible data inside `rootdir` will not be removed).
 
+  Notes
+  -----
+  Reading a carray (`__getitem__`, `iter`, `where` and `wheretrue`) is
+  safe from several threads at once.  Every iterator keeps its own
+  cursor state.  Modifications are not synchronized, so writers need
+  to be serialized by the caller.
+
   """
 
   cdef public int itemsize, atomsize
   cdef int _chunksize, _chunklen, leftover
-  cdef int nrowsinbuf, _row
-  cdef int sss_mode, wheretrue_mode, where_mode
-  cdef npy_intp startb, stopb
-  cdef npy_intp start, stop, step, nextelement
-  cdef npy_intp _nrow, nrowsread
   cdef npy_intp _nbytes, _cbytes
-  cdef npy_intp nhits, limit, skip
   cdef npy_intp expectedlen
   cdef char *lastchunk
-  cdef object lastchunkarr, where_arr, arr1
+  cdef object lastchunkarr
   cdef object _cparams, _dflt
   cdef object _dtype
   cdef public object chunks
   cdef object _rootdir, datadir, metadir, _mode
   cdef object _attrs
-  cdef ndarray iobuf, where_buf
-  # For block cache
-  cdef int idxcache
-  cdef ndarray blockcache
-  cdef char *datacache
+  # For block cache.  A (idxcache, blockcache) tuple, replaced as a
+  # whole so that concurrent readers always see a consistent block.
+  cdef object blockcache
+  # Number of modifications, see the `version` property
+  cdef npy_intp _version
 
   property leftovers:
     def __get__(self):
@@ -837,6 +926,16 @@ cdef class carray:
       self._mode = value
       self.chunks.mode = value
 
+  property version:
+    """A counter increased by every modification of this object.
+
+    Two reads of the same object return the same data if its version did
+    not change in between.  Modifications done through other objects
+    opened on the same `rootdir` are only counted after a `refresh`.
+    """
+    def __get__(self):
+      return self._version
+
   property nbytes:
     "The original (uncompressed) size of this object (in bytes)."
     def __get__(self):
@@ -892,14 +991,7 @@ cdef class carray:
     # Attach the attrs to this object
     self._attrs = attrs.attrs(self._rootdir, self.mode, _new=_new)
 
-    # Cache a len-1 array for accelerating self[int] case
-    self.arr1 = np.empty(shape=(1,), dtype=self._dtype)
-
-    # Sentinels
-    self.sss_mode = False
-    self.wheretrue_mode = False
-    self.where_mode = False
-    self.idxcache = -1       # cache not initialized
+    self.blockcache = None   # cache not initialized
 
   cdef _adapt_dtype(self, dtype, shape):
     """adapt the dtype to one supported in carray.
@@ -1214,6 +1306,7 @@ cdef class carray:
     if self.mode == "r":
       raise RuntimeError(
         "cannot modify data because mode is '%s'" % self.mode)
+    self._version += 1
 
     arrcpy = utils.to_ndarray(array, self._dtype)
     if arrcpy.dtype != self._dtype.base:
@@ -1324,6 +1417,10 @@ cdef class carray:
       self.resize(self.len - nitems)
       return
 
+    # Trailing chunks are going away.  Mark block cache as dirty.
+    self.blockcache = None
+    self._version += 1
+
     atomsize = self.atomsize
     chunks = self.chunks
     leftover = self.leftover
@@ -1589,12 +1686,14 @@ cdef class carray:
     can be decompressed.  This saves both time and memory.
 
     IMPORTANT: Any update operation (e.g. __setitem__) *must* disable this
-    cache by setting self.idxcache = -2.
+    cache by setting self.blockcache = None.
     """
     cdef int ret, atomsize, blocksize, offset
     cdef int idxcache, posinbytes, blocklen
     cdef npy_intp nchunk, nchunks, chunklen
     cdef chunk chunk_
+    cdef ndarray block
+    cdef object cached
 
     atomsize = self.atomsize
     nchunks = <npy_intp>cython.cdiv(self._nbytes, self._chunksize)
@@ -1616,31 +1715,29 @@ cdef class carray:
       # This request cannot be resolved here
       return 0
 
-    # Check whether the cache block has to be initialized
-    if self.idxcache < 0:
-      self.blockcache = np.empty(shape=(blocklen,), dtype=self._dtype)
-      self.datacache = self.blockcache.data
-      # We don't want this to contribute to cbytes counter!
-      # if self.idxcache == -1:
-      #   # Absolute first time.  Add the cache size to cbytes counter.
-      #   self._cbytes += chunksize
-
-    # Check if block is cached
+    # Check if block is cached.  Take a reference to the cache entry,
+    # so that other threads cannot change it under us.
     idxcache = <npy_intp>cython.cdiv(pos, blocklen) * blocklen
-    if idxcache == self.idxcache:
+    cached = self.blockcache
+    if cached is not None and cached[0] == idxcache:
       # Hit!
+      block = cached[1]
       posinbytes = (pos % blocklen) * atomsize
-      memcpy(dest, self.datacache + posinbytes, atomsize)
+      memcpy(dest, block.data + posinbytes, atomsize)
       return 1
 
-    # No luck. Read a complete block.
+    # No luck. Read a complete block in a fresh buffer (the GIL is
+    # released during decompression, and the cached block may be in use
+    # by another thread).
+    # We don't want this to contribute to cbytes counter!
+    block = np.empty(shape=(blocklen,), dtype=self._dtype)
     offset = idxcache % chunklen
-    chunk_._getitem(offset, offset+blocklen, self.datacache)
+    chunk_._getitem(offset, offset+blocklen, block.data)
     # Copy the interesting bits to dest
     posinbytes = (pos % blocklen) * atomsize
-    memcpy(dest, self.datacache + posinbytes, atomsize)
-    # Update the cache index
-    self.idxcache = idxcache
+    memcpy(dest, block.data + posinbytes, atomsize)
+    # Publish the new block
+    self.blockcache = (idxcache, block)
     return 1
 
   def getitem_object(self, start, stop=None, step=None):
@@ -1696,9 +1793,10 @@ cdef class carray:
         key += self.len
       if key >= self.len:
         raise IndexError, "index out of range"
-      arr1 = self.arr1
       if self.dtype.char == 'O':
         return self.getitem_object(key)
+      # A private len-1 buffer, so that concurrent calls do not clash
+      arr1 = np.empty(shape=(1,), dtype=self._dtype)
       if self.getitem_cache(key, arr1.data):
         if self.itemsize == self.atomsize:
           return PyArray_GETITEM(arr1, arr1.data)
@@ -1834,9 +1932,8 @@ cdef class carray:
         "cannot modify data because mode is '%s'" % self.mode)
 
     # We are going to modify data.  Mark block cache as dirty.
-    if self.idxcache >= 0:
-      # -2 means that cbytes counter has not to be changed
-      self.idxcache = -2
+    self.blockcache = None
+    self._version += 1
 
     # Check for integer
     # isinstance(key, int) is not enough in Cython (?)
@@ -2047,26 +2144,7 @@ cdef class carray:
     assert (nwrow == vlen)
 
   def __iter__(self):
-
-    if not self.sss_mode:
-      self.start = 0
-      self.stop = <npy_intp>cython.cdiv(self._nbytes, self.atomsize)
-      self.step = 1
-    if not (self.sss_mode or self.where_mode or self.wheretrue_mode):
-      self.nhits = 0
-      self.limit = sys.maxint
-      self.skip = 0
-    # Initialize some internal values
-    self.startb = 0
-    self.nrowsread = self.start
-    self._nrow = self.start - self.step
-    self._row = -1  # a sentinel
-    if self.where_mode and isinstance(self.where_arr, carray):
-      self.nrowsinbuf = self.where_arr.chunklen
-    else:
-      self.nrowsinbuf = self._chunklen
-
-    return self
+    return carray_iter(self, 0, self.len, 1)
 
   def iter(self, start=0, stop=None, step=1, limit=None, skip=0):
     """
@@ -2101,14 +2179,8 @@ cdef class carray:
     # Check limits
     if step <= 0:
       raise NotImplementedError, "step param can only be positive"
-    self.start, self.stop, self.step = \
-        slice(start, stop, step).indices(self.len)
-    self.reset_sentinels()
-    self.sss_mode = True
-    if limit is not None:
-      self.limit = limit + skip
-    self.skip = skip
-    return iter(self)
+    start, stop, step = slice(start, stop, step).indices(self.len)
+    return carray_iter(self, start, stop, step, limit=limit, skip=skip)
 
   def wheretrue(self, limit=None, skip=0):
     """
@@ -2140,12 +2212,8 @@ cdef class carray:
       raise ValueError, "`self` is not an array of booleans"
     if self.ndim > 1:
       raise NotImplementedError, "`self` is not unidimensional"
-    self.reset_sentinels()
-    self.wheretrue_mode = True
-    if limit is not None:
-      self.limit = limit + skip
-    self.skip = skip
-    return iter(self)
+    return carray_iter(self, 0, self.len, 1, limit=limit, skip=skip,
+                       wheretrue=True)
 
   def where(self, boolarr, limit=None, skip=0):
     """
@@ -2183,13 +2251,169 @@ cdef class carray:
       raise ValueError, "`boolarr` is not an array of booleans"
     if len(boolarr) != self.len:
       raise ValueError, "`boolarr` must be of the same length than ``self``"
-    self.reset_sentinels()
-    self.where_mode = True
-    self.where_arr = boolarr
+    return carray_iter(self, 0, self.len, 1, limit=limit, skip=skip,
+                       where_arr=boolarr)
+
+  def _update_disk_sizes(self):
+    """Update the sizes on-disk.
+
+    The sizes file is the manifest that readers use to pick up appended
+    data (see `refresh`), so it is replaced atomically.
+    """
+    sizes = dict()
+    if self._rootdir:
+      sizes['shape'] = self.shape
+      sizes['nbytes'] = self.nbytes
+      sizes['cbytes'] = self.cbytes
+      rowsf = os.path.join(self.metadir, SIZES_FILE)
+      utils.atomic_write(rowsf, json.dumps(sizes) + '\n')
+
+  def refresh(self):
+    """
+    refresh()
+
+    Pick up the data appended to a disk-based carray since it was opened.
+
+    Another process may be appending to the carray.  Each time it
+    flushes, the new sizes are published atomically, and this call
+    makes them visible here.  Only the new leftover chunk is read; the
+    rest of the new chunks are read when accessed.  Only carrays opened
+    in the 'r' mode can be refreshed.
+
+    Returns
+    -------
+    out : int
+        The new length of the carray.
+
+    """
+    cdef ndarray lastchunkarr
+    cdef npy_intp calen
+
+    if self._rootdir is None or self._dtype.char == 'O':
+      return self.len
+    if self._mode != "r":
+      # The new length would drop the data appended through this
+      # object and not flushed yet
+      raise RuntimeError(
+        "cannot refresh because mode is '%s'" % self._mode)
+    shape, cparams, dtype, dflt, expectedlen, cbytes, chunklen = \
+      self.read_meta()
+    calen = shape[0]
+    if calen == self.len:
+      return calen
+
+    # Read the new leftover in a fresh buffer, so that concurrent readers
+    # keep seeing a consistent (old) snapshot until the switch below
+    lastchunkarr = np.zeros(dtype=self._dtype, shape=(self._chunklen,))
+    self.chunks.read_leftover(calen, lastchunkarr)
+    # Nothing can fail from here on
+    self.chunks.set_len(calen, self._chunklen)
+    self.blockcache = None
+    self._version += 1
+    self.lastchunk = lastchunkarr.data
+    self.lastchunkarr = lastchunkarr
+    self.leftover = (calen % self._chunklen) * self.atomsize
+    self._cbytes = cbytes
+    self._nbytes = calen * self.atomsize
+    return calen
+
+  def flush(self):
+    """Flush data in internal buffers to disk.
+
+    This call should typically be done after performing modifications
+    (__settitem__(), append()) in persistence mode.  If you don't do this, you
+    risk loosing part of your modifications.
+
+    """
+    cdef chunk chunk_
+    cdef npy_intp nchunks
+    cdef int leftover_atoms
+
+    if self._rootdir is None:
+      return
+
+    if self.leftover:
+      leftover_atoms = cython.cdiv(self.leftover, self.atomsize)
+      chunk_ = chunk(self.lastchunkarr[:leftover_atoms], self.dtype,
+                     self.cparams,
+                     _memory = self._rootdir is None)
+      # Flush this chunk to disk
+      self.chunks.flush(chunk_)
+
+    # Finally, update the sizes metadata on-disk
+    self._update_disk_sizes()
+
+  # XXX This does not work.  Will have to realize how to properly
+  # flush buffers before self going away...
+  # def __del__(self):
+  #   # Make a flush to disk if this object get disposed
+  #   self.flush()
+
+  def __str__(self):
+    return array2string(self)
+
+  def __repr__(self):
+    snbytes = utils.human_readable_size(self._nbytes)
+    scbytes = utils.human_readable_size(self._cbytes)
+    cratio = self._nbytes / float(self._cbytes)
+    header = "carray(%s, %s)\n" % (self.shape, self.dtype)
+    header += "  nbytes: %s; cbytes: %s; ratio: %.2f\n" % (
+      snbytes, scbytes, cratio)
+    header += "  cparams := %r\n" % self.cparams
+    if self._rootdir:
+      header += "  rootdir := '%s'\n" % self._rootdir
+    fullrepr = header + str(self)
+    return fullrepr
+
+
+cdef class carray_iter:
+  """
+  carray_iter(carr, start, stop, step, limit=None, skip=0, wheretrue=False, where_arr=None)
+
+  Iterator over the elements of a carray.
+
+  Every iterator holds its own cursor and I/O buffers, so several of
+  them can walk over the same carray at the same time (e.g. from
+  different threads).
+
+  This class is meant to be used only by the `carray` class.
+
+  """
+  cdef carray carr
+  cdef int nrowsinbuf, _row
+  cdef int wheretrue_mode, where_mode
+  cdef npy_intp startb, stopb
+  cdef npy_intp start, stop, step, nextelement
+  cdef npy_intp _nrow, nrowsread
+  cdef npy_intp nhits, limit, skip
+  cdef object where_arr
+  cdef ndarray iobuf, where_buf
+
+  def __cinit__(self, carray carr, npy_intp start, npy_intp stop,
+                npy_intp step, object limit=None, npy_intp skip=0,
+                object wheretrue=False, object where_arr=None):
+    self.carr = carr
+    self.start, self.stop, self.step = start, stop, step
+    self.wheretrue_mode = wheretrue
+    self.where_mode = where_arr is not None
+    self.where_arr = where_arr
+    self.nhits = 0
+    self.limit = sys.maxint
     if limit is not None:
       self.limit = limit + skip
     self.skip = skip
-    return iter(self)
+    # Initialize some internal values
+    self.startb = 0
+    self.nrowsread = self.start
+    self._nrow = self.start - self.step
+    self._row = -1  # a sentinel
+    if self.where_mode and isinstance(self.where_arr, carray):
+      self.nrowsinbuf = self.where_arr.chunklen
+    else:
+      self.nrowsinbuf = carr._chunklen
+
+  def __iter__(self):
+    return self
 
   def __next__(self):
     cdef char *vbool
@@ -2208,7 +2432,7 @@ cdef class carray:
         self._row = self.startb - self.step
 
         # Skip chunks with zeros if in wheretrue_mode
-        if self.wheretrue_mode and self.check_zeros(self):
+        if self.wheretrue_mode and self.check_zeros(self.carr):
           self.nrowsread += self.nrowsinbuf
           self.nextelement += self.nrowsinbuf
           continue
@@ -2224,7 +2448,7 @@ cdef class carray:
             self.nrowsread:self.nrowsread+self.nrowsinbuf]
 
         # Read a data chunk
-        self.iobuf = self[self.nrowsread:self.nrowsread+self.nrowsinbuf]
+        self.iobuf = self.carr[self.nrowsread:self.nrowsread+self.nrowsinbuf]
         self.nrowsread += self.nrowsinbuf
 
         # Check if we can skip this buffer
@@ -2263,29 +2487,19 @@ cdef class carray:
       if self.nhits <= self.skip:
         continue
       # Return the current value in I/O buffer
-      if self.itemsize == self.atomsize:
+      if self.carr.itemsize == self.carr.atomsize:
         return PyArray_GETITEM(
-          self.iobuf, self.iobuf.data + self._row * self.atomsize)
+          self.iobuf, self.iobuf.data + self._row * self.carr.atomsize)
       else:
         return self.iobuf[self._row]
 
     else:
       # Release buffers
-      self.iobuf = np.empty(0, dtype=self._dtype)
-      self.where_buf = np.empty(0, dtype=np.bool_)
-      self.reset_sentinels()
+      self.iobuf = None
+      self.where_buf = None
+      self.where_arr = None
       raise StopIteration        # end of iteration
 
-  cdef reset_sentinels(self):
-    """Reset sentinels for iterator."""
-    self.sss_mode = False
-    self.wheretrue_mode = False
-    self.where_mode = False
-    self.where_arr = None
-    self.nhits = 0
-    self.limit = sys.maxint
-    self.skip = 0
-
   cdef int check_zeros(self, object barr):
     """Check for zeros.  Return 1 if all zeros, else return 0."""
     cdef int bsize
@@ -2306,73 +2520,12 @@ cdef class carray:
       # Check for zero'ed chunks in ndarrays
       ndarr = barr
       bsize = self.nrowsinbuf
-      if self.nrowsread + bsize > self.len:
-        bsize = self.len - self.nrowsread
+      if self.nrowsread + bsize > self.carr.len:
+        bsize = self.carr.len - self.nrowsread
       if check_zeros(ndarr.data + self.nrowsread, bsize):
         return 1
     return 0
 
-  def _update_disk_sizes(self):
-    """Update the sizes on-disk."""
-    sizes = dict()
-    if self._rootdir:
-      sizes['shape'] = self.shape
-      sizes['nbytes'] = self.nbytes
-      sizes['cbytes'] = self.cbytes
-      rowsf = os.path.join(self.metadir, SIZES_FILE)
-      with open(rowsf, 'wb') as rowsfh:
-        rowsfh.write(json.dumps(sizes))
-        rowsfh.write('\n')
-
-  def flush(self):
-    """Flush data in internal buffers to disk.
-
-    This call should typically be done after performing modifications
-    (__settitem__(), append()) in persistence mode.  If you don't do this, you
-    risk loosing part of your modifications.
-
-    """
-    cdef chunk chunk_
-    cdef npy_intp nchunks
-    cdef int leftover_atoms
-
-    if self._rootdir is None:
-      return
-
-    if self.leftover:
-      leftover_atoms = cython.cdiv(self.leftover, self.atomsize)
-      chunk_ = chunk(self.lastchunkarr[:leftover_atoms], self.dtype,
-                     self.cparams,
-                     _memory = self._rootdir is None)
-      # Flush this chunk to disk
-      self.chunks.flush(chunk_)
-
-    # Finally, update the sizes metadata on-disk
-    self._update_disk_sizes()
-
-  # XXX This does not work.  Will have to realize how to properly
-  # flush buffers before self going away...
-  # def __del__(self):
-  #   # Make a flush to disk if this object get disposed
-  #   self.flush()
-
-  def __str__(self):
-    return array2string(self)
-
-  def __repr__(self):
-    snbytes = utils.human_readable_size(self._nbytes)
-    scbytes = utils.human_readable_size(self._cbytes)
-    cratio = self._nbytes / float(self._cbytes)
-    header = "carray(%s, %s)\n" % (self.shape, self.dtype)
-    header += "  nbytes: %s; cbytes: %s; ratio: %.2f\n" % (
-      snbytes, scbytes, cratio)
-    header += "  cparams := %r\n" % self.cparams
-    if self._rootdir:
-      header += "  rootdir := '%s'\n" % self._rootdir
-    fullrepr = header + str(self)
-    return fullrepr
-
-
 
 ## Local Variables:
 ## mode: python
@@ -25,75 +25,159 @@ import utils, attrs, arrayprint
 ROOTDIRS = '__rootdirs__'
 
 class cols(object):
-    """Class for accessing the columns on the ctable object."""
+    """Class for accessing the columns on the ctable object.
+
+    For persistent ctables the column carrays are opened lazily, the
+    first time they are accessed.  The table length and the column
+    dtypes are kept in the `ROOTDIRS` metadata file, so that opening a
+    table does not need to touch any of its columns.
+    """
 
     def __init__(self, rootdir, mode):
         self.rootdir = rootdir
         self.mode = mode
         self.names = []
+        self.len = 0
         self._cols = {}
+        self._dirs = {}
+        self._dtypes = {}
 
-    def read_meta_and_open(self):
-        """Read the meta-information and initialize structures."""
+    def read_meta(self):
+        """Read the meta-information, without changing the structures.
+
+        Returns the names, the directories, the length and the dtypes of
+        the columns.  The last two are None for older versions, which
+        did not save them.
+        """
         # Get the directories of the columns
         rootsfile = os.path.join(self.rootdir, ROOTDIRS)
         with open(rootsfile, 'rb') as rfile:
             data = json.loads(rfile.read())
         # JSON returns unicode (?)
-        self.names = [str(name) for name in data['names']]
-        # Initialize the cols by instatiating the carrays
-        for name, dir_ in data['dirs'].items():
-            self._cols[str(name)] = carray(rootdir=dir_, mode=self.mode)
+        names = [str(name) for name in data['names']]
+        dirs = dict((str(name), str(dir_))
+                    for name, dir_ in data['dirs'].items())
+        dtypes = data.get('dtypes')
+        if 'len' not in data or dtypes is None:
+            return names, dirs, None, None
+        dtypes = dict((str(name), np.dtype(str(dtype)))
+                      for name, dtype in dtypes.items())
+        return names, dirs, data['len'], dtypes
+
+    def read_meta_and_open(self):
+        """Read the meta-information and initialize structures."""
+        self.names, self._dirs, len_, dtypes = self.read_meta()
+        if len_ is not None:
+            self.len = len_
+            self._dtypes = dtypes
+        elif self.names:
+            self.len = len(self[self.names[0]])
 
     def update_meta(self):
         """Update metainfo about directories on-disk."""
-        if not self.rootdir:
+        if not self.rootdir or self.mode == 'r':
             return
-        dirs = dict((n, o.rootdir) for n,o in self._cols.items())
-        data = {'names': self.names, 'dirs': dirs}
+        dtypes = dict((n, str(d)) for n, d in self._dtypes.items())
+        data = {'names': self.names, 'dirs': self._dirs,
+                'len': self.len, 'dtypes': dtypes}
         rootsfile = os.path.join(self.rootdir, ROOTDIRS)
-        with open(rootsfile, 'wb') as rfile:
-            rfile.write(json.dumps(data))
-            rfile.write("\n")
+        # Readers use this file to pick up appended rows, replace it
+        # atomically
+        utils.atomic_write(rootsfile, json.dumps(data) + "\n")
+
+    def refresh(self):
+        """Re-read the meta-information and refresh the open columns.
+
+        The structures are only changed once everything has been read,
+        and the table length last.
+        """
+        names, dirs, len_, dtypes = self.read_meta()
+        # The columns removed by the writer are dropped
+        cols = dict((name, col) for name, col in self._cols.items()
+                    if name in dirs)
+        for col in cols.itervalues():
+            col.refresh()
+        if len_ is None and names:
+            if names[0] in cols:
+                len_ = len(cols[names[0]])
+            else:
+                len_ = len(carray(rootdir=dirs[names[0]], mode=self.mode))
+        if dtypes is None:
+            dtypes = dict((name, dtype) for name, dtype
+                          in self._dtypes.items() if name in dirs)
+
+        self.names, self._dirs, self._dtypes = names, dirs, dtypes
+        self._cols = cols
+        if len_ is not None:
+            self.len = len_
+
+    def dtype(self, name):
+        """Return the dtype of the `name` column without opening it."""
+        if name not in self._dtypes:
+            self._dtypes[name] = self[name].dtype
+        return self._dtypes[name]
+
+    def isopen(self, name):
+        """Whether the `name` column has already been opened."""
+        return name in self._cols
 
     def __getitem__(self, name):
-        return self._cols[name]
+        try:
+            return self._cols[name]
+        except KeyError:
+            if name not in self._dirs:
+                raise
+        # Open the column on first access.  If several threads get here
+        # at the same time, all of them get the first column stored.
+        col = carray(rootdir=self._dirs[name], mode=self.mode)
+        return self._cols.setdefault(name, col)
+
+    def _register(self, name, carray):
+        self._cols[name] = carray
+        self._dirs[name] = carray.rootdir
+        self._dtypes[name] = carray.dtype
 
     def __setitem__(self, name, carray):
         self.names.append(name)
-        self._cols[name] = carray
+        self._register(name, carray)
         self.update_meta()
 
     def __iter__(self):
-        return iter(self._cols)
+        return iter(self.names)
 
     def __len__(self):
         return len(self.names)
 
+    def __contains__(self, name):
+        return name in self.names
+
     def insert(self, name, pos, carray):
         """Insert carray in the specified pos and name."""
         self.names.insert(pos, name)
-        self._cols[name] = carray
+        self._register(name, carray)
         self.update_meta()
 
     def pop(self, name):
         """Return the named column and remove it."""
         pos = self.names.index(name)
         name = self.names.pop(pos)
-        col = self._cols[name]
+        col = self[name]
+        del self._cols[name]
+        self._dirs.pop(name, None)
+        self._dtypes.pop(name, None)
         self.update_meta()
         return col
 
     def __str__(self):
         fullrepr = ""
         for name in self.names:
-            fullrepr += "%s : %s" % (name, str(self._cols[name]))
+            fullrepr += "%s : %s" % (name, str(self[name]))
         return fullrepr
 
     def __repr__(self):
         fullrepr = ""
         for name in self.names:
-            fullrepr += "%s : %s\n" % (name, repr(self._cols[name]))
+            fullrepr += "%s : %s\n" % (name, repr(self[name]))
         return fullrepr
 
 
@@ -146,9 +230,18 @@ class ctable(object):
     def dtype(self):
         "The data type of this object (numpy dtype)."
         names, cols = self.names, self.cols
-        l = [(name, cols[name].dtype) for name in names]
+        l = [(name, cols.dtype(name)) for name in names]
         return np.dtype(l)
 
+    @property
+    def len(self):
+        "The length of this object."
+        return self.cols.len
+
+    @len.setter
+    def len(self, value):
+        self.cols.len = value
+
     @property
     def names(self):
         "The names of the object (list)."
@@ -279,6 +372,7 @@ class ctable(object):
             clen = len(column)
 
         self.len = clen
+        self.cols.update_meta()
 
     def open_ctable(self):
         """Open an existing ctable on-disk."""
@@ -287,11 +381,16 @@ class ctable(object):
             raise ValueError(
                 "you need to pass either a `columns` or a `rootdir` param")
 
-        # Open the ctable by reading the metadata
+        # Open the ctable by reading the metadata.  This also gets the
+        # length, so columns will only be opened when first accessed.
         self.cols.read_meta_and_open()
 
-        # Get the length out of the first column
-        self.len = len(self.cols[self.names[0]])
+        if self.mode == 'w':
+            # Opening the columns in 'w' mode empties them
+            for name in self.names:
+                self.cols[name]
+            self.len = 0
+            self.cols.update_meta()
 
     def mkdir_rootdir(self, rootdir, mode):
         """Create the `self.rootdir` directory safely."""
@@ -378,6 +477,7 @@ class ctable(object):
         for name in self.names:
             self.cols[name].trim(nitems)
         self.len -= nitems
+        self.cols.update_meta()
 
     def resize(self, nitems):
         """
@@ -397,6 +497,7 @@ class ctable(object):
         for name in self.names:
             self.cols[name].resize(nitems)
         self.len = nitems
+        self.cols.update_meta()
 
     def addcol(self, newcol, name=None, pos=None, **kwargs):
         """
@@ -903,7 +1004,38 @@ class ctable(object):
 
         """
         for name in self.names:
-            self.cols[name].flush()
+            # Columns that were never opened have nothing to flush
+            if self.cols.isopen(name):
+                self.cols[name].flush()
+        # The table length is published last, after all the column data
+        self.cols.update_meta()
+
+    def refresh(self):
+        """
+        refresh()
+
+        Pick up the rows appended to a disk-based ctable since it was
+        opened.
+
+        Another process may be appending to the ctable.  Each time it
+        flushes, the columns are written before the table length, so
+        after this call all the rows up to the new length are readable.
+        Only ctables opened in the 'r' mode can be refreshed.
+
+        Returns
+        -------
+        out : int
+            The new length of the ctable.
+
+        """
+        if self.rootdir is not None:
+            if self.mode != 'r':
+                # The new length would drop the rows appended through
+                # this object and not flushed yet
+                raise RuntimeError(
+                    "cannot refresh because mode is '%s'" % self.mode)
+            self.cols.refresh()
+        return self.len
 
     def _get_stats(self):
         """
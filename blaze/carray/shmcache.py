@@ -0,0 +1,238 @@
+########################################################################
+#
+#       License: BSD
+#
+########################################################################
+
+"""Decompressed chunk cache shared between processes.
+
+Processes scanning the same persistent carrays decompress the very same
+chunks over and over.  When enabled, this cache keeps decompressed chunks
+as files in a shared memory filesystem (``/dev/shm`` by default), so the
+first process to decompress a chunk publishes it and the others just map
+it in memory::
+
+    from blaze.carray import shmcache
+    shmcache.enable(maxbytes=512*2**20)
+
+Entries are indexed by the carray directory, the chunk number and a
+version token, the hash of the compressed chunk on-disk, so rewritten
+chunks are never served stale.
+
+Publishing is lock-free: an entry is written to a private temporary
+file and atomically renamed into place.  Readers map the files
+read-only, and a mapping stays valid even if the entry is evicted
+afterwards.  Eviction is LRU, based on the modification time of the
+entries (touched on every hit), and is done by a single process at a
+time under an advisory lock.
+"""
+
+import os, os.path
+import mmap
+import fcntl
+import struct
+import hashlib
+import tempfile
+
+import numpy as np
+
+_MB = 1024*1024
+
+SHM_ROOT = '/dev/shm'
+LOCK_FILE = '.lock'
+TMP_SUFFIX = '.tmp'
+
+# Header of every entry: magic, nbytes, cbytes, blocksize
+MAGIC = 'bzch'
+HEADER = struct.Struct('<4sQQQ')
+
+
+class SharedChunk(object):
+    """A decompressed chunk mapped from the shared cache.
+
+    `data` is a read-only uint8 NumPy array on top of the mapping.
+    `cbytes` and `blocksize` are the ones of the original compressed
+    chunk.
+    """
+
+    __slots__ = ('data', 'nbytes', 'cbytes', 'blocksize')
+
+    def __init__(self, data, cbytes, blocksize):
+        self.data = data
+        self.nbytes = len(data)
+        self.cbytes = cbytes
+        self.blocksize = blocksize
+
+
+class SharedChunkCache(object):
+    """
+    SharedChunkCache(name='blaze-chunks', maxbytes=256*2**20, root=None)
+
+    A cache of decompressed chunks shared by all the processes using
+    the same `name` and `root`.
+
+    Parameters
+    ----------
+    name : string
+        The name of the cache directory.
+    maxbytes : int
+        The maximum size of the cache, in (uncompressed) bytes.
+    root : string
+        The directory where the cache lives.  The default is
+        ``/dev/shm``, or the temporary directory if it does not exist.
+
+    """
+
+    def __init__(self, name='blaze-chunks', maxbytes=256*_MB, root=None):
+        if root is None:
+            root = SHM_ROOT if os.path.isdir(SHM_ROOT) else \
+                   tempfile.gettempdir()
+        self.dirname = os.path.join(root, name)
+        self.maxbytes = maxbytes
+        # Bytes published by this process since the last eviction
+        self._published = 0
+        if not os.path.isdir(self.dirname):
+            try:
+                os.mkdir(self.dirname)
+            except OSError:
+                # Another process may have created it in the meantime
+                if not os.path.isdir(self.dirname):
+                    raise
+
+    def _entryname(self, path, nchunk, version):
+        key = '%s\0%d\0%s' % (os.path.abspath(path), nchunk, version)
+        return os.path.join(self.dirname, hashlib.sha1(key).hexdigest())
+
+    def get(self, path, nchunk, version):
+        """Return the `nchunk` chunk of `path` as a `SharedChunk`.
+
+        None is returned if the chunk is not in the cache.
+        """
+        fname = self._entryname(path, nchunk, version)
+        try:
+            fd = os.open(fname, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER.size:
+                return None
+            mm = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        magic, nbytes, cbytes, blocksize = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or size != HEADER.size + nbytes:
+            return None
+        # Mark as recently used
+        try:
+            os.utime(fname, None)
+        except OSError:
+            pass
+        data = np.frombuffer(mm, dtype=np.uint8, count=nbytes,
+                             offset=HEADER.size)
+        return SharedChunk(data, cbytes, blocksize)
+
+    def put(self, path, nchunk, version, udata, cbytes, blocksize):
+        """Publish the decompressed `udata` string as the `nchunk` chunk
+        of `path`."""
+        fname = self._entryname(path, nchunk, version)
+        fd, tmpname = tempfile.mkstemp(suffix=TMP_SUFFIX, dir=self.dirname)
+        try:
+            with os.fdopen(fd, 'wb') as tmpfile:
+                tmpfile.write(HEADER.pack(MAGIC, len(udata), cbytes,
+                                          blocksize))
+                tmpfile.write(udata)
+            os.rename(tmpname, fname)
+        except:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
+        # Do not scan the cache on every publication
+        self._published += len(udata)
+        if self._published > self.maxbytes // 8:
+            self.evict()
+
+    def entries(self):
+        """Return a list of (atime, size, filename) for the entries."""
+        entries = []
+        for name in os.listdir(self.dirname):
+            if name == LOCK_FILE or name.endswith(TMP_SUFFIX):
+                continue
+            fname = os.path.join(self.dirname, name)
+            try:
+                st = os.stat(fname)
+            except OSError:
+                # Evicted by another process
+                continue
+            entries.append((st.st_mtime, st.st_size, fname))
+        return entries
+
+    def evict(self, maxbytes=None):
+        """Remove the least recently used entries until the cache is
+        under `maxbytes` (by default, the size of the cache)."""
+        if maxbytes is None:
+            maxbytes = self.maxbytes
+        self._published = 0
+        lockfile = os.path.join(self.dirname, LOCK_FILE)
+        with open(lockfile, 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                # Somebody else is evicting already
+                return
+            try:
+                entries = self.entries()
+                total = sum(size for _, size, _ in entries)
+                entries.sort()
+                for _, size, fname in entries:
+                    if total <= maxbytes:
+                        break
+                    try:
+                        os.remove(fname)
+                    except OSError:
+                        pass
+                    total -= size
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def clear(self):
+        """Remove all the entries in the cache."""
+        self.evict(maxbytes=0)
+
+    def __len__(self):
+        return len(self.entries())
+
+    def __repr__(self):
+        return "SharedChunkCache(%r, maxbytes=%d)" % (
+            self.dirname, self.maxbytes)
+
+
+# The cache used by the disk-based carrays in this process
+_cache = None
+
+def enable(name='blaze-chunks', maxbytes=256*_MB, root=None):
+    """
+    enable(name='blaze-chunks', maxbytes=256*2**20, root=None)
+
+    Start using a shared chunk cache for disk-based carrays.
+
+    See `SharedChunkCache` for the meaning of the parameters.
+
+    Returns
+    -------
+    out : SharedChunkCache
+        The cache in use.
+
+    """
+    global _cache
+    _cache = SharedChunkCache(name, maxbytes, root)
+    return _cache
+
+def disable():
+    """Stop using the shared chunk cache in this process."""
+    global _cache
+    _cache = None
+
+def get_cache():
+    """Return the shared chunk cache in use, or None."""
+    return _cache
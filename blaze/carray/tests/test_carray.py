@@ -503,6 +503,18 @@ class miscTest(MayBeDiskTest, TestCase):
         self.assert_(sys.getsizeof(b) > b.nbytes,
                      "carray compress too much??")
 
+    def test03(self):
+        """Testing that modifications increase the version"""
+        b = ca.carray(np.arange(111), rootdir=self.rootdir)
+        versions = [b.version]
+        b[:]
+        self.assert_(b.version == versions[-1], "Reads changed version")
+        for modify in (lambda: b.append([1]), lambda: b.__setitem__(3, 0),
+                       lambda: b.trim(2), lambda: b.resize(200)):
+            modify()
+            self.assert_(b.version > versions[-1], "Version not increased")
+            versions.append(b.version)
+
 class miscDiskTest(miscTest):
     disk = True
 
@@ -654,6 +666,30 @@ class iterTest(MayBeDiskTest, TestCase):
         #print "c ->", repr(c)
         assert_array_equal(a[1010:2020], c, "iterator fails on zeros")
 
+    def test08(self):
+        """Testing nested `iter()` calls on the same object"""
+        a = np.arange(10)
+        b = ca.carray(a, chunklen=3, rootdir=self.rootdir)
+        pairs = [(i, j) for i in b for j in b.iter(7)]
+        self.assert_(pairs == [(i, j) for i in a for j in a[7:]],
+                     "Nested iterators interfere")
+
+    def test09(self):
+        """Testing `iter()` and `__getitem__()` from several threads"""
+        import threading
+        a = np.arange(1e4, dtype='f8')
+        b = ca.carray(a, chunklen=100, rootdir=self.rootdir)
+        results = []
+        def reader():
+            results.append(sum(b) + sum(b[i] for i in xrange(0, len(a), 7)))
+        threads = [threading.Thread(target=reader) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        expected = sum(a) + sum(a[::7])
+        self.assert_(results == [expected]*4, "Sums are not equal")
+
 class iterDiskTest(iterTest):
     disk = True
 
@@ -1333,6 +1369,62 @@ class persistenceTest(MayBeDiskTest, TestCase):
         cn[N+1] = 3
         self.assert_(cn[N+1] == 3)
 
+    def test03a(self):
+        """Refreshing a reader after a writer appends."""
+
+        a = np.arange(1005)
+        cw = ca.carray(a, chunklen=100, rootdir=self.rootdir)
+        cr = ca.carray(rootdir=self.rootdir, mode='r')
+        self.assert_(len(cr) == len(a))
+
+        # Appends are not visible until flushed and refreshed
+        cw.append(np.arange(1005, 1250))
+        self.assert_(len(cr) == len(a))
+        self.assert_(cr.refresh() == len(a))
+        cw.flush()
+        a = np.arange(1250)
+        self.assert_(cr.refresh() == len(a))
+        assert_array_equal(cr[:], a, "Arrays are not equal")
+        self.assert_(sum(cr) == sum(a), "Sums are not equal")
+        self.assert_(cr.cbytes == cw.cbytes)
+
+    def test03b(self):
+        """Refreshing a reader whose last chunk was cached."""
+
+        a = np.arange(150)
+        cw = ca.carray(a, chunklen=100, rootdir=self.rootdir)
+        cr = ca.carray(rootdir=self.rootdir, mode='r')
+        self.assert_(cr[120] == 120)
+        cw.append(np.arange(150, 350))
+        cw.flush()
+        a = np.arange(350)
+        self.assert_(cr.refresh() == len(a))
+        assert_array_equal(cr[:], a, "Arrays are not equal")
+        self.assert_(cr[120] == 120)
+
+    def test03c(self):
+        """Refreshing a writer is refused."""
+
+        a = np.arange(150)
+        cw = ca.carray(a, chunklen=100, rootdir=self.rootdir)
+        cw.append(np.arange(150, 170))
+        self.assertRaises(RuntimeError, cw.refresh)
+        # The appended data is kept
+        assert_array_equal(cw[:], np.arange(170), "Arrays are not equal")
+
+    def test03d(self):
+        """Chunks are written with the permissions of a plain file."""
+
+        cw = ca.carray(np.arange(150), chunklen=100, rootdir=self.rootdir)
+        chunkfile = os.path.join(self.rootdir, 'data', '__0.blp')
+        plainfile = os.path.join(self.rootdir, 'plain')
+        open(plainfile, 'wb').close()
+        self.assertEqual(os.stat(chunkfile).st_mode,
+                         os.stat(plainfile).st_mode)
+        # No temporary file is left behind
+        datadir = os.path.join(self.rootdir, 'data')
+        self.assertEqual(sorted(os.listdir(datadir)), ['__0.blp', '__1.blp'])
+
 
 ## Local Variables:
 ## mode: python
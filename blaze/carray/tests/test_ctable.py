@@ -206,6 +206,62 @@ class persistentTest(MayBeDiskTest, TestCase):
         self.assertRaises(RuntimeError, ca.ctable, (a, b), ('f0', 'f1'),
                           rootdir=self.rootdir, mode='a')
 
+    def test02a(self):
+        """Testing that ctable opening does not open the columns"""
+        N = 1e1
+        a = ca.carray(np.arange(N, dtype='i4'))
+        b = ca.carray(np.arange(N, dtype='f8')+1)
+        t = ca.ctable((a, b), ('f0', 'f1'), rootdir=self.rootdir)
+        # Open t
+        t = ca.open(rootdir=self.rootdir, mode='r')
+        self.assertEqual(len(t), N)
+        self.assertEqual(t.dtype, np.dtype('i4,f8'))
+        self.assertFalse(t.cols.isopen('f0'))
+        self.assertFalse(t.cols.isopen('f1'))
+        # Only the accessed column is opened
+        assert_array_equal(t['f1'][:], b[:], "column values are not correct")
+        self.assertFalse(t.cols.isopen('f0'))
+        self.assertTrue(t.cols.isopen('f1'))
+
+    def test02b(self):
+        """Testing that the ctable length is kept on-disk after appends"""
+        N = 1e1
+        a = ca.carray(np.arange(N, dtype='i4'))
+        b = ca.carray(np.arange(N, dtype='f8')+1)
+        t = ca.ctable((a, b), ('f0', 'f1'), rootdir=self.rootdir)
+        t.append((10, 11.0))
+        t.flush()
+        # Open t
+        t = ca.open(rootdir=self.rootdir, mode='r')
+        self.assertEqual(len(t), N+1)
+        self.assertEqual(t['f0'][-1], 10)
+        self.assertEqual(t['f1'][-1], 11.0)
+
+    def test02c(self):
+        """Testing that a ctable reader picks up appended rows"""
+        N = 100
+        ra = np.fromiter(((i, i*2.) for i in xrange(N)), dtype='i4,f8')
+        tw = ca.ctable(ra, rootdir=self.rootdir)
+        tr = ca.open(rootdir=self.rootdir, mode='r')
+        self.assertEqual(tr.refresh(), N)
+        tr['f0']
+        tw.append((N, N*2.))
+        tw.flush()
+        self.assertEqual(len(tr), N)
+        self.assertEqual(tr.refresh(), N+1)
+        self.assertEqual(len(tr['f0']), N+1)
+        self.assertEqual(tr['f0'][-1], N)
+        self.assertEqual(tr['f1'][-1], N*2.)
+
+    def test02d(self):
+        """Testing that refreshing a ctable writer is refused"""
+        N = 100
+        ra = np.fromiter(((i, i*2.) for i in xrange(N)), dtype='i4,f8')
+        tw = ca.ctable(ra, rootdir=self.rootdir)
+        tw.append((N, N*2.))
+        self.assertRaises(RuntimeError, tw.refresh)
+        self.assertEqual(len(tw), N+1)
+
 
 class add_del_colTest(MayBeDiskTest, TestCase):
 
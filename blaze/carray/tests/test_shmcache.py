@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import shutil
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+import blaze.carray as ca
+from blaze.carray import shmcache
+from common import MayBeDiskTest
+
+
+class shmcacheTest(MayBeDiskTest, TestCase):
+
+    disk = True
+
+    def setUp(self):
+        MayBeDiskTest.setUp(self)
+        self.shmroot = tempfile.mkdtemp(prefix='shmcache')
+        self.cache = shmcache.enable(root=self.shmroot)
+
+    def tearDown(self):
+        shmcache.disable()
+        shutil.rmtree(self.shmroot)
+        MayBeDiskTest.tearDown(self)
+
+    def test00(self):
+        """Testing that chunks are published in the shared cache"""
+        a = np.arange(1000)
+        b = ca.carray(a, chunklen=100, rootdir=self.rootdir)
+        assert_array_equal(b[:], a, "Arrays are not equal")
+        self.assert_(len(self.cache) == 10)
+        # A new handle reads the chunks from the cache
+        b = ca.open(rootdir=self.rootdir, mode='r')
+        assert_array_equal(b[:], a, "Arrays are not equal")
+        self.assert_(sum(b) == sum(a), "Sums are not equal")
+        self.assert_(b[555] == a[555], "Values are not equal")
+
+    def test01(self):
+        """Testing that modified chunks are not served stale"""
+        a = np.arange(1000)
+        b = ca.carray(a, chunklen=100, rootdir=self.rootdir)
+        b[:]
+        b[150] = -1
+        a[150] = -1
+        b = ca.open(rootdir=self.rootdir)
+        assert_array_equal(b[:], a, "Arrays are not equal")
+
+    def test01b(self):
+        """Testing that chunks rewritten with the same stat are not stale"""
+        # Random bytes are stored uncompressed, with a fixed size
+        a = np.random.randint(0, 256, 1000).astype('u1')
+        b = ca.carray(a, chunklen=100, rootdir=self.rootdir)
+        old = os.path.join(self.rootdir, 'data', '__1.blp')
+        os.utime(old, (1, 1))
+        b[:]
+        # Rewrite a chunk in place, with the same size and mtime
+        a2 = np.random.randint(0, 256, 1000).astype('u1')
+        c = ca.carray(a2, chunklen=100, rootdir=self.rootdir + '-new')
+        new = os.path.join(c.rootdir, 'data', '__1.blp')
+        data = open(new, 'rb').read()
+        self.assert_(len(data) == os.stat(old).st_size)
+        with open(old, 'r+b') as f:
+            f.write(data)
+        os.utime(old, (1, 1))
+        shutil.rmtree(c.rootdir)
+        a[100:200] = a2[100:200]
+        b = ca.open(rootdir=self.rootdir)
+        assert_array_equal(b[:], a, "Arrays are not equal")
+
+    def test02(self):
+        """Testing eviction in the shared cache"""
+        a = np.arange(1000)
+        b = ca.carray(a, chunklen=100, rootdir=self.rootdir)
+        b[:]
+        entrysize = self.cache.entries()[0][1]
+        self.cache.evict(maxbytes=entrysize*4)
+        self.assert_(len(self.cache) == 4)
+        self.cache.clear()
+        self.assert_(len(self.cache) == 0)
+        assert_array_equal(b[:], a, "Arrays are not equal")
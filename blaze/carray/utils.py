@@ -9,7 +9,7 @@
 """Utility functions (mostly private).
 """
 
-import sys, os, os.path, subprocess, math
+import sys, os, os.path, subprocess, math, errno, binascii
 from time import time, clock
 import numpy as np
 
@@ -126,6 +126,33 @@ def to_ndarray(array, dtype, arrlen=None):
 
     return array
 
+def atomic_write(filename, data):
+    """Write `data` into `filename` atomically.
+
+    Data goes to a temporary file first, which is then renamed into
+    place, so readers either see the previous contents or the new ones.
+    """
+    dirname, basename = os.path.split(filename)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        tmpname = os.path.join(dirname, '%s.%s.tmp' % (
+            basename, binascii.hexlify(os.urandom(8))))
+        try:
+            # Created with the usual permissions, the umask is applied
+            # by the system
+            fd = os.open(tmpname, flags, 0666)
+            break
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+    try:
+        with os.fdopen(fd, 'wb') as tmpfile:
+            tmpfile.write(data)
+        os.rename(tmpname, filename)
+    except:
+        os.remove(tmpname)
+        raise
+
 def human_readable_size(size):
     """Return a string for better assessing large number of bytes."""
     if size < 2**10:
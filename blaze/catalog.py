@@ -30,6 +30,11 @@ PyArray_WriteMethods = [
     'fill', 'itemset', 'put', 'setflags', 'setfield'
 ]
 
+# Read methods reducing the array, which apply to any expression
+PyArray_ReductionMethods = [
+    'all', 'any', 'max', 'mean', 'min', 'prod', 'std', 'sum', 'var'
+]
+
 PyArray_ReadMethods = [
     'all', 'any', 'argmax', 'argmin', 'argsort', 'astype', 'base', 'byteswap',
     'choose', 'clip', 'compress', 'conj', 'conjugate', 'copy', 'ctypes',
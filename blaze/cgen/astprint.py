@@ -30,6 +30,21 @@ BINOP_SYMBOLS = {
     BitXor:     '^'
 }
 
+# The binding strength of the binary operators, all left associative
+BINOP_PRECEDENCE = {
+    BitOr:      1,
+    BitXor:     2,
+    BitAnd:     3,
+    LShift:     4,
+    RShift:     4,
+    Add:        5,
+    Sub:        5,
+    Mult:       6,
+    Div:        6,
+    FloorDiv:   6,
+    Mod:        6,
+}
+
 CMPOP_SYMBOLS = {
     Eq:         '==',
     Gt:         '>',
@@ -437,9 +452,22 @@ class SourceGenerator(NodeVisitor):
         self.write('}')
 
     def visit_BinOp(self, node):
-        self.visit(node.left)
+        precedence = BINOP_PRECEDENCE[type(node.op)]
+        self.visit_operand(node.left, precedence)
         self.write(' %s ' % BINOP_SYMBOLS[type(node.op)])
-        self.visit(node.right)
+        # a - (b - c) keeps its parentheses
+        self.visit_operand(node.right, precedence + 1)
+
+    def visit_operand(self, node, precedence):
+        """ Visit an operand, parenthesized if it binds less tightly
+        than `precedence`. """
+        if isinstance(node, BinOp) and \
+           BINOP_PRECEDENCE[type(node.op)] < precedence:
+            self.write('(')
+            self.visit(node)
+            self.write(')')
+        else:
+            self.visit(node)
 
     def visit_BoolOp(self, node):
         self.write('(')
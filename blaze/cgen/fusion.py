@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""
+Elementwise kernels fused from expression trees.
+
+An expression tree over arrays is turned into a single
+``ElementwiseKernel`` so the whole tree is evaluated in one pass over
+memory::
+
+    a*b + c*d - e
+
+    def fused (in0 : array[float], ..., in4 : array[float], n : int,
+               out : array[float]) -> void {
+        var int i0 = 0;
+        for i0 in range(0, n) {
+            out[i0] = in0[i0] * in1[i0] + in2[i0] * in3[i0] - in4[i0];
+        }
+    }
+
+Trees are nested tuples::
+
+    ('in', index)
+    ('const', value)
+    ('op', name, ufunc, children)
+
+BLIR only knows about double precision floats, so the native kernel is
+used when all the inputs are contiguous float64 vectors, and the tree is
+evaluated with the NumPy ufuncs otherwise.
+"""
+
+import numpy as np
+
+from kernels import ElementwiseKernel, VectorArg, ScalarArg, IN, OUT
+
+try:
+    from blaze.blir import compile, Context, execute
+    have_blir = True
+except ImportError:
+    have_blir = False
+
+# BLIR expressions for the fusable operators, by operator name
+blir_ops = {
+    'Add' : '(%s + %s)',
+    'Sub' : '(%s - %s)',
+    'Mul' : '(%s * %s)',
+    'Div' : '(%s / %s)',
+    'Pow' : 'pow(%s, %s)',
+    'Abs' : 'abs(%s)',
+}
+
+# Compiled contexts, by kernel source, shared by all the fused kernels
+_contexts = {}
+
+def blir_const(value):
+    """ Return the BLIR literal for `value`, or None if it can not be
+    written as one. """
+    if isinstance(value, bool) or not isinstance(value, (int, long, float)):
+        return None
+    literal = repr(float(value))
+    # The BLIR lexer does not know about exponents, infs or nans
+    if not literal.replace('.', '').lstrip('-').isdigit():
+        return None
+    return literal
+
+def blir_expr(tree):
+    kind = tree[0]
+    if kind == 'in':
+        return 'in%i[i0]' % tree[1]
+    elif kind == 'const':
+        return blir_const(tree[1])
+    else:
+        _, name, _, children = tree
+        return blir_ops[name] % tuple(blir_expr(c) for c in children)
+
+def evaluate(tree, inputs):
+    """ Evaluate the tree with NumPy. """
+    kind = tree[0]
+    if kind == 'in':
+        return inputs[tree[1]]
+    elif kind == 'const':
+        return tree[1]
+    else:
+        _, _, ufunc, children = tree
+        return ufunc(*[evaluate(c, inputs) for c in children])
+
+class FusedKernel(object):
+    """
+    A callable evaluating an expression tree over `ninputs` arrays.
+
+    Parameters
+    ----------
+    tree : tuple
+        The expression tree, see the module docstring.
+    ninputs : int
+        The number of input arrays.
+    """
+
+    def __init__(self, tree, ninputs, name='fused'):
+        self.tree = tree
+        self.ninputs = ninputs
+        self.name = name
+
+        arguments = [(IN, VectorArg(('n',), 'array[float]', 'in%i' % i))
+                     for i in xrange(ninputs)]
+        arguments.append((IN, ScalarArg('int', 'n')))
+        arguments.append((OUT, VectorArg(('n',), 'array[float]', 'out')))
+        operation = 'out[i0] = %s' % blir_expr(tree)
+        self.kernel = ElementwiseKernel(arguments, operation, name=name)
+        self.source = str(self.kernel)
+        self._context = None
+
+    @property
+    def context(self):
+        """ The BLIR context of the kernel, compiled on first use. """
+        if self._context is None:
+            if self.source not in _contexts:
+                self.kernel.verify()
+                _, env = compile(self.source)
+                _contexts[self.source] = Context(env)
+            self._context = _contexts[self.source]
+        return self._context
+
+    def native(self, inputs):
+        """ Whether the native kernel can be used on `inputs`. """
+        if not have_blir or not inputs:
+            return False
+        n = None
+        for a in inputs:
+            if not (isinstance(a, np.ndarray) and a.dtype == np.float64
+                    and a.ndim == 1 and a.flags.contiguous):
+                return False
+            if n is None:
+                n = len(a)
+            elif len(a) != n:
+                return False
+        return True
+
+    def __call__(self, *inputs):
+        if not self.native(inputs):
+            return evaluate(self.tree, inputs)
+        n = len(inputs[0])
+        out = np.empty(n, dtype=np.float64)
+        execute(self.context, args=list(inputs) + [n, out], fname=self.name)
+        return out
+
+    def __repr__(self):
+        return 'FusedKernel(%s)' % blir_expr(self.tree)
@@ -0,0 +1,678 @@
+"""
+Compile Blaze expression graphs into chunked execution plans.
+
+The graph built by the ``ExpressionNode`` operator overloads is flattened
+into a list of instructions in dependency order.  Every instruction
+computes one value from the values of previous instructions::
+
+    a + b*2
+
+    %0 = load 0          # chunk of the first leaf source
+    %1 = load 1          # chunk of the second leaf source
+    %2 = const 2
+    %3 = Mul %1 %2
+    %4 = Add %0 %3
+
+The plan is run by the runtime (``blaze.rts.execution``) once for every
+block in the schedule, which is aligned with the chunks of the leaf
+sources.  A full reduction at the root of the graph is split off the
+plan and applied incrementally to the result of every block.
+
+When BLIR is available, maximal elementwise subtrees of the plan are
+fused into a single kernel (see ``blaze.cgen.fusion``), so that
+``a*b + c*d - e`` makes one pass over every block instead of four::
+
+    %0 = load 0
+    ...
+    %4 = load 4
+    %5 = Fused %0 %1 %2 %3 %4
+
+Filters of the rows of a table, ``t[t['x'] > 5]``, are compiled into a
+``Selection``: a plan computing the predicate over the columns it uses,
+and the columns to copy from the blocks where it holds.
+"""
+
+from numbers import Integral
+from collections import namedtuple, Counter
+
+from blaze.expr import graph
+from blaze.expr.ops import ReductionOp
+from blaze.error import ExecutionError
+from blaze.rts.aggregates import aggregates
+from blaze.rts.ufuncs import ufuncs
+from blaze.opt import optimize
+from blaze.cgen import fusion
+from blaze.layouts.scalar import ChunkedL
+from blaze.sources.chunked import CArraySource, CTableSource
+
+#------------------------------------------------------------------------
+# Plans
+#------------------------------------------------------------------------
+
+LOAD  = 'load'
+CONST = 'const'
+CALL  = 'call'
+
+# ``arg`` is the leaf index for LOAD, the value for CONST and the
+# function for CALL.  ``operands`` are instruction indices.
+Instruction = namedtuple('Instruction', 'opcode, arg, operands, name')
+
+class Plan(object):
+    """
+    A flat list of instructions computing the expression for a single
+    block of the leaf sources.
+
+    Parameters
+    ----------
+    instructions : list of Instruction
+        In dependency order, the result is the value of the last one.
+    reduction : string or None
+        The name of the aggregate (see ``blaze.rts.aggregates``)
+        reducing the result of every block into a scalar, if the root
+        of the graph is a full reduction.
+    outputs : tuple of int or None
+        The instructions whose values are the results, when several
+        reductions are computed together.  `reduction` is then a tuple
+        with the name of the aggregate of every output.
+    """
+
+    def __init__(self, instructions, reduction=None, outputs=None):
+        self.instructions = instructions
+        self.reduction = reduction
+        self.outputs = outputs
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def __iter__(self):
+        return iter(self.instructions)
+
+    def fingerprint(self):
+        """ A hashable canonical form of the plan, equal for plans
+        computing the same function of their leaves.  None if the plan
+        holds values that can not be compared. """
+        key = []
+        for ins in self.instructions:
+            arg = ins.arg
+            if ins.opcode == CONST:
+                arg = (type(arg), arg)
+            elif isinstance(arg, fusion.FusedKernel):
+                arg = arg.source
+            key.append((ins.opcode, arg, ins.operands))
+        key.append((self.reduction, self.outputs))
+        key = tuple(key)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def __repr__(self):
+        lines = []
+        for i, ins in enumerate(self.instructions):
+            if ins.opcode == CALL:
+                args = ' '.join('%%%i' % j for j in ins.operands)
+                lines.append('%%%i = %s %s' % (i, ins.name, args))
+            else:
+                lines.append('%%%i = %s %r' % (i, ins.opcode, ins.arg))
+        if self.outputs is not None:
+            lines.append('reduce ' + ', '.join(
+                '%s %%%i' % (name, i)
+                for name, i in zip(self.reduction, self.outputs)))
+        elif self.reduction is not None:
+            lines.append('reduce %s' % self.reduction)
+        return '\n'.join(lines)
+
+class Window(object):
+    """
+    The rows of a carray selected by a sequence of slices, applied in
+    order.
+
+    Slices are resolved against the current length of the carray on
+    every read, so a window open at the end (e.g. ``a[1000:]``) follows
+    appends.  Reading the rows [i, j) of the window only reads the
+    corresponding rows of the carray.
+
+    Parameters
+    ----------
+    ca : carray
+    slices : tuple of (start, stop, step)
+    provider : ByteProvider
+        The byte provider the carray belongs to.
+    column : string
+        The name of the column, if the carray is a column of a ctable.
+    """
+
+    def __init__(self, ca, slices=(), provider=None, column=None):
+        self.ca = ca
+        self.slices = slices
+        self.provider = provider
+        self.column = column
+
+    def bounds(self):
+        """ Return the (offset, step, length) of the window in the
+        carray. """
+        offset, step, length = 0, 1, len(self.ca)
+        for s in self.slices:
+            start, stop, sstep = slice(*s).indices(length)
+            length = len(xrange(start, stop, sstep))
+            offset += start * step
+            step *= sstep
+        return offset, step, length
+
+    @property
+    def chunklen(self):
+        return self.ca.chunklen
+
+    def __len__(self):
+        return self.bounds()[2]
+
+    def __getitem__(self, key):
+        offset, step, length = self.bounds()
+        start, stop, _ = key.indices(length)
+        return self.ca[offset + start*step:offset + stop*step:step]
+
+    def __repr__(self):
+        return 'Window(%r, %r)' % (self.provider, self.slices)
+
+class ExecutionContext(object):
+    """
+    The leaf sources of a plan and the schedule of blocks to run it
+    over.
+
+    Parameters
+    ----------
+    sources : list of Window
+        The rows read from the leaves, in LOAD order.
+    schedule : list of (start, stop)
+        The bounds of every block along the first dimension.
+    providers : list of ByteProvider
+        The byte providers of the sources.
+    blocklen : int
+        The length of the blocks the schedule is aligned with.
+    phase : int
+        The offset of the blocks from multiples of `blocklen`.
+    """
+
+    def __init__(self, sources, schedule, providers=None, blocklen=None,
+                 phase=0):
+        self.sources = sources
+        self.schedule = schedule
+        self.providers = providers or []
+        self.blocklen = blocklen
+        self.phase = phase
+
+    @property
+    def length(self):
+        if not self.schedule:
+            return 0
+        return self.schedule[-1][1]
+
+    def identity(self):
+        """ A hashable identity of the rows read by the plan. """
+        return tuple((id(w.provider), w.column, w.slices)
+                     for w in self.sources)
+
+#------------------------------------------------------------------------
+# Compiler
+#------------------------------------------------------------------------
+
+def strip_app(node):
+    if isinstance(node, graph.App):
+        return node.operator
+    return node
+
+def is_leaf(node):
+    return isinstance(getattr(node, 'data', None), CArraySource)
+
+def is_table(node):
+    return isinstance(getattr(node, 'data', None), CTableSource)
+
+def literal_of(node):
+    """ The Python value of an index given as a graph node. """
+    if node is None or isinstance(node, Integral):
+        return node
+    if isinstance(node, graph.Literal):
+        return node.val
+    raise ExecutionError("Indices must be constants, found %r" % (node,))
+
+def slice_of(node):
+    """ Return the (start, stop, step) of a Slice node. """
+    start, stop, step = [literal_of(x) for x in node.operands[1:4]]
+    if step is not None and step <= 0:
+        raise ExecutionError("Slices must have a positive step")
+    return (start, stop, step)
+
+def value_key(opcode, arg, operands):
+    """ The key identifying the value computed by an instruction, or
+    None if it can not be shared. """
+    if opcode == CONST:
+        try:
+            hash(arg)
+        except TypeError:
+            return None
+        return (opcode, type(arg), arg)
+    return (opcode, arg, operands)
+
+class PlanBuilder(object):
+    """
+    Walks the graph and emits the instructions of a plan.
+
+    Common subexpressions are eliminated by value numbering: an
+    instruction computing the same function of the same values as an
+    earlier one is not emitted again.  Structurally identical subgraphs,
+    and leaves sharing the same source, are hence computed once per
+    block even if they are different graph nodes.
+
+    Slices are pushed down through the elementwise operators into the
+    windows the leaves are read through, and column selections into
+    the column of the ctable that is loaded, so ``(a + b)[1000:2000]``
+    only ever reads the chunks holding these rows of ``a`` and ``b``.
+    """
+
+    def __init__(self):
+        self.instructions = []
+        self.leaves = []
+        self.chunklens = []
+        self._seen = {}
+        self._values = {}
+        self._sources = {}
+
+    def emit(self, opcode, arg, operands=(), name=None):
+        operands = tuple(operands)
+        key = value_key(opcode, arg, operands)
+        if key is not None and key in self._values:
+            return self._values[key]
+        self.instructions.append(Instruction(opcode, arg, operands,
+                                             name or opcode))
+        index = len(self.instructions) - 1
+        if key is not None:
+            self._values[key] = index
+        return index
+
+    def load(self, provider, ca, chunklen, slices, column=None):
+        source = (id(provider), column, slices)
+        if source not in self._sources:
+            self.leaves.append(Window(ca, slices, provider, column))
+            self.chunklens.append(chunklen)
+            self._sources[source] = len(self.leaves) - 1
+        return self.emit(LOAD, self._sources[source])
+
+    def visit(self, node, slices=(), column=None):
+        key = (id(node), slices, column)
+        if key not in self._seen:
+            self._seen[key] = self._visit(node, slices, column)
+        return self._seen[key]
+
+    def _visit(self, node, slices, column):
+        if isinstance(node, graph.App):
+            return self.visit(node.operator, slices, column)
+
+        elif isinstance(node, graph.Slice):
+            # Inner slices apply first
+            return self.visit(node.operands[0],
+                              (slice_of(node),) + slices, column)
+
+        elif isinstance(node, graph.Project):
+            name = literal_of(node.operands[1])
+            if column is not None and column != name:
+                raise ExecutionError("Cannot select column %r of column %r"
+                                     % (name, column))
+            return self.visit(node.operands[0], slices, name)
+
+        elif column is not None and not is_table(node):
+            raise ExecutionError("Cannot select column %r of %r"
+                                 % (column, node))
+
+        elif is_leaf(node):
+            return self.load(node.data, node.data.ca, chunk_bounds(node),
+                             slices)
+
+        elif is_table(node):
+            if column is None:
+                raise ExecutionError(
+                    "Tables are only supported through their columns")
+            ct = node.data.ca
+            if column not in ct.names:
+                raise ExecutionError("No column %r in %r" % (column, node))
+            ca = ct.cols[column]
+            return self.load(node.data, ca, ca.chunklen, slices, column)
+
+        elif isinstance(node, graph.Literal):
+            return self.emit(CONST, node.val)
+
+        elif isinstance(node, graph.Where):
+            raise ExecutionError(
+                "Filters are only supported at the root of an expression")
+
+        elif isinstance(node, ReductionOp):
+            raise ExecutionError(
+                "Reductions are only supported at the root of an "
+                "expression, found %s" % node.name)
+
+        elif isinstance(node, graph.Op):
+            try:
+                fn = ufuncs[node.name]
+            except KeyError:
+                raise ExecutionError("No kernel for operator %s" % node.name)
+            operands = [self.visit(a, slices) for a in node.operands]
+            return self.emit(CALL, fn, operands, node.name)
+
+        elif isinstance(node, graph.Fun):
+            # Lifted functions are assumed to be elementwise
+            operands = [self.visit(a, slices) for a in node.children]
+            return self.emit(CALL, node.fn, operands, node.name)
+
+        elif isinstance(node, graph.ExpressionNode):
+            raise ExecutionError("Cannot execute %r" % node)
+
+        else:
+            # Python scalars passed straight through
+            return self.emit(CONST, node)
+
+def reduction_of(node):
+    """ Return the name of the aggregate computing `node` if it is a
+    full reduction, or None. """
+    node = strip_app(node)
+    if not isinstance(node, ReductionOp):
+        return None
+    name = node.name.lower()
+    if name not in aggregates:
+        raise ExecutionError("No kernel for reduction %s" % node.name)
+    # Keyword arguments left to their defaults are harmless
+    kwargs = dict((k, v) for k, v in (node.kwargs or {}).items()
+                  if v is not None)
+    if kwargs:
+        args = ', '.join('%s=%r' % kv for kv in sorted(kwargs.items()))
+        raise ExecutionError("Only full reductions are supported, found "
+                             "%s(%s)" % (node.name, args))
+    return name
+
+def reduction_operand(node):
+    """ Return the operand of a full reduction. """
+    operands = strip_app(node).operands
+    if len(operands) != 1:
+        raise ExecutionError("Reductions take a single operand")
+    return operands[0]
+
+def chunk_bounds(leaf):
+    """ Return the chunk size along the first dimension of a leaf. """
+    layout = getattr(leaf, '_layout', None)
+    if isinstance(layout, ChunkedL) and layout.partitions:
+        start, stop = layout.partitions[0]
+        return stop - start
+    return leaf.data.ca.chunklen
+
+def common_length(sources):
+    """ Return the length shared by all the sources. """
+    lengths = set(len(ca) for ca in sources)
+    if len(lengths) > 1:
+        raise ExecutionError(
+            "Operands have different lengths: %s" % sorted(lengths))
+    return lengths.pop()
+
+def blocks(blocklen, start, stop, phase=0):
+    """ Split the rows [start, stop) into blocks whose bounds are
+    `phase` rows short of multiples of `blocklen`. """
+    bounds = []
+    while start < stop:
+        end = min(((start + phase) // blocklen + 1) * blocklen - phase, stop)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+def schedule(windows, chunklens):
+    """
+    Plan the blocks to stream the windows of the leaves through.
+
+    Blocks are aligned with the chunks of the leaf with the largest
+    chunks, so every chunk of that leaf is decompressed exactly once,
+    and the chunks of the others (typically of the same size or a
+    divisor of it) at most once.  When the window starts in the middle
+    of a chunk, the first block is cut short at the end of that chunk.
+
+    Returns
+    -------
+    out : (blocklen, phase, list of (start, stop))
+    """
+    length = common_length(windows)
+    blocklen = max(max(chunklens), 1)
+    offset, step, _ = windows[chunklens.index(max(chunklens))].bounds()
+    phase = offset % blocklen if step == 1 else 0
+    return blocklen, phase, blocks(blocklen, 0, length, phase)
+
+#------------------------------------------------------------------------
+# Fusion
+#------------------------------------------------------------------------
+
+def fusion_tree(instructions, i, members, inputs):
+    """ Build the expression tree of the fused group rooted at the
+    instruction `i`. """
+    ins = instructions[i]
+    children = []
+    for j in ins.operands:
+        operand = instructions[j]
+        if j in members:
+            children.append(fusion_tree(instructions, j, members, inputs))
+        elif operand.opcode == CONST and \
+                fusion.blir_const(operand.arg) is not None:
+            children.append(('const', operand.arg))
+        else:
+            if j not in inputs:
+                inputs.append(j)
+            children.append(('in', inputs.index(j)))
+    return ('op', ins.name, ins.arg, children)
+
+def fuse_elementwise(plan):
+    """
+    Fuse the maximal elementwise subtrees of the plan into single
+    kernels.
+
+    An instruction is merged into the instruction using it when both
+    are fusable operators and it has no other users, so intermediate
+    values shared by several expressions are still computed once.
+    """
+    instructions = plan.instructions
+    # The outputs are used by the caller
+    roots = plan.outputs or ()
+    uses = Counter(j for ins in instructions for j in ins.operands)
+    uses.update(roots)
+    fusable = lambda ins: ins.opcode == CALL and ins.name in fusion.blir_ops
+
+    members = set()
+    for ins in instructions:
+        if fusable(ins):
+            for j in ins.operands:
+                if fusable(instructions[j]) and uses[j] == 1:
+                    members.add(j)
+
+    fused = []
+    remap = {}
+    for i, ins in enumerate(instructions):
+        if i in members:
+            continue
+        if fusable(ins) and any(j in members for j in ins.operands):
+            inputs = []
+            tree = fusion_tree(instructions, i, members, inputs)
+            kernel = fusion.FusedKernel(tree, len(inputs))
+            ins = Instruction(CALL, kernel, inputs, 'Fused')
+        fused.append(ins._replace(operands=[remap[j] for j in ins.operands]))
+        remap[i] = len(fused) - 1
+
+    roots = [remap[i] for i in roots]
+
+    # Constants inlined in the kernels are not needed anymore
+    uses = Counter(j for ins in fused for j in ins.operands)
+    uses.update(roots)
+    keep = [i for i, ins in enumerate(fused)
+            if ins.opcode != CONST or uses[i] or i == len(fused) - 1]
+    remap = dict((i, k) for k, i in enumerate(keep))
+    fused = [fused[i]._replace(operands=tuple(remap[j]
+                                              for j in fused[i].operands))
+             for i in keep]
+    outputs = None
+    if plan.outputs is not None:
+        outputs = tuple(remap[i] for i in roots)
+    return Plan(fused, plan.reduction, outputs)
+
+#------------------------------------------------------------------------
+# Selections
+#------------------------------------------------------------------------
+
+class Selection(object):
+    """
+    The rows of a table where a predicate holds.
+
+    The predicate is compiled into a plan like any other elementwise
+    expression, loading only the columns it refers to, and is streamed
+    over the table block by block.  Only the blocks where it holds for
+    some row are read from the output columns, so no full-size boolean
+    temporaries are allocated and selective filters do not decompress
+    the output columns for the rest of the table.
+
+    Parameters
+    ----------
+    plan : Plan
+        The plan computing the boolean mask of a block.
+    outputs : list of int
+        The indices of the sources of the output columns in the
+        execution context.
+    names : list of strings
+        The names of the output columns.
+    column : string
+        The single column to return as an array, if any.
+    """
+
+    reduction = None
+
+    def __init__(self, plan, outputs, names, column=None):
+        self.plan = plan
+        self.outputs = outputs
+        self.names = names
+        self.column = column
+
+    def fingerprint(self):
+        fingerprint = self.plan.fingerprint()
+        if fingerprint is None:
+            return None
+        return ('where', fingerprint, tuple(self.outputs),
+                tuple(self.names), self.column)
+
+    def __repr__(self):
+        return '%r\nselect %s' % (self.plan, ', '.join(self.names))
+
+def selection_of(expr, fuse):
+    """ Compile `expr` if it is a filter of a table, or the column of
+    one, else return None. """
+    node, column = strip_app(expr), None
+    if isinstance(node, graph.Project) and \
+            isinstance(strip_app(node.operands[0]), graph.Where):
+        column = literal_of(node.operands[1])
+        node = strip_app(node.operands[0])
+    if not isinstance(node, graph.Where):
+        return None
+
+    table = strip_app(node.operands[0])
+    if not is_table(table):
+        raise ExecutionError("Filters are only supported over tables")
+    ct = table.data.ca
+    names = [column] if column is not None else list(ct.names)
+    if column is not None and column not in ct.names:
+        raise ExecutionError("No column %r in %r" % (column, table))
+
+    builder = PlanBuilder()
+    builder.visit(node.operands[1])
+    windows = list(builder.leaves)
+    chunklens = list(builder.chunklens)
+    outputs = []
+    for name in names:
+        windows.append(Window(ct.cols[name], (), table.data, name))
+        chunklens.append(ct.cols[name].chunklen)
+        outputs.append(len(windows) - 1)
+
+    ctx = make_context(windows, chunklens)
+    plan = Plan(builder.instructions)
+    if fuse:
+        plan = fuse_elementwise(plan)
+    return ctx, Selection(plan, outputs, names, column)
+
+#------------------------------------------------------------------------
+# Toplevel
+#------------------------------------------------------------------------
+
+def make_context(windows, chunklens):
+    """ Schedule the windows read by a plan. """
+    if windows:
+        blocklen, phase, bounds = schedule(windows, chunklens)
+    else:
+        blocklen, phase, bounds = None, 0, []
+    return ExecutionContext(windows, bounds, [w.provider for w in windows],
+                            blocklen, phase)
+
+def _compile(expr, fuse=None):
+    """
+    Compile the expression graph rooted at `expr`.
+
+    The graph is first simplified by the rules of ``blaze.opt``.
+
+    Elementwise subtrees are fused into native kernels if `fuse` is
+    True.  By default they are when BLIR is available.
+
+    Returns
+    -------
+    out : (ExecutionContext, Plan or Selection)
+
+    """
+    if fuse is None:
+        fuse = fusion.have_blir
+
+    expr = optimize(expr)
+    selection = selection_of(expr, fuse)
+    if selection is not None:
+        return selection
+
+    reduction = reduction_of(expr)
+    if reduction is not None:
+        expr = reduction_operand(expr)
+
+    builder = PlanBuilder()
+    builder.visit(expr)
+    ctx = make_context(builder.leaves, builder.chunklens)
+    plan = Plan(builder.instructions, reduction)
+    if fuse:
+        plan = fuse_elementwise(plan)
+    return ctx, plan
+
+def _compile_many(exprs, fuse=None):
+    """
+    Compile several full reductions into a single plan.
+
+    The operands of all the reductions are built by the same builder,
+    so the sources and subexpressions they share are read and computed
+    once per block, and every block is folded into the aggregate of
+    each reduction in turn.
+
+    Returns
+    -------
+    out : (ExecutionContext, Plan)
+
+    """
+    if fuse is None:
+        fuse = fusion.have_blir
+
+    builder = PlanBuilder()
+    names, outputs = [], []
+    for expr in map(optimize, exprs):
+        name = reduction_of(expr)
+        if name is None:
+            raise ExecutionError(
+                "Only full reductions can be evaluated together, "
+                "found %r" % (expr,))
+        names.append(name)
+        outputs.append(builder.visit(reduction_operand(expr)))
+
+    ctx = make_context(builder.leaves, builder.chunklens)
+    plan = Plan(builder.instructions, tuple(names), tuple(outputs))
+    if fuse:
+        plan = fuse_elementwise(plan)
+    return ctx, plan
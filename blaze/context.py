@@ -6,6 +6,9 @@ Environment used for type reconstruction algorithms.
 """
 
 from itertools import chain
+from contextlib import contextmanager
+
+_missing = object()
 
 class Env(object):
     """
@@ -31,11 +34,30 @@ class Env(object):
         raise KeyError, key
 
     def foldl(self, key):
+        """ Follow the chain of associations starting at `key`, stops
+        at the first value that is not bound or was already seen. """
         t = key
-        while key in self:
-            t = self[key]
+        seen = set()
+        while t in self and t not in seen:
+            seen.add(t)
+            t = self[t]
         return t
 
+    @contextmanager
+    def scope(self, key, value):
+        """ Bind `key` to `value` in the innermost map for the duration of
+        the block, then restore its previous binding. Unlike
+        `collapse` this does not copy the environment. """
+        old = self.iev.get(key, _missing)
+        self.iev[key] = value
+        try:
+            yield self
+        finally:
+            if old is _missing:
+                del self.iev[key]
+            else:
+                self.iev[key] = old
+
     def collapse(self):
         iev = {}
         for e in self.evs:
@@ -43,7 +65,7 @@ class Env(object):
         return Env(iev)
 
     def has_key(self, key):
-        for e in self.maps:
+        for e in self.evs:
             if key in e:
                 return True
         return False
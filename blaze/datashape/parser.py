@@ -49,10 +49,12 @@ Grammar::
 """
 
 import os
+import re
 import sys
 
 from functools import partial
-from collections import namedtuple
+from threading import Lock
+from collections import namedtuple, OrderedDict
 import coretypes as T
 
 try:
@@ -409,12 +411,114 @@ def load_parser(debug=False):
 # Toplevel
 #------------------------------------------------------------------------
 
+# The common forms of datashapes, dimensions followed by a builtin
+# measure or a record of builtin measures, are parsed without going
+# through PLY.  Anything else falls back to the full parser.
+_identifier = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*$')
+
+def _fast_dim(s):
+    s = s.strip(' ')
+    if s.isdigit():
+        return T.Fixed(int(s))
+    # Names starting with "type" are lexed as the keyword
+    elif _identifier.match(s) and s not in bits and not s.startswith('type'):
+        return T.TypeVar(s)
+    return None
+
+def _fast_measure(s):
+    s = s.strip(' ')
+    if s in bits:
+        return T.Type._registry.get(s)
+    return None
+
+def _fast_record(body):
+    fields = []
+    for item in body.split(';'):
+        if not item.strip(' '):
+            continue
+        name, colon, ty = item.partition(':')
+        name = name.strip(' ')
+        if not colon or not _identifier.match(name) or \
+           (name.startswith('type') and name != 'type'):
+            return None
+        ty = _fast_measure(ty)
+        if ty is None:
+            return None
+        fields.append((name, ty))
+    return T.Record(fields)
+
+def fast_parse(pattern):
+    """ Parse the common forms of datashapes::
+
+        3, 4, int32
+        N, {x: int32; y: float64}
+
+    Returns None if `pattern` is not one of them.
+    """
+    if '(' in pattern or '#' in pattern or '=' in pattern or \
+       '\n' in pattern or '"' in pattern or "'" in pattern:
+        return None
+
+    dims, brace, rest = pattern.partition('{')
+    if brace:
+        body, brace, tail = rest.partition('}')
+        if not brace or tail.strip(' ') or '{' in body:
+            return None
+        measure = _fast_record(body)
+        dims = dims.rstrip(' ')
+        if not dims:
+            dims = []
+        elif dims.endswith(','):
+            dims = dims[:-1].split(',')
+        else:
+            return None
+    else:
+        dims = pattern.split(',')
+        measure = _fast_measure(dims.pop())
+
+    if measure is None:
+        return None
+    parameters = []
+    for dim in dims:
+        dim = _fast_dim(dim)
+        if dim is None:
+            return None
+        parameters.append(dim)
+
+    if not parameters:
+        return measure
+    parameters.append(measure)
+    return T.DataShape(tuple(parameters))
+
+# Datashapes are immutable, so the results of parsing are shared between
+# callers. The most recently used ones are kept.
+PARSE_CACHE_SIZE = 1024
+
+_parser = None
+_parsed = OrderedDict()
+_parse_lock = Lock()
+
 def parse(pattern):
+    with _parse_lock:
+        try:
+            ds = _parsed.pop(pattern)
+        except KeyError:
+            ds = fast_parse(pattern)
+            if ds is None:
+                ds = _parse(pattern)
+            if len(_parsed) >= PARSE_CACHE_SIZE:
+                _parsed.popitem(last=False)
+        _parsed[pattern] = ds
+        return ds
+
+def _parse(pattern):
     # NOTE: If you change the lexer/parser, you should
     #       run with load_parser(True)
     #       to trigger a re-creation of the parser.
-    parser = load_parser(False)
-    ds = parser(pattern)
+    global _parser
+    if _parser is None:
+        _parser = load_parser(False)
+    ds = _parser(pattern)
 
     # Just take the type from "type X = Y" statements
     if isinstance(ds, tydecl):
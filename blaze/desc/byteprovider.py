@@ -33,6 +33,12 @@ class ByteProvider(object):
         speciazlied by execution """
         raise NotImplementedError
 
+    def version(self):
+        """ Returns a token that changes whenever the bytes change, or
+        None if changes can not be tracked. Results computed from
+        providers with unchanged versions can be reused. """
+        return None
+
     def has_op(self, op, method):
         if op == READ:
             return method & self.read_capabilities
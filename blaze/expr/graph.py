@@ -20,6 +20,7 @@ graph.
 from numbers import Integral
 from functools import partial
 from collections import Iterable
+from weakref import WeakValueDictionary
 
 from blaze import catalog
 from blaze.expr import nodes
@@ -139,6 +140,40 @@ def injest_iterable(args, depth=0, force_homog=False):
             Too many dynamic arguments to build expression
             graph. Consider alternative construction.""")
 
+#------------------------------------------------------------------------
+# Hash Consing
+#------------------------------------------------------------------------
+
+# Operator applications built by the operator overloads are interned, so
+# building the same expression twice gives back the same node.  Keys are
+# shallow: interned children are canonical and are keyed by identity,
+# they are kept alive by the node that refers to them.  An interned node
+# can be part of any number of graphs, graph transformations build new
+# nodes (see Node.replace) rather than changing existing ones.
+_interned = WeakValueDictionary()
+
+def intern_key(func_name, args):
+    """ The structural key of the operator `func_name` applied to
+    `args`, or None if the application can not be interned. """
+    key = [func_name]
+    for a in args:
+        if isinstance(a, Literal):
+            key.append((type(a), type(a.val), a.val))
+        elif isinstance(a, nodes.Node):
+            key.append(id(a))
+        else:
+            # Unhashable Python arguments are not interned
+            try:
+                hash(a)
+            except TypeError:
+                return None
+            key.append((type(a), a))
+    return tuple(key)
+
+def clear_interned():
+    """ Forget all the interned nodes. """
+    _interned.clear()
+
 #------------------------------------------------------------------------
 # Base Classes
 #------------------------------------------------------------------------
@@ -157,13 +192,29 @@ class ExpressionNode(nodes.Node):
         # TODO: better solution, resolve circular import
         from blaze.expr import ops
 
+        # Reuse the node for structurally identical applications.
+        # Applications with keyword arguments are never shared.
+        if kwargs:
+            key = None
+        else:
+            key = intern_key(func_name.capitalize(), iargs)
+        if key is not None:
+            app = _interned.get(key)
+            if app is not None:
+                return app
+
         # Lookup by capitalized name
         op = getattr(ops, func_name.capitalize())
         iop = op(func_name.capitalize(), iargs)
+        if kwargs:
+            iop.kwargs = kwargs
 
         #op.__proto__
 
-        return App(iop)
+        app = App(iop)
+        if key is not None:
+            app = _interned.setdefault(key, app)
+        return app
 
     # Python Intrinsics
     # -----------------
@@ -196,7 +247,7 @@ class ExpressionNode(nodes.Node):
             "    return self.generate_opnode(2, '%(name)s', [self, ob])\n"
             "\n"
             "def __r%(name)s__(self, ob):\n"
-            "    return self.generate_opnode(2, '%(name)s', [self, ob])\n"
+            "    return self.generate_opnode(2, '%(name)s', [ob, self])\n"
             "\n"
         )  % locals()
         del name
@@ -211,6 +262,45 @@ class ExpressionNode(nodes.Node):
         del name
         del _
 
+    # Reductions
+    # ----------
+    for name in catalog.PyArray_ReductionMethods:
+        exec (
+            "def %(name)s(self, *args, **kwargs):\n"
+            "    args = (self,) + args\n"
+            "    return self.generate_opnode(-1, '%(name)s', args, kwargs)"
+            "\n"
+        ) % locals()
+        del name
+
+    # getitem Operations
+    # ===============
+
+    def getitem(self, idx, context='get'):
+        if isinstance(idx, slice):
+            result = Slice(context, [self,
+                                     intnode(idx.start),
+                                     intnode(idx.stop),
+                                     intnode(idx.step)])
+        elif isinstance(idx, Integral):
+            result = IndexNode(context, [self, idx])
+        elif isinstance(idx, basestring):
+            result = Project(context, [self, StringNode(idx)])
+        elif isinstance(idx, ExpressionNode):
+            result = Where(context, [self, idx])
+        else:
+            # TODO: detect other forms
+            ndx = IndexNode(idx)
+            result = Slice(context, [self, ndx])
+
+        return result
+
+    def __getitem__(self, idx):
+        """ Slicing operations should return graph nodes, while individual
+        element access should return bare scalars.
+        """
+        return self.getitem(idx)
+
 #------------------------------------------------------------------------
 # Indexables
 #------------------------------------------------------------------------
@@ -296,30 +386,9 @@ class ArrayNode(ExpressionNode):
         """ Equivalent to .transpose(), which returns a graph node. """
         return Op('transpose', self)
 
-    # {get,set}item Operations
+    # setitem Operations
     # ===============
 
-    def getitem(self, idx, context='get'):
-        if isinstance(idx, slice):
-            result = Slice(context, [self,
-                                     intnode(idx.start),
-                                     intnode(idx.stop),
-                                     intnode(idx.step)])
-        elif isinstance(idx, Integral):
-            result = IndexNode(context, [self, idx])
-        else:
-            # TODO: detect other forms
-            ndx = IndexNode(idx)
-            result = Slice(context, [self, ndx])
-
-        return result
-
-    def __getitem__(self, idx):
-        """ Slicing operations should return graph nodes, while individual
-        element access should return bare scalars.
-        """
-        return self.getitem(idx)
-
     def __setitem__(self, idx, value):
         """
         This first creates a slice node in the expression graph to avoid
@@ -372,6 +441,12 @@ class App(ExpressionNode):
         self.operator = operator
         self.children = [operator]
 
+    def replace(self, **fields):
+        node = super(App, self).replace(**fields)
+        if node.children:
+            node.operator = node.children[0]
+        return node
+
     @property
     def name(self):
         return 'App'
@@ -389,11 +464,20 @@ class Op(ExpressionNode):
     """
     kind = OP
 
+    # The keyword arguments of the application, e.g. the axis of a
+    # reduction
+    kwargs = None
+
     def __init__(self, op, operands):
         self.op = op
         self.children = operands
         self.operands = operands
 
+    def replace(self, **fields):
+        node = super(Op, self).replace(**fields)
+        node.operands = node.children
+        return node
+
     @property
     def name(self):
         return str(self.op)
@@ -439,6 +523,9 @@ class Literal(ExpressionNode):
     def name(self):
         return str(self.val)
 
+    def hash(self):
+        return hash((type(self), type(self.val), self.val))
+
 #------------------------------------------------------------------------
 # Strings
 #------------------------------------------------------------------------
@@ -497,6 +584,14 @@ class Slice(Op):
     kind   = OP
     arity  = 4 # <INDEXABLE>, start, stop, step
 
+class Project(Op):
+    kind   = OP
+    arity  = 2 # <INDEXABLE>, <COLUMN NAME>
+
+class Where(Op):
+    kind   = OP
+    arity  = 2 # <INDEXABLE>, <PREDICATE>
+
 class Assign(Op):
     kind   = OP
     arity  = 2
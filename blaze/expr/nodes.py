@@ -1,3 +1,5 @@
+from copy import copy
+
 #------------------------------------------------------------------------
 # Graph Objects
 #------------------------------------------------------------------------
@@ -11,15 +13,28 @@ class Node(object):
     def __init__(self, children):
         self.children = children
 
-    def eval(self):
-        """ Evaluates the expression graph """
+    def eval(self, params=None, cache=True):
+        """ Evaluates the expression graph
+
+        The graph is streamed chunk by chunk through the runtime, so no
+        full-size temporaries are allocated.  `params` are the
+        parameters (e.g. the storage) of the output array.
+
+        Unless `cache` is False, results are kept in the process-wide
+        result cache (``blaze.rts.results``) and reused while the
+        sources are unchanged.  Results stored with explicit `params`
+        are never cached.
+        """
         # setup a default pipeline
         from blaze.compile import _compile
+        from blaze.rts.execution import execplan
+        from blaze.rts.results import results
         ctx, plan = _compile(self)
 
         # submit to the runtime for the result
-        #return execplan(ctx, plan)
-        return ctx, plan
+        if params is not None or not cache:
+            return execplan(ctx, plan, params)
+        return results.get(ctx, plan, lambda: execplan(ctx, plan))
 
     def __iter__(self):
         """ Walk the graph, left to right """
@@ -34,11 +49,37 @@ class Node(object):
                 raise TypeError('Invalid children')
 
     def hash(self):
-        # tree hashing, xor with the hash of children
-        h = hash(type(self))
-        for child in self.children:
-            h ^= hash(child)
-        return h
+        """ Structural hash of the graph rooted at this node.
+
+        Children are combined in order, so ``a - b`` and ``b - a`` hash
+        differently.  The hash is cached, graphs are not mutated once
+        they are built.
+        """
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        if self.children:
+            self._hash = hash((type(self),) + tuple(
+                child.hash() if isinstance(child, Node) else hash(child)
+                for child in self.children))
+        else:
+            # Leaves stand for their own data
+            self._hash = hash((type(self), id(self)))
+        return self._hash
+
+    def replace(self, **fields):
+        """ Return a copy of the node with the given fields replaced.
+
+        Nodes are shared between graphs (see ``blaze.expr.graph``), so
+        they are never changed in place once built.
+        """
+        node = copy(self)
+        # The copy has a structure of its own
+        node.__dict__.pop('_hash', None)
+        for name, value in fields.items():
+            setattr(node, name, value)
+        return node
 
     @property
     def name(self):
@@ -63,6 +63,32 @@ class Mul(Op):
     idempotent   = False
     nilpotent    = False
 
+class Sub(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> a'
+    dom = [numeric, numeric]
+    # -----------------------
+
+    identity     = zero
+    commutative  = False
+    associative  = False
+    idempotent   = False
+    nilpotent    = False
+
+class Div(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> a'
+    dom = [numeric, numeric]
+    # -----------------------
+
+    identity     = one
+    commutative  = False
+    associative  = False
+    idempotent   = False
+    nilpotent    = False
+
 class Pow(Op):
     # -----------------------
     arity = 2
@@ -70,7 +96,7 @@ class Pow(Op):
     dom = [numeric, numeric]
     # -----------------------
 
-    identity     = zero
+    identity     = one
     commutative  = False
     associative  = False
     idempotent   = False
@@ -102,6 +128,127 @@ class Abs(Op):
     idempotent   = True
     nilpotent    = False
 
+#------------------------------------------------------------------------
+# Comparisons and Logic
+#------------------------------------------------------------------------
+
+class Lt(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> bool'
+    dom = [universal, universal]
+    # -----------------------
+
+    identity     = None
+    commutative  = False
+    associative  = False
+    idempotent   = False
+    nilpotent    = False
+
+class Le(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> bool'
+    dom = [universal, universal]
+    # -----------------------
+
+    identity     = None
+    commutative  = False
+    associative  = False
+    idempotent   = False
+    nilpotent    = False
+
+class Gt(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> bool'
+    dom = [universal, universal]
+    # -----------------------
+
+    identity     = None
+    commutative  = False
+    associative  = False
+    idempotent   = False
+    nilpotent    = False
+
+class Ge(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> bool'
+    dom = [universal, universal]
+    # -----------------------
+
+    identity     = None
+    commutative  = False
+    associative  = False
+    idempotent   = False
+    nilpotent    = False
+
+class Eq(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> bool'
+    dom = [universal, universal]
+    # -----------------------
+
+    identity     = None
+    commutative  = True
+    associative  = False
+    idempotent   = False
+    nilpotent    = False
+
+class Ne(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> bool'
+    dom = [universal, universal]
+    # -----------------------
+
+    identity     = None
+    commutative  = True
+    associative  = False
+    idempotent   = False
+    nilpotent    = False
+
+class And(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> a'
+    dom = [bools | discrete, bools | discrete]
+    # -----------------------
+
+    identity     = true
+    commutative  = True
+    associative  = True
+    idempotent   = True
+    nilpotent    = False
+
+class Or(Op):
+    # -----------------------
+    arity = 2
+    signature = '(a,a) -> a'
+    dom = [bools | discrete, bools | discrete]
+    # -----------------------
+
+    identity     = false
+    commutative  = True
+    associative  = True
+    idempotent   = True
+    nilpotent    = False
+
+class Invert(Op):
+    # -----------------------
+    arity = 1
+    signature = 'a -> a'
+    dom = [bools | discrete]
+    # -----------------------
+
+    identity     = None
+    commutative  = False
+    associative  = False
+    idempotent   = False
+    nilpotent    = True
+
 class ReductionOp(Op):
     # Need an OO taxonomy for compute_datashape
 
@@ -116,3 +263,33 @@ class ReductionOp(Op):
 class Sum(ReductionOp):
 
     scalar_func = Add
+
+class Prod(ReductionOp):
+
+    scalar_func = Mul
+
+class Min(ReductionOp):
+    pass
+
+class Max(ReductionOp):
+    pass
+
+class All(ReductionOp):
+
+    scalar_func = And
+
+class Any(ReductionOp):
+
+    scalar_func = Or
+
+class Count(ReductionOp):
+    pass
+
+class Mean(ReductionOp):
+    pass
+
+class Var(ReductionOp):
+    pass
+
+class Std(ReductionOp):
+    pass
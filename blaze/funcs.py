@@ -25,6 +25,7 @@ possible ), converting to a Numexpr expression, etc.
 import ast
 from functools import wraps
 from threading import local
+from collections import OrderedDict
 from inspect import getsource, getargspec
 from thread import allocate_lock
 
@@ -33,7 +34,8 @@ from blaze.expr.graph import Fun
 from blaze.eclass import all_manifest
 from blaze.rts.immediete import ieval
 from blaze.datashape import dynamic
-from blaze.aterm import parse, match, AtermSyntaxError
+from blaze.aterm import parse, AtermSyntaxError
+from blaze.aterm.matching import compile_pattern, head, WILDCARD
 from blaze.error import InvalidLibraryDefinition, NoDispatch
 
 #------------------------------------------------------------------------
@@ -44,6 +46,10 @@ from blaze.error import InvalidLibraryDefinition, NoDispatch
 _dispatch = local()
 runtime_frozen = allocate_lock()
 
+# The number of dispatch decisions memoized, the most recently used ones
+# are kept
+MEMO_SIZE = 1024
+
 # WARNING, this is mutable
 class Dispatcher(object):
     """
@@ -54,37 +60,65 @@ class Dispatcher(object):
         a) match a given expression
         b) minimizes the cost of execution
 
+    Patterns are parsed and compiled once when installed and indexed by
+    their head, so a lookup only matches the patterns with the same
+    constructor and arity as the term (and the ones headed by a
+    placeholder).  The most recent decisions are memoized by term,
+    which is constant time as terms are interned, and the memo is
+    cleared whenever a function is installed.
     """
 
     def __init__(self):
         self.funs  = {}
         self.costs = {}
+        self.patterns = {}
+        self.matchers = {}
+        self.index = {}
+        self.memo  = OrderedDict()
 
     def install(self, matcher, fn, cost):
+        if isinstance(matcher, basestring):
+            pattern = parse(matcher)
+        else:
+            pattern = matcher
+
+        if fn in self.patterns:
+            self.index[head(self.patterns[fn])].remove(fn)
         self.funs[fn] = matcher
         self.costs[fn] = cost
+        self.patterns[fn] = pattern
+        self.matchers[fn] = compile_pattern(pattern)
+        self.index.setdefault(head(pattern), []).append(fn)
+        self.memo.clear()
 
-    def lookup(self, aterm):
-        # canidate functions, functions matching the signature of
-        # the term
+    def candidates(self, aterm):
+        """ The functions whose pattern may match the term. """
+        return self.index.get(head(aterm), []) + \
+               self.index.get(WILDCARD, [])
 
-        # Use the C libraries better pattern matching library,
-        # find a function in the Blaze library that matches the
-        # given aterm
-
-        matched = []
-        for f, sig in self.funs.iteritems():
-            ismatch, _ = match(sig, str(aterm))
-            if ismatch:
-                matched.append(f)
+    def lookup(self, aterm):
+        # Annotations are ignored when comparing terms, but not by the
+        # patterns
+        key = (aterm, getattr(aterm, 'annotation', None))
+        try:
+            result = self.memo.pop(key)
+        except KeyError:
+            # canidate functions, functions matching the signature of
+            # the term
+            matched = [f for f in self.candidates(aterm)
+                       if self.matchers[f](aterm) is not None]
 
-        if len(matched) == 0:
-            raise NoDispatch(aterm)
+            if len(matched) == 0:
+                raise NoDispatch(aterm)
 
-        # the canidate which has the minimal cost function
-        costs = [(f, self.costs[f](aterm)) for f in matched]
+            # the canidate which has the minimal cost function
+            costs = [(f, self.costs[f](aterm)) for f in matched]
 
-        return min(costs, key=lambda x: x[1])
+            result = min(costs, key=lambda x: x[1])
+            if len(self.memo) >= MEMO_SIZE:
+                self.memo.popitem(last=False)
+        self.memo[key] = result
+        return result
 
 _dispatch.dispatcher = Dispatcher()
 
@@ -94,6 +128,19 @@ _dispatch.dispatcher = Dispatcher()
 
 zerocost = lambda term: 0
 
+class lazy_ast(object):
+    """ The AST of a lifted function, parsed from its source when
+    first accessed rather than when the library is imported. """
+
+    def __init__(self, pyfn):
+        self.pyfn = pyfn
+        self.tree = None
+
+    def __get__(self, obj, cls):
+        if self.tree is None:
+            self.tree = ast.parse(getsource(self.pyfn))
+        return self.tree
+
 def lift(signature, typesig, constraints=None, **params):
     """ Lift a Python callable into Blaze with the given
     signature. Splice a function graph node constructor in its
@@ -124,8 +171,6 @@ def lift(signature, typesig, constraints=None, **params):
         # the dynamic type.
         cod = params.pop('cod', dynamic)
 
-        _ast = ast.parse(getsource(pyfn))
-
         fun = type(pyfn.func_name, (Fun,), {
             'nargs'       : nargs,
             'fn'          : pyfn,
@@ -133,7 +178,7 @@ def lift(signature, typesig, constraints=None, **params):
             'typesig'     : typesig,
             'cod'         : cod,
             'constraints' : constraints,
-            '_ast'        : _ast,
+            '_ast'        : lazy_ast(pyfn),
         })
 
         @wraps(pyfn)
@@ -176,6 +221,9 @@ def install(matcher, fn, cost=None):
         _dispatch.dispatcher.install(matcher, fn, costfn)
 
 def lookup(aterm):
+    # The library is installed when first needed, ``import blaze``
+    # does not import it
+    import blaze.lib
     return _dispatch.dispatcher.lookup(aterm)
 
 #------------------------------------------------------------------------
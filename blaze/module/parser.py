@@ -4,6 +4,9 @@ import re
 import os
 import sys
 import logging
+import hashlib
+import tempfile
+import cPickle as pickle
 
 from functools import partial
 
@@ -544,28 +547,100 @@ def parse(pattern):
 
 def mread(s):
     """
-    Read module from string
+    Read module from string.  The module is shared with every other
+    reader of the same source, see `load_module`.
     """
-    ast = parse(s)
-
-    if opts.ddump_parse:
-        logging.info(ast)
-
-    return build_module(ast)
+    return load_module(s)
 
 def mopen(f):
     """
-    Read module from file
+    Read module from file.  The module is shared with every other
+    reader of the same source, see `load_module`.
     """
     fd = open(f)
     contents = fd.read()
-    ast = parse(contents)
+    fd.close()
+    return load_module(contents)
+
+def build(source):
+    ast = parse(source)
 
     if opts.ddump_parse:
         logging.info(ast)
 
     return build_module(ast)
 
+#------------------------------------------------------------------------
+# Module Cache
+#------------------------------------------------------------------------
+
+# Typed modules are pickled to a directory, keyed by the hash of their
+# source, so the prelude is only parsed and typed once per source and
+# not in every process. Bump the version whenever the parser or the
+# structure of the typed modules change. Set the directory to None to
+# disable the cache.
+CACHE_VERSION = 2
+CACHE_DIR = os.environ.get('BLAZE_MODULE_CACHE',
+    os.path.join(os.path.expanduser('~'), '.blaze', 'modules')) or None
+
+# Modules loaded in this process, by key
+_modules = {}
+
+def cache_key(source):
+    return hashlib.sha1('%d\0%s' % (CACHE_VERSION, source)).hexdigest()
+
+def load_module(source):
+    """
+    The typed module of the source, built once and then loaded from the
+    cache.  All the callers in the process get the same Module object,
+    which must not be modified.
+    """
+    key = cache_key(source)
+    try:
+        return _modules[key]
+    except KeyError:
+        pass
+
+    mod = load_cached(key)
+    if mod is None:
+        mod = build(source)
+        store_cached(key, mod)
+    _modules[key] = mod
+    return mod
+
+def load_cached(key):
+    if CACHE_DIR is None:
+        return None
+    try:
+        with open(os.path.join(CACHE_DIR, key), 'rb') as fd:
+            version, mod = pickle.load(fd)
+    except Exception:
+        # Missing, or unreadable entries which are rebuilt and
+        # overwritten
+        return None
+    if version != CACHE_VERSION:
+        return None
+    return mod
+
+def store_cached(key, mod):
+    if CACHE_DIR is None:
+        return
+    tmp = None
+    try:
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        # Written aside and renamed so that concurrent readers never
+        # see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((CACHE_VERSION, mod), f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, os.path.join(CACHE_DIR, key))
+    except (IOError, OSError, TypeError, pickle.PicklingError):
+        # The cache is best effort, e.g. on a read-only home
+        logging.debug('Could not cache module %s', key, exc_info=True)
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
 #------------------------------------------------------------------------
 
 if __name__ == '__main__':
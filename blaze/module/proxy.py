@@ -1,3 +1,4 @@
+import os
 import operator
 from functools import partial
 from collections import namedtuple, Iterable
@@ -98,7 +99,10 @@ implicit_unops = {
 # Prelude
 #------------------------------------------------------------------------
 
-core = mopen('blaze.mod')
+PRELUDE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                       'blaze.mod')
+
+core = mopen(PRELUDE)
 
 pysorts = {
     'int'     : 'int',
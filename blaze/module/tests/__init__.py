@@ -0,0 +1,23 @@
+# The tests build their modules in a cache directory of their own,
+# rather than in the cache of the user.  The test modules load the
+# prelude when imported, so the cache is redirected on import of the
+# package rather than in setup_package.
+
+import os
+import shutil
+import tempfile
+
+from blaze.module import parser
+
+_saved = os.environ.get('BLAZE_MODULE_CACHE'), parser.CACHE_DIR
+os.environ['BLAZE_MODULE_CACHE'] = parser.CACHE_DIR = tempfile.mkdtemp()
+parser._modules.clear()
+
+def teardown_package():
+    shutil.rmtree(parser.CACHE_DIR, ignore_errors=True)
+    env, parser.CACHE_DIR = _saved
+    if env is None:
+        os.environ.pop('BLAZE_MODULE_CACHE', None)
+    else:
+        os.environ['BLAZE_MODULE_CACHE'] = env
+    parser._modules.clear()
@@ -1,5 +1,5 @@
 import blaze.module.nodes as N
-from blaze.module.proxy import Proxy
+from blaze.module.proxy import Proxy, PRELUDE
 from blaze.module.parser import mopen
 
 from operator import add
@@ -8,14 +8,14 @@ from nose.tools import assert_raises
 #------------------------------------------------------------------------
 
 def test_signatures():
-    a = mopen('blaze/module/blaze.mod')
+    a = mopen(PRELUDE)
     print "Module".center(80, '=')
     print a.show()
 
 #------------------------------------------------------------------------
 
 def test_adhoc():
-    a = mopen('blaze.mod')
+    a = mopen(PRELUDE)
 
     ty = ('Array', [('t', 'int')])
     over = a.resolve_adhoc('add', ty)
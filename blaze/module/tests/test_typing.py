@@ -1,3 +1,4 @@
+import os
 import blaze.module.typing
 import blaze.module.nodes as N
 from blaze.module.parser import mread
@@ -58,3 +59,57 @@ def test_typeset():
 
     mod = mread(example)
     sig = mod.bound_ns['Array']['lt']
+
+def test_module_cache():
+    import tempfile, shutil
+    from blaze.module import parser
+
+    example = \
+    """
+    module Test1 {
+
+        trait Foo[A t]:
+            fun lt :: (A t, A t) -> (A bool)
+
+        impl Foo[Array t]:
+            fun lt = pass
+    }
+
+    """
+
+    cache_dir = parser.CACHE_DIR
+    parser.CACHE_DIR = tempfile.mkdtemp()
+    parser._modules.clear()
+    try:
+        mod = mread(example)
+        # shared in the process
+        assert mread(example) is mod
+
+        # and loaded from the disk in a new one
+        parser._modules.clear()
+        assert os.listdir(parser.CACHE_DIR) == [parser.cache_key(example)]
+        mod2 = mread(example)
+        assert mod2 is not mod
+        assert mod2.bound_ns['Array']['lt'].show() == \
+               mod.bound_ns['Array']['lt'].show()
+    finally:
+        shutil.rmtree(parser.CACHE_DIR)
+        parser.CACHE_DIR = cache_dir
+
+def test_memoized_resolution():
+    from blaze.module.proxy import core
+
+    ty = ('Array', [('t', 'int')])
+    over = core.resolve_adhoc('add', ty)
+    assert core.resolve_adhoc('add', ('Array', [('t', 'int')])) is over
+
+def test_instances_on_signature():
+    from blaze.module.proxy import core
+    from blaze.module.typing import instantiate
+
+    sig = core.bound_ns['Array']['add']
+    ctx = {'t': 'int'}
+    outsig = instantiate(ctx, sig)
+    # memoized on the signature, not process-wide
+    assert instantiate(dict(ctx), sig) is outsig
+    assert sig.instances[frozenset(ctx.iteritems())] is outsig
@@ -116,8 +116,20 @@ def resolve(ctx, ty):
         return ctx.get(ty, N.pv(ty))
 
 # Instantiate the function definition in the scope of a type instance
-# and the class parameters.
+# and the class parameters. The instantiations are memoized on the
+# signature by scope, and so live as long as its module.
 def instantiate(lctx, sig):
+    try:
+        key = frozenset(lctx.iteritems())
+        return sig.instances[key]
+    except TypeError:
+        # unhashable scope
+        return _instantiate(lctx, sig)
+    except KeyError:
+        outsig = sig.instances[key] = _instantiate(lctx, sig)
+        return outsig
+
+def _instantiate(lctx, sig):
     icod = sig.cod
     outsig = ()
 
@@ -264,10 +276,26 @@ class Matcher(object):
     def __init__(self, fn, impls):
         self.fn = fn
         self.impls = impls
+        # resolutions by argument type
+        self.memo = {}
 
     def __call__(self, ty):
         con = ty[0]
         args = ty[1]
+
+        try:
+            key = (con, tuple(args))
+            return self.memo[key]
+        except TypeError:
+            return self.resolve(con, args)
+        except KeyError:
+            result = self.memo[key] = self.resolve(con, args)
+            return result
+
+    def __getstate__(self):
+        return dict(self.__dict__, memo={})
+
+    def resolve(self, con, args):
         ctx = dict(args)
 
         for ity, impl in self.impls:
@@ -589,6 +617,11 @@ class Signature(object):
         self.node = node
         # class constraints
         self.constraints = {}
+        # instantiations by scope
+        self.instances = {}
+
+    def __getstate__(self):
+        return dict(self.__dict__, instances={})
 
     def show(self):
         # uncurred domain so join with (->)
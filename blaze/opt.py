@@ -1,53 +1,303 @@
 """
+Optimization of expression graphs by term rewriting.
+
+Before a graph is compiled it is translated into an ATerm, the
+operators becoming applications named after their class and the
+literals ``Const`` terms::
+
+    (a + 2*3)[10:]
+
+    Slice(Add(Leaf(0), Mul(Const(2), Const(3))), Const(10), None, None)
+
+Anything else (arrays, tables, lifted functions) stands for itself as a
+``Leaf``.  The term is normalized with the rules of this module
+(``blaze.aterm.rewrite``) and translated back, reusing the nodes of the
+original graph for the subterms left unchanged.
 """
 
-import pyrewrite
+import numpy as np
 
-# We'd like to be just be able to quote these rules inline... ala
-# Mython.
+from blaze.expr import graph, ops
+from blaze.expr.graph import App, Op, IntNode, FloatNode, StringNode
+from blaze.aterm import aterm, aappl, aint, areal, astr
+from blaze.aterm.rewrite import Rule, Rewriter
+from blaze.rts.ufuncs import ufuncs
 
 #------------------------------------------------------------------------
 # Constant Folding
 #------------------------------------------------------------------------
 
-const = """
+def const(value):
+    """ The term of a Python scalar, or None if it has none. """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool):
+        return None
+    elif isinstance(value, int):
+        return aappl(aterm('Const'), [aint(value)])
+    elif isinstance(value, float):
+        return aappl(aterm('Const'), [areal(value)])
+    return None
 
-cfold: Add(Const(n), Const(m))   -> Const(k) where { k = n+m }
-cfold: Mul(Const(n), Const(m))   -> Const(k) where { k = n*m }
-cfold: Sub(Const(n), Const(m))   -> Const(k) where { k = n-m }
-cfold: Div(Const(n), Const(m))   -> Const(k) where { k = n/m }
-cfold: Mod(Const(n), Const(m))   -> Const(k) where { k = n%m }
-cfold: Power(Const(n), Const(m)) -> Const(k) where { k = n**m }
+def cfold(name):
+    # Folded with the kernel of the operator so that constants behave
+    # as they would at runtime
+    ufunc = ufuncs[name]
+    def fold(n, m):
+        if not isinstance(n, (aint, areal)) or not isinstance(m, (aint, areal)):
+            return None
+        with np.errstate(all='ignore'):
+            return const(ufunc(n.val, m.val))
+    return Rule('%s(Const(<term>),Const(<term>))' % name, fold, 'cfold')
 
-const-fold = repeat(topdown(cfold) <+ id)
+const_rules = [cfold(name) for name in ['Add', 'Sub', 'Mul', 'Div', 'Pow']]
 
-"""
+#------------------------------------------------------------------------
+# Conditional Folding
+#------------------------------------------------------------------------
 
-const_mod = pyrewrite.module(const)
+def eval_if(cond, e1, e2):
+    if isinstance(cond, (aint, areal)):
+        return e1 if cond.val else e2
+    return None
 
-def constant_fold(expr):
-    return const_mod.rewrite(expr)
+def prop_if(cond, f, x, g, y):
+    # Lift the conditional out of the same unary operator
+    if f == g and f.term not in ('Const', 'Leaf'):
+        return aappl(f, [aappl(aterm('IfElse'), [cond, x, y])])
+    return None
+
+cond_rules = [
+    Rule('IfElse(Const(<term>),<term>,<term>)', eval_if, 'EvalIf'),
+    Rule('IfElse(True,<term>,<term>)', lambda e1, e2: e1, 'EvalIf'),
+    Rule('IfElse(False,<term>,<term>)', lambda e1, e2: e2, 'EvalIf'),
+    Rule('IfElse(<term>,<appl(<term>)>,<appl(<term>)>)', prop_if, 'PropIf'),
+]
 
 #------------------------------------------------------------------------
-# Conditional Folding
+# Algebraic Simplification
 #------------------------------------------------------------------------
 
-cond = """
+# The values of the symbolic identities of the operators. The boolean
+# ones are not used, literals are never booleans.
+identities = {ops.zero: 0, ops.one: 1}
 
-EvalIf :
-    IfElse(False(), e1, e2) -> e2
+def is_const(term):
+    return isinstance(term, aappl) and term.spine.term == 'Const' and \
+           isinstance(term.args[0], (aint, areal))
 
-EvalIf :
-    IfElse(True(), e1, e2) -> e1
+def order(term):
+    """ The sort key of the operands of a commutative operator. Leaves
+    are numbered left to right, so operands mostly keep their order. """
+    if isinstance(term, aappl):
+        return (term.spine.term, tuple(map(order, term.args)))
+    elif isinstance(term, (aint, areal, astr)):
+        return ('', term.val)
+    return (str(term),)
 
-PropIf :
-    IfElse(B,@F(X),@F(Y)) -> F(IfElse(B,X,Y))
+def operators():
+    """ The operator classes, with their algebraic properties. """
+    for name in dir(ops):
+        cls = getattr(ops, name)
+        if isinstance(cls, type) and issubclass(cls, Op) and \
+           hasattr(cls, 'associative'):
+            yield name, cls
 
-cond-fold = repeat(topdown(EvalIf) <+ id)
+def remove_identity(value, left=False):
+    # x + 0 -> x, only integer identities keep the type of x
+    def remove(x, c):
+        if left:
+            x, c = c, x
+        if c.val == value:
+            return x
+        return None
+    return remove
 
-"""
+def reassociate(name, cls):
+    """
+    Canonicalize a chain of an associative and commutative operator:
+    the operands are sorted, the constants folded into one last operand
+    (dropped if it is the identity), and the chain rebuilt as a
+    balanced tree::
+
+        ((a + 1) + b) + 2  ->  (a + b) + 3
+
+    Sorted chains with the same operands are the same term, so they are
+    computed once.
+    """
+    spine = aterm(name)
+    ufunc = ufuncs.get(name)
+    identity = identities.get(cls.identity)
+
+    def flatten(term, operands):
+        if isinstance(term, aappl) and term.spine == spine and \
+           len(term.args) == 2:
+            flatten(term.args[0], operands)
+            flatten(term.args[1], operands)
+        else:
+            operands.append(term)
+        return operands
+
+    def balance(operands):
+        if len(operands) == 1:
+            return operands[0]
+        mid = len(operands) // 2
+        return aappl(spine, [balance(operands[:mid]),
+                             balance(operands[mid:])])
+
+    def action(x, y):
+        operands = flatten(y, flatten(x, []))
+        consts = [t for t in operands if is_const(t)]
+        operands = sorted([t for t in operands if not is_const(t)], key=order)
+
+        if cls.idempotent:
+            operands = [t for i, t in enumerate(operands)
+                        if i == 0 or t is not operands[i-1]]
+
+        if consts and ufunc is not None:
+            value = consts[0].args[0].val
+            with np.errstate(all='ignore'):
+                for c in consts[1:]:
+                    value = ufunc(value, c.args[0].val)
+            folded = const(value)
+            if folded is not None:
+                consts = [folded]
+                value = folded.args[0]
+                if operands and isinstance(value, aint) and \
+                   value.val == identity:
+                    consts = []
+
+        result = balance(operands + consts)
+        if result is aappl(spine, [x, y]):
+            return None
+        return result
+    return action
 
-cond_mod = pyrewrite.module(cond)
+def algebraic():
+    rules = []
+    for name, cls in operators():
+        if cls.arity == 1 and cls.nilpotent:
+            # ~~x -> x
+            rules.append(Rule('%s(%s(<term>))' % (name, name),
+                              lambda x: x, 'nilpotent'))
+        elif cls.arity == 1 and cls.idempotent:
+            # abs(abs(x)) -> abs(x)
+            rules.append(Rule('%s(%s(<term>))' % (name, name),
+                              lambda x, name=name: aappl(aterm(name), [x]),
+                              'idempotent'))
+        elif cls.arity == 2 and cls.associative and cls.commutative:
+            rules.append(Rule('%s(<term>,<term>)' % name,
+                              reassociate(name, cls), 'reassociate'))
+        elif cls.arity == 2 and cls.identity in identities:
+            value = identities[cls.identity]
+            rules.append(Rule('%s(<term>,Const(<int>))' % name,
+                              remove_identity(value), 'identity'))
+            if cls.commutative:
+                rules.append(Rule('%s(Const(<int>),<term>)' % name,
+                                  remove_identity(value, left=True),
+                                  'identity'))
+    return rules
+
+algebraic_rules = algebraic()
+
+#------------------------------------------------------------------------
+# Graphs and Terms
+#------------------------------------------------------------------------
+
+class Terms(object):
+    """ Translates a graph into a term and back. """
+
+    def __init__(self):
+        self.leaves = []
+        # Graph nodes by the id of the term they were translated into
+        self.nodes = {}
+        # The operator classes by name, as found in the graph
+        self.ops = {}
+        self._terms = {}
+
+    def to_term(self, node):
+        key = id(node)
+        if key not in self._terms:
+            term = self._to_term(node)
+            self._terms[key] = term
+            # Applications replace the operator they wrap
+            self.nodes[id(term)] = (term, node)
+        return self._terms[key]
+
+    def _to_term(self, node):
+        if node is None:
+            return aterm('None')
+        elif isinstance(node, App) and not node.operator.kwargs:
+            # Applications with keyword arguments are kept opaque, the
+            # terms have no room for them
+            op = node.operator
+            term = self.to_term(op)
+            self.ops[type(op).__name__] = (type(op), op.op, True)
+            return term
+        elif isinstance(node, Op) and type(node) is not Op:
+            self.ops.setdefault(type(node).__name__,
+                                (type(node), node.op, False))
+            return aappl(aterm(type(node).__name__),
+                         [self.to_term(a) for a in node.children])
+        elif isinstance(node, (IntNode, FloatNode)) and const(node.val):
+            return const(node.val)
+        elif isinstance(node, StringNode):
+            return aappl(aterm('Const'), [astr(node.val)])
+        else:
+            self.leaves.append(node)
+            return aappl(aterm('Leaf'), [aint(len(self.leaves) - 1)])
+
+    def to_node(self, term):
+        try:
+            return self.nodes[id(term)][1]
+        except KeyError:
+            pass
+        node = self._to_node(term)
+        self.nodes[id(term)] = (term, node)
+        return node
+
+    def _to_node(self, term):
+        if isinstance(term, aterm) and term.term == 'None':
+            return None
+        elif not isinstance(term, aappl):
+            raise ValueError("Not the term of a graph: %s" % term)
+
+        name = term.spine.term
+        if name == 'Leaf':
+            return self.leaves[term.args[0].val]
+        elif name == 'Const':
+            val = term.args[0].val
+            return {int: IntNode, float: FloatNode, str: StringNode}[
+                type(val)](val)
+
+        children = [self.to_node(a) for a in term.args]
+        if name in self.ops:
+            cls, op, app = self.ops[name]
+        elif isinstance(getattr(ops, name, None), type):
+            cls, op, app = getattr(ops, name), name, True
+        else:
+            cls, op, app = getattr(graph, name), name, False
+        node = cls(op, children)
+        return App(node) if app else node
+
+#------------------------------------------------------------------------
+# Toplevel
+#------------------------------------------------------------------------
+
+rewriter = Rewriter(const_rules + cond_rules + algebraic_rules)
+
+def optimize(expr, rewriter=rewriter):
+    """ Rewrite the graph rooted at `expr`, returns `expr` itself if no
+    rule applies. """
+    terms = Terms()
+    term = terms.to_term(expr)
+    return terms.to_node(rewriter.rewrite(term))
+
+def constant_fold(expr):
+    return optimize(expr, Rewriter(const_rules))
 
 def conditional_fold(expr):
-    return cond_mod.rewrite(expr)
+    return optimize(expr, Rewriter(cond_rules))
+
+def simplify(expr):
+    return optimize(expr, Rewriter(const_rules + algebraic_rules))
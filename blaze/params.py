@@ -1,5 +1,3 @@
-from blaze import carray
-
 defaults = {
     'clevel'        : 5,
     'shuffle'       : True,
@@ -66,6 +64,7 @@ class params(object):
 
 def to_cparams(params):
     """Convert params to cparams.  roodir and format_flavor also extracted."""
+    from blaze import carray
     cparams = {}; rootdir = format_flavor = None
     for key, val in params.iteritems():
         if key == 'storage':
@@ -0,0 +1,158 @@
+"""
+Mergeable partial aggregates.
+
+A partial aggregate summarizes a set of blocks in constant space.  Two
+partials over disjoint sets of blocks merge into the partial of their
+union, so a reduction can be computed block by block, in any order, and
+later extended with new blocks without rescanning the old ones::
+
+    agg = Mean()
+    for block in blocks:
+        agg.update(block)
+    agg.value()
+"""
+
+import numpy as np
+
+class Aggregate(object):
+    """ The partial aggregate of the blocks seen so far. """
+
+    def update(self, block):
+        """ Fold a block of values into the aggregate. """
+        self.merge(self.partial(np.asarray(block)))
+
+    def partial(self, block):
+        """ Return the aggregate of a single block. """
+        raise NotImplementedError
+
+    def merge(self, other):
+        """ Fold the aggregate of disjoint blocks into this one. """
+        raise NotImplementedError
+
+    def value(self):
+        """ The value of the reduction over all the blocks. """
+        raise NotImplementedError
+
+class UfuncAggregate(Aggregate):
+    """ Reduction by an associative binary ufunc, e.g. ``np.add``. """
+
+    def __init__(self, ufunc):
+        self.ufunc = ufunc
+        self.result = None
+
+    def partial(self, block):
+        partial = UfuncAggregate(self.ufunc)
+        if block.size:
+            partial.result = self.ufunc.reduce(block, axis=None)
+        return partial
+
+    def merge(self, other):
+        if other.result is None:
+            return
+        if self.result is None:
+            self.result = other.result
+        else:
+            self.result = self.ufunc(self.result, other.result)
+
+    def value(self):
+        if self.result is None:
+            # This raises for reductions without identity
+            return self.ufunc.reduce(np.empty(0))
+        return self.result
+
+class Count(Aggregate):
+    """ The number of values. """
+
+    def __init__(self):
+        self.n = 0
+
+    def partial(self, block):
+        partial = Count()
+        partial.n = block.size
+        return partial
+
+    def merge(self, other):
+        self.n += other.n
+
+    def value(self):
+        return self.n
+
+class Mean(Aggregate):
+    """ The arithmetic mean, from the count and the sum. """
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+
+    def partial(self, block):
+        partial = Mean()
+        partial.n = block.size
+        partial.total = block.sum(dtype=np.float64)
+        return partial
+
+    def merge(self, other):
+        self.n += other.n
+        self.total += other.total
+
+    def value(self):
+        if self.n == 0:
+            return np.nan
+        return self.total / self.n
+
+class Var(Aggregate):
+    """
+    The population variance.
+
+    The partials hold the count, mean and sum of squared deviations from
+    the mean, and are merged with the pairwise update of Chan et al.,
+    which unlike the sum of squares does not lose precision when the
+    mean is large compared to the spread.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def partial(self, block):
+        partial = type(self)()
+        partial.n = block.size
+        if block.size:
+            partial.mean = block.mean(dtype=np.float64)
+            deviations = block - partial.mean
+            partial.m2 = np.dot(deviations.ravel(), deviations.ravel())
+        return partial
+
+    def merge(self, other):
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+
+    def value(self):
+        if self.n == 0:
+            return np.nan
+        return self.m2 / self.n
+
+class Std(Var):
+    """ The population standard deviation. """
+
+    def value(self):
+        return np.sqrt(Var.value(self))
+
+# Aggregates by name
+aggregates = {
+    'sum'   : lambda: UfuncAggregate(np.add),
+    'prod'  : lambda: UfuncAggregate(np.multiply),
+    'min'   : lambda: UfuncAggregate(np.minimum),
+    'max'   : lambda: UfuncAggregate(np.maximum),
+    'all'   : lambda: UfuncAggregate(np.logical_and),
+    'any'   : lambda: UfuncAggregate(np.logical_or),
+    'count' : Count,
+    'mean'  : Mean,
+    'var'   : Var,
+    'std'   : Std,
+}
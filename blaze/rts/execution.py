@@ -0,0 +1,134 @@
+"""
+Chunked streaming execution of compiled plans.
+
+The plan produced by ``blaze.compile._compile`` is run once for every
+block of the schedule: the block is read from each leaf source, pushed
+through the whole expression and the result is either appended to the
+output carray or folded into the running reduction.  Only block-sized
+temporaries are ever allocated, so expressions over larger-than-memory
+sources can be evaluated.
+"""
+
+import numpy as np
+
+from blaze.carray import carray, ctable
+from blaze.compile import LOAD, CONST, CALL, Selection
+from blaze.error import ExecutionError
+from blaze.rts.aggregates import aggregates
+from blaze.sources.chunked import CArraySource
+
+def run_values(ctx, plan, start, stop):
+    """ Evaluate the plan over the rows [start, stop) of the leaf
+    sources, returning the values of all the instructions. """
+    values = []
+    for ins in plan:
+        if ins.opcode == LOAD:
+            values.append(ctx.sources[ins.arg][start:stop])
+        elif ins.opcode == CONST:
+            values.append(ins.arg)
+        elif ins.opcode == CALL:
+            values.append(ins.arg(*[values[i] for i in ins.operands]))
+    return values
+
+def run_block(ctx, plan, start, stop):
+    """ Evaluate the plan over the rows [start, stop) of the leaf
+    sources. """
+    return run_values(ctx, plan, start, stop)[-1]
+
+def itervalues(ctx, plan):
+    """ Iterate over the values of the plan for every block. """
+    if not ctx.sources:
+        # Nothing to stream, just constants
+        yield run_values(ctx, plan, 0, 0)
+        return
+    for start, stop in ctx.schedule:
+        yield run_values(ctx, plan, start, stop)
+
+def iterblocks(ctx, plan):
+    """ Iterate over the result of the plan for every block. """
+    for values in itervalues(ctx, plan):
+        yield values[-1]
+
+def select(ctx, selection):
+    """ Evaluate a Selection, copying the rows of the blocks where the
+    predicate holds. """
+    from blaze.table import Array, Table
+    from blaze.datashape import from_numpy
+    from blaze.sources.chunked import CTableSource
+
+    cols = [carray(np.empty(0, dtype=ctx.sources[i].ca.dtype))
+            for i in selection.outputs]
+    for start, stop in ctx.schedule:
+        mask = np.asarray(run_block(ctx, selection.plan, start, stop))
+        if mask.dtype != np.bool_:
+            raise ExecutionError("Filters must be boolean, not %s" %
+                                 mask.dtype)
+        if not mask.any():
+            continue
+        for i, col in zip(selection.outputs, cols):
+            col.append(ctx.sources[i][start:stop][mask])
+    for col in cols:
+        col.flush()
+
+    if selection.column is not None:
+        return Array(CArraySource.wrap(cols[0]))
+    result = ctable(cols, selection.names)
+    dshape = from_numpy(result.shape, result.dtype)
+    return Table(CTableSource(result, dshape=dshape), dshape=dshape)
+
+def execplan(ctx, plan, params=None):
+    """
+    Execute a compiled plan.
+
+    Parameters
+    ----------
+    ctx : ExecutionContext
+    plan : Plan
+    params : params
+        The parameters of the output array, e.g. its storage.
+
+    Returns
+    -------
+    out : Array, Table, scalar or list of scalars
+        A scalar if the plan ends in a full reduction, a list of them
+        if it has several outputs, a Table for the selections of whole
+        rows, a chunked Array otherwise.
+
+    """
+    from blaze.table import Array
+
+    if isinstance(plan, Selection):
+        return select(ctx, plan)
+
+    if plan.outputs is not None:
+        # Several reductions in a single pass
+        accs = [aggregates[name]() for name in plan.reduction]
+        for values in itervalues(ctx, plan):
+            for acc, i in zip(accs, plan.outputs):
+                acc.update(values[i])
+        return [acc.value() for acc in accs]
+
+    if plan.reduction is not None:
+        aggregate = aggregates[plan.reduction]()
+        for block in iterblocks(ctx, plan):
+            aggregate.update(block)
+        return aggregate.value()
+
+    source = None
+    for block in iterblocks(ctx, plan):
+        block = np.asarray(block)
+        if source is None:
+            if not ctx.sources:
+                # No leaves, the result is just a scalar
+                return block[()]
+            source = CArraySource(np.empty((0,) + block.shape[1:],
+                                           dtype=block.dtype),
+                                  params=params)
+        source.ca.append(block)
+
+    if source is None:
+        # Empty sources, the output type is found from an empty block
+        block = np.asarray(run_block(ctx, plan, 0, 0))
+        source = CArraySource(block, params=params)
+    source.ca.flush()
+    return Array(source)
@@ -0,0 +1,224 @@
+"""
+Process-wide cache of materialized expression results.
+
+Interactive sessions evaluate the same deferred expressions over the
+same sources again and again.  Results are kept here, keyed by the
+fingerprint of the compiled plan and the identity of its sources, and
+are only reused while the version token of every source
+(``ByteProvider.version``) is unchanged.  A modified source makes
+exactly the entries computed from it stale; they are dropped the next
+time they are looked up, or evicted as the least recently used.
+
+The cache is bounded by the compressed size of the results.  When a
+spill directory is given, array results evicted from memory are saved
+there as persistent carrays, up to their own size limit, rather than
+being dropped.
+"""
+
+import os
+import shutil
+import tempfile
+from weakref import ref
+from threading import Lock
+from collections import OrderedDict
+
+_MB = 1024*1024
+
+# Nominal size of a scalar result
+SCALAR_NBYTES = 64
+
+class Entry(object):
+    """ A cached result.  The sources are referenced weakly, so the
+    cache does not keep them alive.  An entry whose sources are gone,
+    or were replaced by new sources of the same identity, is stale. """
+
+    __slots__ = ('versions', 'sources', 'result', 'rversion', 'nbytes',
+                 'rootdir')
+
+    def __init__(self, versions, sources, result, rversion, nbytes):
+        self.versions = versions
+        self.sources = [ref(p) for p in sources]
+        self.result = result
+        self.rversion = rversion
+        self.nbytes = nbytes
+        self.rootdir = None
+
+    def valid(self, versions, sources):
+        """ Whether the entry was computed from `sources`, which are
+        still at `versions`. """
+        return self.versions == versions and \
+               len(self.sources) == len(sources) and \
+               all(r() is p for r, p in zip(self.sources, sources))
+
+def result_info(result):
+    """ Return the (version, nbytes) of a result. """
+    data = getattr(result, 'data', None)
+    if data is not None and hasattr(data, 'ca'):
+        return data.version(), data.ca.cbytes
+    return None, SCALAR_NBYTES
+
+class ResultCache(object):
+    """
+    A thread-safe, LRU cache of expression results bounded in bytes.
+
+    Parameters
+    ----------
+    maxbytes : int
+        The maximum (compressed) size of the results kept in memory.
+    spilldir : string
+        A directory where array results evicted from memory are saved.
+        If None, evicted results are dropped.
+    maxspillbytes : int
+        The maximum size of the results kept in `spilldir`.
+    """
+
+    def __init__(self, maxbytes=64*_MB, spilldir=None, maxspillbytes=1024*_MB):
+        self.maxbytes = maxbytes
+        self.spilldir = spilldir
+        self.maxspillbytes = maxspillbytes
+        self.nbytes = 0
+        self.spillbytes = 0
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._spilled = OrderedDict()
+
+    def key(self, ctx, plan):
+        """ The cache key for a compiled plan, and the versions of its
+        sources, or (None, None) if the result can not be cached. """
+        fingerprint = plan.fingerprint()
+        if fingerprint is None:
+            return None, None
+        versions = tuple(p.version() for p in ctx.providers)
+        if any(v is None for v in versions):
+            return None, None
+        key = (fingerprint, ctx.identity())
+        return key, versions
+
+    def lookup(self, key, versions, sources):
+        """ Return the result for `key` if it is still valid, or None. """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry.nbytes
+            else:
+                entry = self._spilled.pop(key, None)
+                if entry is None:
+                    return None
+                self.spillbytes -= entry.nbytes
+                if not entry.valid(versions, sources):
+                    self._remove(entry)
+                    return None
+                self._load(entry)
+            if not entry.valid(versions, sources) or \
+               result_info(entry.result)[0] != entry.rversion:
+                # Stale, either a source or the result itself changed
+                return None
+            # Hit! Reinsert as the most recently used
+            self._entries[key] = entry
+            self.nbytes += entry.nbytes
+            self._evict()
+            return entry.result
+
+    def store(self, key, versions, sources, result):
+        """ Cache `result` as the value for `key`. """
+        rversion, nbytes = result_info(result)
+        entry = Entry(versions, sources, result, rversion, nbytes)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            old = self._spilled.pop(key, None)
+            if old is not None:
+                self.spillbytes -= old.nbytes
+                self._remove(old)
+            self._entries[key] = entry
+            self.nbytes += nbytes
+            self._evict()
+
+    def get(self, ctx, plan, compute):
+        """ Return the cached result of `plan`, or call `compute` and
+        cache what it returns. """
+        key, versions = self.key(ctx, plan)
+        if key is None:
+            return compute()
+        result = self.lookup(key, versions, ctx.providers)
+        if result is None:
+            result = compute()
+            self.store(key, versions, ctx.providers, result)
+        return result
+
+    def invalidate(self, provider=None):
+        """ Drop the results computed from `provider`, or all of them if
+        None. """
+        with self._lock:
+            for entries in (self._entries, self._spilled):
+                for key, entry in list(entries.items()):
+                    if provider is None or \
+                       any(r() is provider for r in entry.sources):
+                        del entries[key]
+                        if entries is self._entries:
+                            self.nbytes -= entry.nbytes
+                        else:
+                            self.spillbytes -= entry.nbytes
+                        self._remove(entry)
+
+    def clear(self):
+        """ Drop all the results. """
+        self.invalidate()
+
+    # Must be called with the lock held
+    # ---------------------------------
+
+    def _evict(self):
+        while self.nbytes > self.maxbytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self.nbytes -= entry.nbytes
+            if self.spilldir is not None and self._spillable(entry):
+                self._spill(key, entry)
+        while self.spillbytes > self.maxspillbytes and self._spilled:
+            _, entry = self._spilled.popitem(last=False)
+            self.spillbytes -= entry.nbytes
+            self._remove(entry)
+
+    def _spillable(self, entry):
+        # Only unmodified array results are saved, as carrays
+        from blaze.sources.chunked import CArraySource
+        return entry.rversion is not None \
+            and entry.nbytes <= self.maxspillbytes \
+            and isinstance(entry.result.data, CArraySource) \
+            and result_info(entry.result)[0] == entry.rversion
+
+    def _spill(self, key, entry):
+        if not os.path.isdir(self.spilldir):
+            os.makedirs(self.spilldir)
+        entry.rootdir = tempfile.mkdtemp(dir=self.spilldir)
+        ondisk = entry.result.data.ca.copy(rootdir=entry.rootdir, mode='w')
+        ondisk.flush()
+        entry.result = None
+        self._spilled[key] = entry
+        self.spillbytes += entry.nbytes
+
+    def _load(self, entry):
+        # Bring the result back in memory, so the spilled copy is only
+        # ever referenced by the cache
+        from blaze.carray import carray
+        from blaze.table import Array
+        from blaze.sources.chunked import CArraySource
+        ondisk = carray(rootdir=entry.rootdir, mode='r')
+        entry.result = Array(CArraySource.wrap(ondisk.copy()))
+        entry.rversion, _ = result_info(entry.result)
+        self._remove(entry)
+
+    def _remove(self, entry):
+        if entry.rootdir is not None:
+            shutil.rmtree(entry.rootdir, ignore_errors=True)
+            entry.rootdir = None
+
+    def __len__(self):
+        return len(self._entries) + len(self._spilled)
+
+    def __repr__(self):
+        return 'ResultCache(maxbytes=%d, spilldir=%r)' % (
+            self.maxbytes, self.spilldir)
+
+results = ResultCache()
@@ -0,0 +1,34 @@
+"""
+Elementwise kernels.
+
+The NumPy ufuncs computing the elementwise operators of the expression
+graph, by operator name.  They are used by the executor and to fold
+constants.
+"""
+
+import numpy as np
+
+ufuncs = {
+    'Add'      : np.add,
+    'Sub'      : np.subtract,
+    'Mul'      : np.multiply,
+    'Div'      : np.divide,
+    'Truediv'  : np.true_divide,
+    'Floordiv' : np.floor_divide,
+    'Mod'      : np.mod,
+    'Pow'      : np.power,
+    'Abs'      : np.absolute,
+    'Neg'      : np.negative,
+    'Invert'   : np.invert,
+    'And'      : np.bitwise_and,
+    'Or'       : np.bitwise_or,
+    'Xor'      : np.bitwise_xor,
+    'Lshift'   : np.left_shift,
+    'Rshift'   : np.right_shift,
+    'Lt'       : np.less,
+    'Le'       : np.less_equal,
+    'Gt'       : np.greater,
+    'Ge'       : np.greater_equal,
+    'Eq'       : np.equal,
+    'Ne'       : np.not_equal,
+}
@@ -0,0 +1,109 @@
+"""
+Incrementally maintained views of deferred expressions.
+
+A view is a deferred expression over append-only sources whose result
+is kept up to date as the sources grow.  Rather than re-evaluating the
+whole expression, every read only streams the rows appended since the
+previous one through the compiled plan:
+
+* elementwise expressions append the new output blocks to the result,
+* reductions fold the new blocks into a mergeable partial aggregate
+  (``blaze.rts.aggregates``).
+
+::
+
+    view = View(a * b, 'sum')
+    a.data.ca.append(x); b.data.ca.append(y)
+    view.result           # only reads the new rows
+
+Sources are assumed to only ever be appended to.  Writes to rows
+already folded into the view are not seen by it.
+"""
+
+import numpy as np
+from threading import Lock
+
+from blaze.compile import _compile, common_length, blocks, Selection
+from blaze.error import ExecutionError
+from blaze.rts.aggregates import aggregates
+from blaze.rts.execution import run_block
+from blaze.sources.chunked import CArraySource
+
+class View(object):
+    """
+    A deferred expression maintained under appends to its sources.
+
+    Parameters
+    ----------
+    expr : ExpressionNode
+        The expression, either elementwise or a full reduction.
+    how : string
+        The name of a reduction applied to the elementwise `expr`, one
+        of the keys of ``blaze.rts.aggregates.aggregates`` (e.g.
+        'count', 'mean' or 'var').
+    params : params
+        The parameters of the output array of an elementwise view.
+    """
+
+    def __init__(self, expr, how=None, params=None):
+        self.ctx, self.plan = _compile(expr)
+        if isinstance(self.plan, Selection):
+            raise ExecutionError("Views of table filters are not supported")
+        if not self.ctx.sources:
+            raise ExecutionError("Views need at least one source")
+
+        if how is not None:
+            if self.plan.reduction is not None:
+                raise ExecutionError(
+                    "Cannot apply %r to a reduction" % (how,))
+            try:
+                self.aggregate = aggregates[how]()
+            except KeyError:
+                raise ExecutionError("Unknown reduction %r" % (how,))
+        elif self.plan.reduction is not None:
+            self.aggregate = aggregates[self.plan.reduction]()
+        else:
+            self.aggregate = None
+
+        self.output = None
+        if self.aggregate is None:
+            # The output type is found from an empty block
+            block = np.asarray(run_block(self.ctx, self.plan, 0, 0))
+            self.output = CArraySource(block, params=params)
+
+        # Rows of the sources folded into the result so far
+        self.nrows = 0
+        self._lock = Lock()
+
+    def refresh(self):
+        """ Fold the rows appended to the sources since the last refresh
+        into the result.  Returns the number of new rows. """
+        with self._lock:
+            length = common_length(self.ctx.sources)
+            if length < self.nrows:
+                raise ExecutionError(
+                    "Sources of a view shrank from %d to %d rows" % (
+                        self.nrows, length))
+            for start, stop in blocks(self.ctx.blocklen, self.nrows, length,
+                                      self.ctx.phase):
+                block = run_block(self.ctx, self.plan, start, stop)
+                if self.aggregate is not None:
+                    self.aggregate.update(block)
+                else:
+                    self.output.ca.append(np.asarray(block))
+            new, self.nrows = length - self.nrows, length
+            return new
+
+    @property
+    def result(self):
+        """ The up to date result: a scalar for reductions, an Array
+        otherwise. """
+        from blaze.table import Array
+        self.refresh()
+        if self.aggregate is not None:
+            return self.aggregate.value()
+        self.output.ca.flush()
+        return Array(self.output)
+
+    def __repr__(self):
+        return 'View(%d rows)\n%r' % (self.nrows, self.plan)
@@ -15,6 +15,8 @@ from blaze.params import params, to_cparams
 from blaze.layouts.scalar import ChunkedL
 
 from blaze.desc.byteprovider import ByteProvider
+from blaze.sources.handles import signature, CARRAY_METAFILES, \
+    CTABLE_METAFILES
 from blaze.desc.datadescriptor import CArrayDataDescriptor
 
 #------------------------------------------------------------------------
@@ -67,6 +69,15 @@ class CArraySource(ByteProvider):
             self.ca = carray.carray(data, rootdir=rootdir, cparams=cparams)
             self.dshape = from_numpy(self.ca.shape, self.ca.dtype)
 
+    @classmethod
+    def wrap(cls, ca):
+        """ Create a CArraySource around an existing carray, without
+        copying it. """
+        source = cls.__new__(cls)
+        source.ca = ca
+        source.dshape = from_numpy(ca.shape, ca.dtype)
+        return source
+
     @classmethod
     def empty(self, dshape):
         """ Create a CArraySource from a datashape specification,
@@ -85,6 +96,14 @@ class CArraySource(ByteProvider):
     def default_layout(self):
         return ChunkedL(self, cdimension=0)
 
+    def version(self):
+        """ The modification counter of the carray, plus the signature
+        of its metadata files if it is persistent. """
+        ca = self.ca
+        if ca.rootdir:
+            return (ca.version, signature(ca.rootdir, CARRAY_METAFILES))
+        return ca.version
+
     @property
     def nchunks(self):
         """ Number of chunks """
@@ -223,6 +242,24 @@ class CTableSource(ByteProvider):
         # TODO: this isn't true
         return ChunkedL(self, cdimension=0)
 
+    def version(self):
+        """ The length and the columns of the ctable, with the
+        modification counters of the columns opened so far, plus the
+        signature of its metadata files if it is persistent. """
+        ct = self.ca
+        cols = []
+        for name in ct.names:
+            if ct.cols.isopen(name):
+                col = ct.cols[name]
+                cols.append((name, id(col), col.version))
+            else:
+                # Not modified since the ctable was opened
+                cols.append((name, None, None))
+        version = (ct.len, tuple(cols))
+        if ct.rootdir:
+            return (version, signature(ct.rootdir, CTABLE_METAFILES))
+        return version
+
     @property
     def partitions(self):
         # TODO: look at the cols partitions
@@ -0,0 +1,115 @@
+"""
+Process-wide cache of handles to persistent Blaze sources.
+
+Opening a persistent carray or ctable reads its metadata files and
+decompresses the leftover chunk.  Code that opens the same dataset over
+and over again should pay that price only once, so handles are kept
+here, keyed by the storage path and the open mode.
+
+A cached handle is only handed out while the on-disk metadata it was
+built from is unchanged.  The metadata files are checked with a
+``stat`` call (inode, size and mtime), which is much cheaper than
+reopening the dataset.  All the users of a cached handle share the
+same source object, and hence its chunk caches.  Handles opened in the
+'a' mode are shared writers: data appended through one of them,
+including the leftover not yet flushed to disk, is seen by every user.
+"""
+
+import os
+from threading import Lock
+from collections import OrderedDict
+
+from blaze.carray.attrs import ATTRSDIR
+from blaze.carray.ctable import ROOTDIRS
+from blaze.carray.carrayExtension import META_DIR, SIZES_FILE, STORAGE_FILE
+
+# Files whose changes invalidate a cached handle, relative to the
+# dataset root directory
+CARRAY_METAFILES = (
+    os.path.join(META_DIR, SIZES_FILE),
+    os.path.join(META_DIR, STORAGE_FILE),
+    ATTRSDIR,
+)
+
+CTABLE_METAFILES = (
+    ROOTDIRS,
+    ATTRSDIR,
+)
+
+def signature(rootdir, metafiles):
+    """ Return a token that changes whenever any of the `metafiles`
+    under `rootdir` is rewritten, replaced or removed.
+    """
+    sig = []
+    for fname in metafiles:
+        try:
+            st = os.stat(os.path.join(rootdir, fname))
+        except OSError:
+            sig.append(None)
+        else:
+            sig.append((st.st_ino, st.st_size, st.st_mtime))
+    return tuple(sig)
+
+class HandleCache(object):
+    """
+    A thread-safe, bounded LRU mapping from ``(kind, path, mode)`` to
+    an open source object.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of handles kept alive by the cache.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._lock = Lock()
+        self._handles = OrderedDict()
+
+    def get(self, key, metafiles, factory):
+        """ Return the cached handle for `key`, calling `factory` to
+        open a new one when there is no valid handle cached.
+        """
+        kind, path, mode = key
+        sig = signature(path, metafiles)
+
+        with self._lock:
+            entry = self._handles.pop(key, None)
+            if entry is not None and entry[0] == sig:
+                # Hit! Reinsert as the most recently used
+                self._handles[key] = entry
+                return entry[1]
+
+        # Open outside of the lock, so that other datasets can be
+        # opened concurrently
+        handle = factory()
+        # Take the signature after opening, opening can touch metadata
+        sig = signature(path, metafiles)
+
+        with self._lock:
+            entry = self._handles.get(key)
+            if entry is not None and entry[0] == sig:
+                # Another thread got here first, share its handle
+                return entry[1]
+            self._handles[key] = (sig, handle)
+            while len(self._handles) > self.maxsize:
+                self._handles.popitem(last=False)
+        return handle
+
+    def invalidate(self, path=None):
+        """ Drop the handles for `path`, or all of them if None. """
+        with self._lock:
+            if path is None:
+                self._handles.clear()
+                return
+            for key in list(self._handles):
+                if key[1] == path:
+                    del self._handles[key]
+
+    def __contains__(self, key):
+        return key in self._handles
+
+    def __len__(self):
+        return len(self._handles)
+
+handles = HandleCache()
@@ -59,3 +59,125 @@ def test_cgen2_add():
 
         execute(ctx, args=(a,b,c), fname='kernel0', timing=False)
         assert np.allclose(c, a + b)
+
+def test_compile_cache():
+    import shutil
+    import tempfile
+    from blaze.blir import cache
+
+    source = """
+    def main(x: array[int], n : int) -> void {
+        var int i;
+        for i in range(n) {
+            x[i] = i;
+        }
+    }
+    """
+
+    cache_dir = cache.CACHE_DIR
+    cache.CACHE_DIR = tempfile.mkdtemp()
+    try:
+        _, env = compile(source)
+        # the second compilation is read from the cache
+        _, env = compile(source)
+        assert isinstance(env['cgen'], cache.CachedEmitter)
+
+        ctx = Context(env)
+        a = np.zeros(10, dtype='int32')
+        execute(ctx, args=(a, 10), fname='main')
+        assert np.all(a == np.arange(10))
+        ctx.destroy()
+
+        _, env = compile(source, cache=False)
+        assert not isinstance(env['cgen'], cache.CachedEmitter)
+    finally:
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR = cache_dir
+
+def test_shared_context():
+    source = """
+    def main(x: array[int], n : int) -> void {
+        var int i;
+        for i in range(n) {
+            x[i] = 2*i;
+        }
+    }
+    """
+
+    _, env = compile(source)
+    ctx1 = Context(env)
+    ctx1.destroy()
+
+    # the kernel is compiled once and shared, even across compilations
+    _, env = compile(source, cache=False)
+    ctx2 = Context(env)
+    assert ctx2.mod is ctx1.mod
+
+    a = np.zeros(10, dtype='int32')
+    execute(ctx2, args=(a, 10), fname='main')
+    assert np.all(a == 2*np.arange(10))
+
+def test_trampoline():
+    from blaze.blir import exc
+
+    source = """
+    def main(x: array[float], s: float, n : int) -> float {
+        var float accum = 0.0;
+        var int i;
+        for i in range(n) {
+            accum = accum + s*x[i];
+        }
+        return accum;
+    }
+    """
+
+    _, env = compile(source)
+    ctx = Context(env)
+    a = np.arange(10, dtype='double')
+
+    assert execute(ctx, args=(a, 2.0, 10), fname='main') == 90.0
+    # strided arrays are read through the buffer protocol
+    assert execute(ctx, args=(a[::2], 1.0, 5), fname='main') == 20.0
+
+    lfn = ctx.lookup_fn('main')
+    plan, addr = lfn.trampoline
+    if exc.trampoline is not None and exc.trampoline.supported:
+        assert plan is not None
+        # the plan calls the kernel directly
+        assert plan(addr, (a, 2.0, 10)) == 90.0
+
+        # arrays of other elements, or read-only ones, are left to ctypes
+        for b in (np.arange(10, dtype='int64'), a.copy()):
+            b.flags.writeable = b.dtype != np.double
+            try:
+                plan(addr, (b, 2.0, 10))
+            except TypeError:
+                pass
+            else:
+                raise AssertionError("Expected a TypeError")
+
+def test_trampoline_integers():
+    import ctypes
+    from blaze.blir import exc
+
+    if exc.trampoline is None or not exc.trampoline.supported:
+        return
+
+    # unsigned results are returned as by ctypes
+    for ctype, value in [(ctypes.c_ubyte, 200), (ctypes.c_uint16, 65000),
+                         (ctypes.c_uint32, 2**32-5), (ctypes.c_uint64, 2**64-5),
+                         (ctypes.c_byte, -56)]:
+        fn = ctypes.CFUNCTYPE(ctype, ctype)(lambda x: x)
+        assert exc.native_plan(fn) is not None
+        assert exc.call(fn, (value,)) == fn(value) == value
+
+    # integers out of the range of the register are left to ctypes
+    fn = ctypes.CFUNCTYPE(ctypes.c_int64, ctypes.c_int64)(lambda x: x)
+    plan, addr = exc.native_plan(fn), ctypes.cast(fn, ctypes.c_void_p).value
+    try:
+        plan(addr, (2**64,))
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("Expected a TypeError")
+    assert exc.call(fn, (2**63-1,)) == 2**63-1
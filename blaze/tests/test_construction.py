@@ -82,3 +82,21 @@ def test_scalars():
 
     if DEBUG:
         dump(x, filename='scalars')
+
+def test_hash_consing():
+    a = NDArray([1, 2, 3])
+    b = NDArray([1, 2, 3])
+
+    assert (a + 2) is (a + 2)
+    assert (a - b) * 2 is (a - b) * 2
+    assert (a + b) is not (b + a)
+    assert (a + 2) is not (a + 2.0)
+    assert (a + b) is not (a + a)
+
+def test_structural_hash():
+    a = IntNode(1)
+    b = IntNode(2)
+
+    assert IntNode(1).hash() == a.hash()
+    assert Node([a, b]).hash() == Node([IntNode(1), IntNode(2)]).hash()
+    assert Node([a, b]).hash() != Node([b, a]).hash()
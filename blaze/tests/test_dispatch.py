@@ -32,3 +32,51 @@ def test_deferred_func():
     y = NDArray([1,2,3])
 
     val = add(x,y)
+
+def test_indexed_lookup():
+    from blaze.funcs import Dispatcher
+    from blaze.error import NoDispatch
+
+    d = Dispatcher()
+    d.install('Add(<term>,<term>)', 'add', lambda term: 1)
+    d.install('Add(<term>,<term>,<term>)', 'add3', lambda term: 0)
+    d.install('<appl(<int>,<int>)>', 'anyint', lambda term: 2)
+
+    term = parse('Add(1,2)')
+    assert [f for f in d.candidates(term)] == ['add', 'anyint']
+    assert d.lookup(term) == ('add', 1)
+    assert d.lookup(parse('Add(1,2,3)')) == ('add3', 0)
+    assert d.lookup(parse('Mul(1,2)')) == ('anyint', 2)
+
+    # Decisions are memoized until the next install
+    assert len(d.memo) == 3
+    assert d.lookup(parse('Add(1,2)')) == ('add', 1)
+    assert len(d.memo) == 3
+    d.install('Add(<int>,<int>)', 'addint', lambda term: 0)
+    assert not d.memo
+    assert d.lookup(term) == ('addint', 0)
+
+    try:
+        d.lookup(parse('Mul("a",2)'))
+    except NoDispatch:
+        pass
+    else:
+        raise AssertionError("Expected NoDispatch")
+
+def test_lookup_memo_bounded():
+    from blaze import funcs
+
+    d = funcs.Dispatcher()
+    d.install('<appl(<int>)>', 'any', lambda term: 0)
+
+    size, funcs.MEMO_SIZE = funcs.MEMO_SIZE, 2
+    try:
+        d.lookup(parse('A(1)'))
+        d.lookup(parse('B(1)'))
+        d.lookup(parse('A(1)'))
+        d.lookup(parse('C(1)'))
+        # The least recently used decision is dropped
+        assert len(d.memo) == 2
+        assert [str(term) for term, _ in d.memo] == ['A(1)', 'C(1)']
+    finally:
+        funcs.MEMO_SIZE = size
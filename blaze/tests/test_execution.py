@@ -0,0 +1,210 @@
+import os.path
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+
+from blaze.test_utils import temp_dir
+
+from blaze import NDArray, params
+from blaze.carray import carray
+from blaze.expr.graph import App
+from blaze.expr import ops
+from blaze.compile import _compile, LOAD, CONST, CALL
+from blaze.error import ExecutionError
+from blaze.rts.execution import execplan
+
+def test_elementwise():
+    x = np.arange(100000, dtype='f8')
+    a, b = NDArray(x), NDArray(x)
+    result = (a + b*2).eval()
+    assert_array_equal(result.data.ca[:], x + x*2)
+
+def test_schedule():
+    # The tail which does not fill a chunk is a block on its own
+    a = NDArray(np.arange(100000))
+    chunklen = a.data.ca.chunklen
+    ctx, plan = _compile(a + 1)
+    assert len(ctx.schedule) == 100000 // chunklen + 1
+    assert ctx.schedule[0] == (0, chunklen)
+    assert ctx.schedule[-1] == (100000 // chunklen * chunklen, 100000)
+    assert [ins.opcode for ins in plan] == [LOAD, CONST, CALL]
+
+def test_shared_subexpression():
+    a = NDArray(np.arange(10))
+    b = a * 2
+    ctx, plan = _compile(b + b)
+    assert len(ctx.sources) == 1
+    assert len(plan) == 4
+    assert_array_equal((b + b).eval().data.ca[:], np.arange(10) * 4)
+
+def test_reduction():
+    x = np.linspace(0, 1, 100000)
+    a = NDArray(x)
+    assert_allclose(a.sum().eval(), x.sum())
+    expr = App(ops.Sum('Sum', [a * a]))
+    assert_allclose(expr.eval(), (x * x).sum())
+
+def test_reflected():
+    x = np.arange(1, 11, dtype='f8')
+    a = NDArray(x)
+    assert_array_equal((1 - a).eval().data.ca[:], 1 - x)
+    assert_array_equal((1.0 / a).eval().data.ca[:], 1.0 / x)
+    assert_array_equal((2 ** a).eval().data.ca[:], 2 ** x)
+
+def test_axis_reduction():
+    a = NDArray(np.arange(6, dtype='f8').reshape(2, 3))
+    assert_allclose(a.sum(axis=None).eval(), 15.0)
+    try:
+        a.sum(axis=1).eval()
+    except ExecutionError:
+        pass
+    else:
+        raise AssertionError('Expected ExecutionError')
+
+def test_inner_reduction():
+    a = NDArray(np.arange(10))
+    try:
+        (App(ops.Sum('Sum', [a])) + a).eval()
+    except ExecutionError:
+        pass
+    else:
+        raise AssertionError('Expected ExecutionError')
+
+def test_different_lengths():
+    a, b = NDArray(np.arange(10)), NDArray(np.arange(11))
+    try:
+        (a + b).eval()
+    except ExecutionError:
+        pass
+    else:
+        raise AssertionError('Expected ExecutionError')
+
+def test_eval_storage():
+    with temp_dir() as temp:
+        filename = os.path.join(temp, 'result')
+        a = NDArray(np.arange(1000))
+        result = (a * a).eval(params=params(storage=filename))
+        assert os.path.isdir(filename)
+        assert_array_equal(carray(rootdir=filename)[:], np.arange(1000)**2)
+
+def test_fusion():
+    x = np.linspace(0, 1, 10000)
+    a, b, c, d, e = [NDArray(x + i) for i in xrange(5)]
+    expr = a*b + c*d - e
+    ctx, plan = _compile(expr, fuse=True)
+    assert [ins.opcode for ins in plan] == [LOAD]*5 + [CALL]
+    kernel = plan.instructions[-1].arg
+    assert kernel.ninputs == 5
+    assert 'out[i0] = ' in kernel.source
+    assert_allclose(expr.eval().data.ca[:],
+                    x*(x + 1) + (x + 2)*(x + 3) - (x + 4))
+
+def test_fusion_precedence():
+    x = np.linspace(1, 2, 1000)
+    a, b, c = [NDArray(x + i) for i in xrange(3)]
+    xa, xb, xc = x, x + 1, x + 2
+    for expr, source, expected in [
+        ((a + b) * c, '(in0[i0] + in1[i0]) * in2[i0]', (xa + xb) * xc),
+        (a - (b - c), 'in0[i0] - (in1[i0] - in2[i0])', xa - (xb - xc)),
+        (a / (b * c), 'in0[i0] / (in1[i0] * in2[i0])', xa / (xb * xc)),
+        ((a - b) - c, 'in0[i0] - in1[i0] - in2[i0]', (xa - xb) - xc),
+    ]:
+        ctx, plan = _compile(expr, fuse=True)
+        kernel = plan.instructions[-1].arg
+        assert 'out[i0] = %s;' % source in kernel.source, kernel.source
+        assert_allclose(expr.eval().data.ca[:], expected)
+
+def test_fusion_shared():
+    # Values used twice are computed once, not fused in every user
+    a, b = NDArray(np.arange(10.)), NDArray(np.arange(10.))
+    c = a * b
+    ctx, plan = _compile((c + 1) * (c + 2), fuse=True)
+    assert [ins.name for ins in plan] == [LOAD, LOAD, 'Mul', 'Fused']
+    assert_allclose(execplan(ctx, plan).data.ca[:],
+                    (np.arange(10.)**2 + 1) * (np.arange(10.)**2 + 2))
+
+def test_cse():
+    # Structurally identical subgraphs built apart are computed once
+    x = np.arange(10.)
+    a = NDArray(x)
+    mean = App(ops.Sub('Sub', [a, 2]))
+    again = App(ops.Sub('Sub', [a, 2]))
+    ctx, plan = _compile(App(ops.Mul('Mul', [mean, again])), fuse=False)
+    assert [ins.name for ins in plan] == [LOAD, CONST, 'Sub', 'Mul']
+    assert_allclose(execplan(ctx, plan).data.ca[:], (x - 2)**2)
+
+def test_slice_pushdown():
+    x = np.arange(100000, dtype='f8')
+    a, b = NDArray(x), NDArray(x)
+    chunklen = a.data.ca.chunklen
+    ctx, plan = _compile((a + b)[1000:50000])
+    # The slice is read from the leaves, in blocks aligned with chunks
+    assert [w.bounds() for w in ctx.sources] == [(1000, 1, 49000)] * 2
+    assert ctx.schedule[0] == (0, chunklen - 1000 % chunklen)
+    assert [ins.opcode for ins in plan] == [LOAD, LOAD, CALL]
+    assert_array_equal(execplan(ctx, plan).data.ca[:], (x + x)[1000:50000])
+
+    expr = (a[10:] * 2 + b[:-10])[5:50000:3]
+    assert_array_equal(expr.eval().data.ca[:],
+                       (x[10:] * 2 + x[:-10])[5:50000:3])
+    assert_allclose(App(ops.Sum('Sum', [a[-100:]])).eval(), x[-100:].sum())
+
+def test_column_pushdown():
+    from blaze import NDTable
+    t = NDTable({'x': range(1000), 'y': [i * 0.5 for i in range(1000)]})
+    ctx, plan = _compile(t['x'][10:20] + t['y'][10:20])
+    assert [w.column for w in ctx.sources] == ['x', 'y']
+    expected = np.arange(10, 20) * 1.5
+    assert_array_equal(execplan(ctx, plan).data.ca[:], expected)
+
+def test_filter_pushdown():
+    from blaze import NDTable
+    from blaze.compile import Selection
+    x = np.arange(1000)
+    t = NDTable({'x': x, 'y': x * 0.5})
+    expr = t[(t['x'] > 10) & (t['y'] * 2 < 20 + 5)]
+    ctx, plan = _compile(expr)
+    assert isinstance(plan, Selection)
+    # The predicate reads its columns only, the outputs all of them
+    names = t.data.ca.names
+    assert [w.column for w in ctx.sources] == ['x', 'y'] + names
+    assert plan.outputs == [2, 3]
+
+    result = expr.eval()
+    assert_array_equal(result.data.ca['x'][:], x[(x > 10) & (x < 25)])
+    assert_array_equal(result.data.ca['y'][:], x[(x > 10) & (x < 25)] * 0.5)
+    # Only the selected column is copied
+    y = t[t['x'] == 3]['y'].eval()
+    assert_array_equal(y.data.ca[:], [1.5])
+
+def test_reductions():
+    x = np.linspace(-1, 1, 100000)
+    a = NDArray(x)
+    assert_allclose(a.max().eval(), x.max())
+    assert_allclose(a.std().eval(), x.std())
+    assert (a > -2).all().eval() and not (a > 0).all().eval()
+    assert (a > 0).any().eval()
+
+def test_multi_reduction():
+    from blaze import describe, evaluate
+    from blaze.compile import _compile_many
+    x = np.random.randn(100000)
+    a = NDArray(x)
+
+    # One pass, reading the shared source once
+    exprs = [a.sum(), a.mean(), (a * a).max()]
+    ctx, plan = _compile_many(exprs)
+    assert len(ctx.sources) == 1
+    assert plan.reduction == ('sum', 'mean', 'max')
+    assert_allclose(evaluate(*exprs), [x.sum(), x.mean(), (x * x).max()])
+    try:
+        evaluate(a.sum(), a.max(axis=0))
+    except ExecutionError:
+        pass
+    else:
+        raise AssertionError('Expected ExecutionError')
+
+    stats = describe(a)
+    assert stats['count'] == len(x)
+    assert_allclose([stats['mean'], stats['std'], stats['min'], stats['max']],
+                    [x.mean(), x.std(), x.min(), x.max()])
@@ -0,0 +1,71 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from blaze import NDArray
+from blaze.expr.graph import IntNode, FloatNode, IfElse, Op
+from blaze.compile import _compile, strip_app
+from blaze.opt import optimize, simplify
+
+def test_unchanged():
+    a = NDArray(np.arange(10))
+    expr = (a + 1)[2:]
+    assert optimize(expr) is expr
+
+def test_constant_fold():
+    a = NDArray(np.arange(10))
+    expr = a + IntNode(2) * IntNode(3) - FloatNode(0.5)
+    ctx, plan = _compile(expr)
+    consts = [i.arg for i in plan if i.opcode == 'const']
+    assert 6 in consts and 2 not in consts
+    assert_array_equal(expr.eval().data.ca[:], np.arange(10) + 5.5)
+
+def test_conditional_fold():
+    a, b = NDArray(np.arange(10)), NDArray(np.ones(10))
+    assert optimize(IfElse('if', [IntNode(1), a, b])) is a
+    assert optimize(IfElse('if', [IntNode(2) - IntNode(2), a, b])) is b
+
+def test_deep_fold():
+    expr = IntNode(0)
+    for i in range(200):
+        expr = expr + IntNode(1)
+    assert optimize(expr).val == 200
+
+def test_identities():
+    a = NDArray(np.arange(10))
+    assert simplify(a * IntNode(1)) is a
+    assert simplify(IntNode(0) + a) is a
+    assert simplify(a - IntNode(0)) is a
+    assert simplify(a ** IntNode(1)) is a
+    # Floats may change the type of the result
+    assert simplify(a * FloatNode(1.0)) is not a
+    assert simplify(IntNode(0) - a) is not a
+
+def test_unary():
+    a = NDArray(np.arange(10))
+    assert simplify(~~a) is a
+    assert strip_app(simplify(abs(abs(a)))).operands[0] is a
+
+def test_reassociate():
+    a, b = NDArray(np.arange(10)), NDArray(np.arange(10) * 2)
+    expr = ((a + IntNode(1)) + b) + IntNode(2)
+    ctx, plan = _compile(expr)
+    assert [i.arg for i in plan if i.opcode == 'const'] == [3]
+    assert_array_equal(expr.eval().data.ca[:], np.arange(10) * 3 + 3)
+
+    # Permuted chains are computed once
+    ctx, plan = _compile((a + b) * (b + a))
+    assert len([i for i in plan if i.opcode == 'call']) == 2
+
+def test_balanced():
+    leaves = [NDArray(np.arange(10)) for i in range(8)]
+    expr = leaves[0]
+    for leaf in leaves[1:]:
+        expr = expr + leaf
+    def depth(node):
+        node = strip_app(node)
+        if not isinstance(node, Op):
+            return 0
+        return 1 + max(depth(c) for c in node.operands)
+    assert depth(expr) == 7
+    assert depth(simplify(expr)) == 3
+    assert_array_equal(expr.eval().data.ca[:], np.arange(10) * 8)
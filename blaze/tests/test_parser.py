@@ -1,5 +1,5 @@
 from blaze.datashape import *
-from blaze.datashape.parser import parse
+from blaze.datashape.parser import parse, fast_parse, load_parser
 from blaze.datashape.record import RecordDecl, derived
 from blaze.datashape.coretypes import _reduce
 
@@ -192,3 +192,25 @@ def test_kiva_datashape():
           };
         }
     """)
+
+def test_fast_parse():
+    # The fast path agrees with the full parser
+    ply = load_parser()
+    for s in ['int32', '3, 4, int32', '  3 ,4,float64 ', 'N, M, float32',
+              '10, {x: int32; y: float64}', '{a:int8; b : uint64 ; }',
+              '{}', '3, string', '{type: int32}']:
+        x = fast_parse(s)
+        y = ply(s)
+        assert type(x) == type(y)
+        assert repr(x) == repr(y)
+        assert map(type, getattr(x, 'parameters', [x])) == \
+               map(type, getattr(y, 'parameters', [y]))
+
+    # Anything else is left to it
+    for s in ['3, types', '{types: int32}', '3, string(2)', '3, N',
+              '3,,int32', '', 'type foo = 3, int32', '3, {x: N, int32}']:
+        assert fast_parse(s) is None
+
+def test_parse_cache():
+    assert parse('2, 3, int32') is parse('2, 3, int32')
+    assert parse('5, VarDim, string(2)') is parse('5, VarDim, string(2)')
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from blaze.type_reconstruction import *
+from blaze.type_reconstruction import unify, simplifyty, occursin
 
 from blaze.test_utils import assert_raises
 
@@ -113,3 +114,51 @@ def test_simple_dtype_like():
     x = app(atom("map"), [ufunc])
 
     inferred = infer(env, x, debug=DEBUG)
+
+def test_shared_subterms():
+    add = Function(Integer, Function(Integer, Integer))
+    x = atom('1')
+    for i in range(100):
+        x = app(atom('add'), [x, x])
+    # A tree of 2**100 nodes, typed through its 100 distinct subterms
+    inferred = infer({'add': add}, x, debug=False)
+    assert pprint(inferred) == 'int'
+
+def test_shared_polymorphic_subterms():
+    var1, var2 = var(), var()
+    env = {
+        "true"    : Bool,
+        "const"   : Function(var1, Function(var2, var1)),
+        "product" : Function(var1, Function(var2, con("x", (var1, var2),
+                                                       infix=True))),
+    }
+    # Every occurrence of a subterm of polymorphic type is instantiated
+    # separately
+    k = app(atom('const'), [atom('1')])
+    x = product(app(k, [atom('true')]), app(k, [atom('1')]))
+    assert pprint(infer(env, x, debug=False)) == '(int x int)'
+
+def test_deep_unification():
+    # Long chains of type variables are unified without recursion
+    vars = [var() for i in range(5000)]
+    for a, b in zip(vars, vars[1:]):
+        unify(None, a, b)
+    unify(None, vars[0], Integer)
+    assert simplifyty(vars[-1]) is Integer
+
+    a, b = var(), var()
+    unify(None, a, b)
+    assert occursin(a, Function(Integer, b))
+    with assert_raises(TypeError):
+        unify(None, a, Function(Integer, b))
+
+def test_env_scope():
+    from blaze.context import Env
+    env = Env({'x': 1})
+    with env.scope('x', 2):
+        assert env['x'] == 2
+    assert env['x'] == 1
+    assert env.foldl('x') == 1
+    env['a'] = 'b'
+    env['b'] = 'a'
+    assert env.foldl('a') == 'a'
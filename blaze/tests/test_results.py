@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from blaze.test_utils import temp_dir
+
+from blaze import NDArray
+from blaze.compile import _compile
+from blaze.rts.execution import execplan
+from blaze.rts.results import ResultCache, results
+
+def test_eval_cached():
+    a = NDArray(np.arange(1000))
+    b = NDArray(np.arange(1000))
+    r1 = (a + 1).eval()
+    assert (a + 1).eval() is r1
+    assert a.sum().eval() == a.sum().eval()
+
+    # Appends invalidate the results depending on the source only
+    r2 = (b * 2).eval()
+    a.data.ca.append([1000])
+    r3 = (a + 1).eval()
+    assert r3 is not r1
+    assert_array_equal(r3.data.ca[:], np.arange(1001) + 1)
+    assert (b * 2).eval() is r2
+
+    # So do writes
+    a.data.ca[0] = 10
+    assert (a + 1).eval().data.ca[0] == 11
+
+def test_eval_uncached():
+    a = NDArray(np.arange(10))
+    assert (a + 1).eval(cache=False) is not (a + 1).eval(cache=False)
+
+def test_modified_result():
+    a = NDArray(np.arange(10))
+    r1 = (a * 3).eval()
+    r1.data.ca.append([0])
+    r2 = (a * 3).eval()
+    assert r2 is not r1
+    assert len(r2.data.ca) == 10
+
+def test_invalidate():
+    cache = ResultCache()
+    a = NDArray(np.arange(10))
+    ctx, plan = _compile(a + 1)
+    cache.get(ctx, plan, lambda: execplan(ctx, plan))
+    assert len(cache) == 1
+    cache.invalidate(a.data)
+    assert len(cache) == 0 and cache.nbytes == 0
+
+def test_spill():
+    with temp_dir() as temp:
+        spilldir = os.path.join(temp, 'spill')
+        x = np.arange(100000)
+        a, b = NDArray(x), NDArray(x)
+        ctxa, plana = _compile(a + 1)
+        ctxb, planb = _compile(b + 2)
+        ra, rb = execplan(ctxa, plana), execplan(ctxb, planb)
+        maxbytes = max(ra.data.ca.cbytes, rb.data.ca.cbytes)
+        cache = ResultCache(maxbytes=maxbytes, spilldir=spilldir)
+
+        cache.get(ctxa, plana, lambda: ra)
+        cache.get(ctxb, planb, lambda: rb)
+        # The first result was evicted to disk
+        assert len(cache) == 2
+        assert cache.spillbytes == ra.data.ca.cbytes
+        assert len(os.listdir(spilldir)) == 1
+
+        fail = lambda: None
+        result = cache.get(ctxa, plana, fail)
+        assert_array_equal(result.data.ca[:], x + 1)
+        # And the second result went to disk in its place
+        assert len(os.listdir(spilldir)) == 1
+        cache.clear()
+        assert len(os.listdir(spilldir)) == 0
+
+def test_table_cached():
+    from blaze import NDTable
+    t = NDTable({'x': range(100), 'y': [i * 0.5 for i in range(100)]})
+    r1 = (t['x'] + t['y']).eval()
+    assert (t['x'] + t['y']).eval() is r1
+    t.data.ca.append((100, 50.0))
+    r2 = (t['x'] + t['y']).eval()
+    assert r2 is not r1
+    assert len(r2.data.ca) == 101
+
+def test_sources_weak():
+    import gc
+    import weakref
+    cache = ResultCache()
+
+    def cached():
+        a = NDArray(np.arange(10))
+        ctx, plan = _compile(a + 1)
+        cache.get(ctx, plan, lambda: execplan(ctx, plan))
+        return weakref.ref(a.data)
+
+    # The cache does not keep the sources alive
+    source = cached()
+    gc.collect()
+    assert len(cache) == 1
+    assert source() is None
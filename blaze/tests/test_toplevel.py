@@ -43,3 +43,73 @@ def test_open_ctable():
         # Test delayed mode
         c = toplevel.open(uri, eclass=eclass.delayed)
         assert c.datashape == ds
+
+def test_open_cached():
+    with temp_dir() as temp:
+        # Create an array on disk
+        array_filename = os.path.join(temp, 'carray')
+        p = params(storage=array_filename)
+        ds = dshape('1,int32')
+        a = CArraySource([2], dshape=ds, params=p)
+        del a
+
+        # Opening twice shares the source
+        uri = 'carray://' + array_filename
+        c1 = toplevel.open(uri)
+        c2 = toplevel.open(uri)
+        assert c1.data is c2.data
+
+        # Changing the metadata on-disk invalidates the handle
+        c1.data.ca.attrs['foo'] = 'bar'
+        c3 = toplevel.open(uri)
+        assert c3.data is not c1.data
+        assert c3.data.ca.attrs['foo'] == 'bar'
+
+def test_open_cached_mode():
+    with temp_dir() as temp:
+        array_filename = os.path.join(temp, 'carray')
+        p = params(storage=array_filename)
+        ds = dshape('1,int32')
+        a = CArraySource([2], dshape=ds, params=p)
+        del a
+
+        # Handles are opened in the requested mode, and not shared
+        # between modes
+        uri = 'carray://' + array_filename
+        r = toplevel.open(uri, mode='r')
+        a = toplevel.open(uri, mode='a')
+        assert r.data.ca.mode == 'r'
+        assert a.data.ca.mode == 'a'
+        assert r.data is not a.data
+        assert toplevel.open(uri, mode='r').data is r.data
+
+def test_lazy_import():
+    import sys
+    import subprocess
+
+    # Nothing but the package itself is imported up front
+    code = ('import sys, blaze; '
+            'print sorted(m for m in sys.modules if sys.modules[m] and '
+            '(m.startswith("blaze.") or m in ("numpy", "ply")))')
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert eval(out) == ['blaze.eclass', 'blaze.error', 'blaze.params']
+
+def test_lazy_names():
+    import blaze
+    from blaze import table, lib
+    from blaze.datashape import shorthand
+
+    assert blaze.Array is table.Array
+    assert blaze.array is table.Array
+    assert blaze.abs is toplevel.blaze_abs
+    assert blaze.evaluate is toplevel.evaluate
+    assert blaze.add is lib.add
+    assert blaze.i4 is shorthand.i4
+    assert blaze.eclass is eclass
+    assert blaze.params is params
+    assert blaze.toplevel is toplevel
+    assert 'zeros' in dir(blaze) and 'zeros' in blaze.__all__
+    # the modules the package itself uses are not exported
+    for name in ('sys', 'imp', 'ModuleType'):
+        assert name not in blaze.__all__
+    assert not hasattr(blaze, 'no_such_name')
@@ -0,0 +1,71 @@
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+
+from blaze import NDArray
+from blaze.error import ExecutionError
+from blaze.rts.aggregates import aggregates
+from blaze.rts.views import View
+
+def test_aggregates_merge():
+    x = np.random.randn(1000) + 1e6
+    for how, expected in [('sum', x.sum()), ('min', x.min()),
+                          ('max', x.max()), ('count', x.size),
+                          ('mean', x.mean()), ('var', x.var())]:
+        agg = aggregates[how]()
+        for block in np.array_split(x, 7):
+            agg.update(block)
+        assert_allclose(agg.value(), expected)
+
+def test_elementwise_view():
+    x = np.arange(10000, dtype='f8')
+    a, b = NDArray(x), NDArray(x)
+    view = View(a + b*2)
+    assert_array_equal(view.result.data.ca[:], x * 3)
+
+    a.data.ca.append(x[:5]); b.data.ca.append(x[:5])
+    out = view.result
+    assert view.nrows == 10005
+    assert_array_equal(out.data.ca[:], np.concatenate([x, x[:5]]) * 3)
+    assert view.refresh() == 0
+
+def test_reduction_view():
+    x = np.linspace(0, 1, 10000)
+    a = NDArray(x)
+    total = View(a.sum())
+    mean, var = View(a * 2, 'mean'), View(a * 2, 'var')
+    assert_allclose(total.result, x.sum())
+
+    chunklen = a.data.ca.chunklen
+    parts = [x]
+    for i in range(3):
+        new = np.random.rand(chunklen // 3 + 1)
+        a.data.ca.append(new)
+        parts.append(new)
+        assert total.refresh() == len(new)
+        y = np.concatenate(parts)
+        assert_allclose(total.result, y.sum())
+        assert_allclose(mean.result, (y * 2).mean())
+        assert_allclose(var.result, (y * 2).var())
+
+def test_view_errors():
+    a = NDArray(np.arange(10))
+    try:
+        View(a.sum(), 'mean')
+    except ExecutionError:
+        pass
+    else:
+        raise AssertionError("Expected ExecutionError")
+    try:
+        View(a, 'median')
+    except ExecutionError:
+        pass
+    else:
+        raise AssertionError("Expected ExecutionError")
+
+def test_sliced_view():
+    # Windows open at the end follow the appends
+    a = NDArray(np.arange(100))
+    view = View(a[10:] * 2)
+    assert len(view.result.data.ca) == 90
+    a.data.ca.append(np.arange(5))
+    assert_array_equal(view.result.data.ca[-5:], np.arange(5) * 2)
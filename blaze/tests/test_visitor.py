@@ -95,6 +95,21 @@ def test_transformers():
 
     assert Transformer2().visit([a, c]) == [int]
 
+def test_transformers_copy():
+    # Interned nodes are shared, transformers leave them unchanged
+    x = a + (b + c)
+    other = b + c
+    h = x.hash()
+    result = Transformer().visit(x)
+    assert result is not x
+    assert x.hash() == h
+    assert Visitor().visit(x) == [[int, [[int, float]]]]
+    assert Visitor().visit(other) == [[int, float]]
+    assert (a + (b + c)) is x
+    # Unchanged subgraphs are not copied
+    assert Transformer2().visit(a) is int
+    assert Transformer().visit(a + b) is (a + b)
+
 #------------------------------------------------------------------------
 # Transformers
 #------------------------------------------------------------------------
@@ -5,6 +5,7 @@ from params import params, to_cparams
 from params import params as _params
 from sources.sql import SqliteSource
 from sources.chunked import CArraySource, CTableSource
+from sources.handles import handles, CARRAY_METAFILES, CTABLE_METAFILES
 
 from table import NDArray, Array, NDTable, Table
 from blaze.datashape import from_numpy, to_numpy, TypeVar, Fixed
@@ -17,6 +18,15 @@ import numpy as np
 # TODO: we'd like to distinguish between opening in Deferred or
 # Immediete mode
 
+def _open_cached(kind, path, mode, metafiles, factory):
+    """ Open a persistent source through the process-wide handle
+    cache.  The 'w' mode empties the data, so it is never cached.
+    """
+    if mode == 'w':
+        return factory()
+    key = (kind, os.path.abspath(path), mode)
+    return handles.get(key, metafiles, factory)
+
 def open(uri, mode='a',  eclass=_eclass.manifest):
     """Open a Blaze object via an `uri` (Uniform Resource Identifier).
 
@@ -44,20 +54,35 @@ def open(uri, mode='a',  eclass=_eclass.manifest):
     -------
     out : an Array or Table object.
 
+    Notes
+    -----
+    Persistent carray and ctable sources are shared between calls
+    opening the same path with the same mode, as long as their on-disk
+    metadata does not change.  In the 'a' mode this means the callers
+    share a single writer: appends made through one of them, flushed
+    or not, are seen by all the others.
+
     """
     ARRAY = 1
     TABLE = 2
 
     uri = urlparse(uri)
     path = uri.netloc + uri.path
-    parms = params(storage=path)
+
+    def open_carray():
+        return CArraySource.wrap(carray.carray(rootdir=path, mode=mode))
+
+    def open_ctable():
+        return CTableSource(carray.ctable(rootdir=path, mode=mode))
 
     if uri.scheme == 'carray':
-        source = CArraySource(params=parms)
+        source = _open_cached('carray', path, mode, CARRAY_METAFILES,
+                              open_carray)
         structure = ARRAY
 
     elif uri.scheme == 'ctable':
-        source = CTableSource(params=parms)
+        source = _open_cached('ctable', path, mode, CTABLE_METAFILES,
+                              open_ctable)
         structure = TABLE
 
     elif uri.scheme == 'sqlite':
@@ -68,8 +93,8 @@ def open(uri, mode='a',  eclass=_eclass.manifest):
 
     else:
         # Default is to treat the URI as a regular path
-        parms = params(storage=path)
-        source = CArraySource(params=parms)
+        source = _open_cached('carray', path, mode, CARRAY_METAFILES,
+                              open_carray)
         structure = ARRAY
 
     # Don't want a deferred array (yet)
@@ -348,3 +373,50 @@ def blaze_sum(a, axis=None, out=None):
     """
     a = lazy(a)
     return a.sum(axis=axis, out=out)
+
+def evaluate(*exprs):
+    """
+    Evaluate several full reductions in a single pass over their
+    sources.
+
+    The sources and the subexpressions shared by the reductions are
+    read and computed once per chunk, instead of once per reduction.
+
+    Parameters
+    ----------
+    exprs : reductions
+        Deferred full reductions, e.g. ``a.sum()`` or ``(a*b).max()``.
+        Reductions along an axis raise an ExecutionError.
+
+    Returns
+    -------
+    out : list
+        The value of every reduction, in order.
+
+    Examples
+    --------
+    >>> total, peak = blaze.evaluate(a.sum(), a.max())
+    """
+    from blaze.compile import _compile_many
+    from blaze.rts.execution import execplan
+    ctx, plan = _compile_many(exprs)
+    return execplan(ctx, plan)
+
+def describe(a):
+    """
+    Summary statistics of the elements of an array, computed in a
+    single pass over the data.
+
+    Parameters
+    ----------
+    a : array_like
+
+    Returns
+    -------
+    out : dict
+        The 'count', 'mean', 'std', 'min' and 'max' of the elements.
+    """
+    a = lazy(a)
+    names = ['count', 'mean', 'std', 'min', 'max']
+    exprs = [a.generate_opnode(1, name, [a]) for name in names]
+    return dict(zip(names, evaluate(*exprs)))
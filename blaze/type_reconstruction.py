@@ -46,6 +46,7 @@ class TypeVar(object):
     def __init__(self):
         self.id = 0
         self.ty = None
+        self.rank = 0
         self.__name = None
 
     def _unify(self, other):
@@ -137,10 +138,17 @@ Function = lambda dom, cod: TypeCon('->', (dom, cod), infix=True)
 # Evaluation
 #------------------------------------------------------------------------
 
-def tyeval(node, env, ctx=None):
+def tyeval(node, env, ctx=None, memo=None):
     ctx = ctx or set()
     assert isinstance(ctx, set)
 
+    # Shared subterms with a ground type are typed once per scope, the
+    # others get a fresh instance at every occurrence
+    if memo is None:
+        memo = {}
+    if id(node) in memo:
+        return memo[id(node)][1]
+
     # a : t ∈ Γ
     # ----------  [Var]
     # Γ ⊢ a : t
@@ -153,11 +161,13 @@ def tyeval(node, env, ctx=None):
     #        Γ ⊢ g f : b
 
     elif isinstance(node, App):
-        fn  = tyeval(node.fn, env, ctx)
-        arg = tyeval(node.arg, env, ctx)
+        fn  = tyeval(node.fn, env, ctx, memo)
+        arg = tyeval(node.arg, env, ctx, memo)
 
         out = TypeVar()
         unify(env, Function(arg, out), fn)
+        if isground(out):
+            memo[id(node)] = (node, simplifyty(out))
         return out
 
     #
@@ -167,13 +177,11 @@ def tyeval(node, env, ctx=None):
     elif isinstance(node, Lambda):
         dom = TypeVar()
 
-        scope = env.collapse()
-        scope[node.v] = dom
-
         bindings = set(ctx)
         bindings.add(dom)
 
-        cod = tyeval(node.body, scope, bindings)
+        with env.scope(node.v, dom):
+            cod = tyeval(node.body, env, bindings, {})
         return Function(dom, cod)
 
     raise Exception("Not in scope: type constructor or variable %s" % (node))
@@ -196,7 +204,7 @@ def gen(ty, constrs, bindings):
     t = simplifyty(ty)
 
     if isinstance(t, TypeVar):
-        if isbound(t, bindings):
+        if t not in bindings:
             if t not in constrs:
                 constrs[t] = TypeVar()
             return constrs[t]
@@ -204,88 +212,121 @@ def gen(ty, constrs, bindings):
             return t
 
     elif isinstance(t, TypeCon):
-        conargs = [gen(x, constrs, bindings) for x in t.types]
-        return TypeCon(t.cons, conargs, t.infix)
+        if t not in constrs:
+            conargs = [gen(x, constrs, bindings) for x in t.types]
+            constrs[t] = TypeCon(t.cons, conargs, t.infix)
+        return constrs[t]
 
 def constraints(t, bindings):
+    """ A fresh instance of `t`, where the type variables not occurring in
+    the types of `bindings` are replaced by new ones. """
     constrs = {}
-    return gen(t, constrs, bindings)
+    return gen(t, constrs, freevars(bindings))
 
 #------------------------------------------------------------------------
 # Unification
 #------------------------------------------------------------------------
 
-# Calculate a solution to a set of constraint.
+# Type variables are the nodes of a union-find forest: a bound variable
+# points to the type it was unified with, and the representative of its
+# class is found by following these links (compressing the path on the
+# way).  Unifying two classes links the representative of one to the
+# other, so types are never copied.
 
 def unify(env, t1, t2):
-    ctx = env.collapse()
-
-    a = simplifyty(t1)
-    b = simplifyty(t2)
-
-    # ---------------------------
-
-    if isinstance(a, TypeVar):
-        if a != b:
-            if occursin(a, b):
+    """ Unify `t1` with `t2`, returns the representative of their class. """
+    stack = [(t1, t2)]
+    while stack:
+        p, q = stack.pop()
+        a = simplifyty(p)
+        b = simplifyty(q)
+
+        if a is b:
+            continue
+
+        # ---------------------------
+
+        if isinstance(b, TypeVar) and not isinstance(a, TypeVar):
+            a, b = b, a
+
+        if isinstance(a, TypeVar):
+            if isinstance(b, TypeVar):
+                # Union by rank
+                if a.rank > b.rank:
+                    a, b = b, a
+                elif a.rank == b.rank:
+                    b.rank += 1
+            elif occursin(a, b):
                 raise TypeError("Recursive types are not supported")
             a.ty = b
-            return {a: b}
-        else:
-            return {a: a}
-
-    # ---------------------------
-
-    elif isinstance(a, TypeCon) and isinstance(b, TypeVar):
-        return unify(ctx, b, a)
 
-    # ---------------------------
+        # ---------------------------
 
-    elif isinstance(a, TypeCon) and isinstance(b, TypeCon):
+        elif isinstance(a, TypeCon) and isinstance(b, TypeCon):
 
-        if (a.cons != b.cons):
-            raise TypeError("Type mismatch: %s != %s" % (str(a), str(b)))
+            if (a.cons != b.cons):
+                raise TypeError("Type mismatch: %s != %s" % (str(a), str(b)))
 
-        if len(a.types) != len(b.types):
-            raise ValueError("Wrong number of arguments: %s != %s" %
-                (len(a.types), len(b.types)))
+            if len(a.types) != len(b.types):
+                raise ValueError("Wrong number of arguments: %s != %s" %
+                    (len(a.types), len(b.types)))
 
-        for p, q in zip(a.types, b.types):
-            locals = unify(ctx, p, q)
-            ctx.update(locals)
+            stack.extend(reversed(zip(a.types, b.types)))
 
-        return ctx
+        # ---------------------------
 
-    # ---------------------------
+        else:
+            fail(env, a, b)
 
-    else:
-        fail(ctx, a, b)
+    return simplifyty(t1)
 
 def simplifyty(t):
-    if isinstance(t, TypeVar):
-        if t.ty is not None:
-            t.ty = simplifyty(t.ty)
-            return t.ty
-        else:
-            return t
-    else:
-        return t
+    """ The representative of the class of `t`. """
+    root = t
+    while isinstance(root, TypeVar) and root.ty is not None:
+        root = root.ty
+    # Path compression
+    while isinstance(t, TypeVar) and t.ty is not None and t.ty is not root:
+        t.ty, t = root, t.ty
+    return root
 
 #------------------------------------------------------------------------
 # Occurs Check
 #------------------------------------------------------------------------
 
 def occursin(var, ty):
-    sty = simplifyty(ty)
-    if sty == var:
-        return True
-    elif isinstance(sty, TypeCon):
-        return occurs(var, sty.types)
+    var = simplifyty(var)
+    seen = set()
+    stack = [ty]
+    while stack:
+        sty = simplifyty(stack.pop())
+        if sty is var:
+            return True
+        elif isinstance(sty, TypeCon) and id(sty) not in seen:
+            seen.add(id(sty))
+            stack.extend(sty.types)
     return False
 
 def occurs(t, types):
     return any(occursin(t, t2) for t2 in types)
 
+def freevars(types):
+    """ The representatives of the free type variables of `types`. """
+    seen = set()
+    free = set()
+    stack = list(types)
+    while stack:
+        t = simplifyty(stack.pop())
+        if isinstance(t, TypeVar):
+            free.add(t)
+        elif isinstance(t, TypeCon) and id(t) not in seen:
+            seen.add(id(t))
+            stack.extend(t.types)
+    return free
+
+def isground(ty):
+    return not freevars([ty])
+
 #------------------------------------------------------------------------
 # Term Deconstructors
 #------------------------------------------------------------------------
@@ -294,7 +335,7 @@ def isval(v, bindings):
     return isinstance(v, TypeVar)
 
 def isbound(v, bindings):
-    return not occurs(v, bindings)
+    return simplifyty(v) not in freevars(bindings)
 
 def isnumericval(name):
     try:
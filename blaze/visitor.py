@@ -54,9 +54,27 @@ class GraphVisitor(BasicGraphVisitor):
             field = getattr(tree, fieldname)
             self.visit(field)
 
+def changed(old, new):
+    """ Whether a field was replaced by a transformation. """
+    if isinstance(old, list) and isinstance(new, list):
+        return len(old) != len(new) or \
+               any(a is not b for a, b in zip(old, new))
+    return old is not new
+
+def rebuild(tree, fields):
+    """ Return `tree` with the transformed `fields`.  Nodes can be part
+    of several graphs, so a node whose fields changed is copied rather
+    than changed in place.
+    """
+    if not fields:
+        return tree
+    return tree.replace(**fields)
+
 class GraphTransformer(GraphVisitor):
     """
     Similar to GraphVisitor, but return values replace the terms in the graph.
+    The nodes on the path to a replaced term are rebuilt, the graph that is
+    visited is left unchanged.
     """
 
     def _unknown(self, tree):
@@ -70,17 +88,19 @@ class GraphTransformer(GraphVisitor):
             return self.visit_node(tree)
 
     def visitchildren(self, tree):
+        fields = {}
         for fieldname in tree._fields:
             field = getattr(tree, fieldname)
             result = self.visit(field)
-            setattr(tree, fieldname, result)
+            if changed(field, result):
+                fields[fieldname] = result
 
-        return tree
+        return rebuild(tree, fields)
 
 class GraphTranslator(GraphTransformer):
     """
     Similar to GraphTransformer, but it allows easy translation of the graph
-    to other forms of graph, while mutating the graph at the same time.
+    to other forms of graph, while transforming the graph at the same time.
 
     Example:
 
@@ -125,17 +145,19 @@ class GraphTranslator(GraphTransformer):
             return self.visit_node(tree)
 
     def visitchildren(self, tree):
+        fields = {}
         results = []
         for fieldname in tree._fields:
             field = getattr(tree, fieldname)
             result = self.visit(field)
-            setattr(tree, fieldname, result)
+            if changed(field, result):
+                fields[fieldname] = result
 
             if self.result is not None:
                 results.append(self.result)
 
         self.set_resultlist(results)
-        return tree
+        return rebuild(tree, fields)
 
 
 class MroVisitor(GraphVisitor):
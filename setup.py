@@ -248,6 +248,12 @@ extensions = [
         include_dirs = [],
    ),
 
+   Extension(
+        "blaze.blir.trampoline",
+        sources = ["blaze/blir/trampoline.pyx"],
+        include_dirs = [],
+   ),
+
 #   Extension(
 #        "blaze.blir.prelude",
 #        sources = ["blaze/blir/prelude.c"],